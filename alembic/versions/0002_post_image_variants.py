@@ -0,0 +1,39 @@
+"""post image variants
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('thumbnail_key', sa.String(length=255), nullable=True))
+    op.add_column('posts', sa.Column('medium_key', sa.String(length=255), nullable=True))
+    op.add_column('posts', sa.Column('webp_key', sa.String(length=255), nullable=True))
+    op.add_column('posts', sa.Column('image_width', sa.Integer(), nullable=True))
+    op.add_column('posts', sa.Column('image_height', sa.Integer(), nullable=True))
+    op.add_column('posts', sa.Column('placeholder_hash', sa.String(length=64), nullable=True))
+    op.add_column(
+        'posts',
+        sa.Column('image_status', sa.String(length=20), server_default='pending', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.drop_column('image_status')
+        batch_op.drop_column('placeholder_hash')
+        batch_op.drop_column('image_height')
+        batch_op.drop_column('image_width')
+        batch_op.drop_column('webp_key')
+        batch_op.drop_column('medium_key')
+        batch_op.drop_column('thumbnail_key')
@@ -0,0 +1,65 @@
+"""store post image object keys instead of presigned urls
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:15:00.000000
+
+"""
+from urllib.parse import urlsplit
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+posts = sa.table(
+    'posts',
+    sa.column('id', sa.Integer),
+    sa.column('image_url', sa.String),
+    sa.column('image_key', sa.String),
+)
+
+
+def _object_key(image_url: str) -> str:
+    # Stored values are presigned URLs: http://host/<bucket>/<key>?X-Amz-...
+    return urlsplit(image_url).path.rsplit('/', 1)[-1]
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('image_key', sa.String(length=255), nullable=True))
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(posts.c.id, posts.c.image_url)
+            .where(posts.c.id > last_id)
+            .order_by(posts.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            posts.update().where(posts.c.id == sa.bindparam('post_id')),
+            [{'post_id': row.id, 'image_key': _object_key(row.image_url)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.alter_column('image_key', existing_type=sa.String(length=255), nullable=False)
+        batch_op.drop_column('image_url')
+
+
+def downgrade() -> None:
+    # Presigned URLs can't be reconstructed offline; keep the key so the old
+    # code's delete_file() still resolves the right object.
+    op.add_column('posts', sa.Column('image_url', sa.String(length=500), nullable=True))
+    op.execute(posts.update().values(image_url=posts.c.image_key))
+    with op.batch_alter_table('posts') as batch_op:
+        batch_op.alter_column('image_url', existing_type=sa.String(length=500), nullable=False)
+        batch_op.drop_column('image_key')
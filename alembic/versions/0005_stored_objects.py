@@ -0,0 +1,44 @@
+"""content-addressed stored objects with reference counts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stored_objects',
+        sa.Column('object_key', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('object_key')
+    )
+    # Existing uuid-named objects get one row each; size is unknown for them
+    op.execute(
+        "INSERT INTO stored_objects (object_key, ref_count) "
+        "SELECT image_key, COUNT(*) FROM posts GROUP BY image_key"
+    )
+
+    # Tickets for an already stored image share its key, so it can't be unique
+    with op.batch_alter_table('pending_uploads') as batch_op:
+        batch_op.drop_constraint('uq_pending_uploads_object_key', type_='unique')
+        batch_op.create_index(batch_op.f('ix_pending_uploads_object_key'), ['object_key'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('pending_uploads') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pending_uploads_object_key'))
+        batch_op.create_unique_constraint('uq_pending_uploads_object_key', ['object_key'])
+    op.drop_table('stored_objects')
@@ -0,0 +1,37 @@
+"""durable object deletion queue
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'object_deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('object_key', sa.String(length=255), nullable=False),
+        sa.Column('owner_key', sa.String(length=255), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_object_deletions_id'), 'object_deletions', ['id'], unique=False)
+    op.create_index(op.f('ix_object_deletions_next_attempt_at'), 'object_deletions', ['next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_object_deletions_next_attempt_at'), table_name='object_deletions')
+    op.drop_index(op.f('ix_object_deletions_id'), table_name='object_deletions')
+    op.drop_table('object_deletions')
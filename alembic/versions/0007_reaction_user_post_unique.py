@@ -0,0 +1,37 @@
+"""one reaction per user and post
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the most recent reaction of any duplicated (user, post) pair
+    if op.get_bind().dialect.name == "mysql":
+        op.execute(
+            "DELETE older FROM reactions older JOIN reactions newer "
+            "ON older.user_id = newer.user_id AND older.post_id = newer.post_id AND older.id < newer.id"
+        )
+    else:
+        op.execute(
+            "DELETE FROM reactions WHERE id NOT IN "
+            "(SELECT MAX(id) FROM reactions GROUP BY user_id, post_id)"
+        )
+    op.create_unique_constraint('uq_reactions_user_post', 'reactions', ['user_id', 'post_id'])
+
+
+def downgrade() -> None:
+    # MySQL may have dropped its implicit user_id foreign key index in favour
+    # of the unique one, so a plain index has to exist before removing it
+    op.create_index('ix_reactions_user_id', 'reactions', ['user_id'], unique=False)
+    op.drop_constraint('uq_reactions_user_post', 'reactions', type_='unique')
@@ -0,0 +1,27 @@
+"""fulltext index on post title and description
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # MySQL only; search falls back to LIKE elsewhere. The first FULLTEXT
+    # index on an InnoDB table rebuilds it to add FTS_DOC_ID.
+    if op.get_bind().dialect.name == "mysql":
+        op.create_index('ix_posts_fulltext', 'posts', ['title', 'description'], mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "mysql":
+        op.drop_index('ix_posts_fulltext', table_name='posts')
@@ -0,0 +1,45 @@
+"""per-user stats and posts (user_id, id) index
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_user_id_id', 'posts', ['user_id', 'id'], unique=False)
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_count', sa.Integer(), nullable=False),
+        sa.Column('comment_count', sa.Integer(), nullable=False),
+        sa.Column('likes_received', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    # One-time backfill; afterwards writes keep the rows current
+    op.execute(
+        "INSERT INTO user_stats (user_id, post_count, comment_count, likes_received) "
+        "SELECT users.id, "
+        "(SELECT COUNT(*) FROM posts WHERE posts.user_id = users.id), "
+        "(SELECT COUNT(*) FROM comments WHERE comments.user_id = users.id), "
+        "(SELECT COUNT(*) FROM reactions JOIN posts ON posts.id = reactions.post_id "
+        "WHERE posts.user_id = users.id AND reactions.reaction_type = 'like') "
+        "FROM users"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
+    # MySQL may use the composite index for the user_id foreign key
+    op.create_index('ix_posts_user_id', 'posts', ['user_id'], unique=False)
+    op.drop_index('ix_posts_user_id_id', table_name='posts')
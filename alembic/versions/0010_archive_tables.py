@@ -0,0 +1,63 @@
+"""archive tables for comments and reactions of old posts
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_posts_archived_at_created_at', 'posts', ['archived_at', 'created_at'], unique=False)
+    op.create_table(
+        'comments_archive',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('post_id', 'id'),
+        mysql_engine='InnoDB',
+        mysql_row_format='COMPRESSED'
+    )
+    op.create_index('ix_comments_archive_id', 'comments_archive', ['id'], unique=True)
+    op.create_table(
+        'reactions_archive',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('reaction_type', sa.Enum('like', 'dislike', name='reactiontype'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('post_id', 'user_id'),
+        mysql_engine='InnoDB',
+        mysql_row_format='COMPRESSED'
+    )
+
+
+def downgrade() -> None:
+    # Move archived rows back before dropping the archive
+    op.execute(
+        "INSERT INTO comments (id, content, user_id, post_id, created_at) "
+        "SELECT id, content, user_id, post_id, created_at FROM comments_archive"
+    )
+    op.execute(
+        "INSERT INTO reactions (user_id, post_id, reaction_type, created_at) "
+        "SELECT user_id, post_id, reaction_type, created_at FROM reactions_archive"
+    )
+    op.drop_table('reactions_archive')
+    op.drop_index('ix_comments_archive_id', table_name='comments_archive')
+    op.drop_table('comments_archive')
+    op.drop_index('ix_posts_archived_at_created_at', table_name='posts')
+    op.drop_column('posts', 'archived_at')
@@ -0,0 +1,40 @@
+"""cascade post deletes to comments and reactions, post tombstones
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+CHILD_TABLES = ('comments', 'reactions', 'comments_archive', 'reactions_archive')
+
+
+def _replace_post_foreign_keys(ondelete) -> None:
+    # The foreign keys were created unnamed, so their generated names
+    # (e.g. comments_ibfk_2 on MySQL) are looked up
+    inspector = sa.inspect(op.get_bind())
+    for table in CHILD_TABLES:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key['referred_table'] == 'posts' and foreign_key['constrained_columns'] == ['post_id']:
+                op.drop_constraint(foreign_key['name'], table, type_='foreignkey')
+        op.create_foreign_key(f'fk_{table}_post_id', table, 'posts', ['post_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _replace_post_foreign_keys('CASCADE')
+    op.add_column('posts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_posts_deleted_at'), 'posts', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_posts_deleted_at'), table_name='posts')
+    op.drop_column('posts', 'deleted_at')
+    _replace_post_foreign_keys(None)
@@ -0,0 +1,33 @@
+"""posts.comment_count and comments (post_id, created_at, id) index
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    # One-time backfill; afterwards comment writes keep the column current
+    op.execute(
+        "UPDATE posts SET comment_count = "
+        "(SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id) + "
+        "(SELECT COUNT(*) FROM comments_archive WHERE comments_archive.post_id = posts.id)"
+    )
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    # MySQL may use the composite index for the post_id foreign key
+    op.create_index('ix_comments_post_id', 'comments', ['post_id'], unique=False)
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.drop_column('posts', 'comment_count')
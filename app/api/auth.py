@@ -1,36 +1,23 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..db import models, schemas
+from ..db.constraints import unique_violation
 from ..core.security import (
     get_password_hash, 
     authenticate_user, 
-    create_access_token,
-    get_user_by_username,
-    get_user_by_email
+    create_access_token
 )
 from ..core.config import settings
+from ..services.rate_limit import limit_auth
 
 router = APIRouter()
 
-@router.post("/register", response_model=schemas.User)
+@router.post("/register", response_model=schemas.User, dependencies=[Depends(limit_auth)])
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
-    if db_user:
-        raise HTTPException(
-            status_code=400,
-            detail="Email already registered"
-        )
-    
-    db_user = get_user_by_username(db, username=user.username)
-    if db_user:
-        raise HTTPException(
-            status_code=400,
-            detail="Username already taken"
-        )
-    
     hashed_password = get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
@@ -38,11 +25,25 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         password_hash=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # The unique indexes decide; no lookups before the INSERT
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, models.User.email):
+            raise HTTPException(
+                status_code=400,
+                detail="Email already registered"
+            )
+        if unique_violation(e, models.User.username):
+            raise HTTPException(
+                status_code=400,
+                detail="Username already taken"
+            )
+        raise
     return db_user
 
-@router.post("/login", response_model=schemas.Token)
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(limit_auth)])
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
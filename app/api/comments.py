@@ -1,21 +1,32 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, selectinload
 from ..db.database import get_db
 from ..db import models, schemas
 from ..core.security import get_current_user
+from ..services.events import event_hub
+from ..services import user_stats, fieldsets, post_comments
+from ..services.archival import load_comments
+from ..services.single_flight import read_coalescer
+from ..services.rate_limit import limit_comments
 
 router = APIRouter()
 
-@router.post("/posts/{post_id}/comments", response_model=schemas.Comment)
+@router.post("/posts/{post_id}/comments", response_model=schemas.Comment, dependencies=[Depends(limit_comments)])
 def create_comment(
     post_id: int,
     comment: schemas.CommentCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if post is None:
+    # Bumping the counter locks the post row, so the archival job can't move
+    # this post's comments until commit
+    updated = db.query(models.Post).filter(
+        models.Post.id == post_id,
+        models.Post.deleted_at.is_(None)
+    ).update({models.Post.comment_count: models.Post.comment_count + 1}, synchronize_session=False)
+    if not updated:
         raise HTTPException(status_code=404, detail="Post not found")
     
     db_comment = models.Comment(
@@ -24,20 +35,41 @@ def create_comment(
         post_id=post_id
     )
     db.add(db_comment)
+    user_stats.adjust(db, current_user.id, comment_count=1)
     db.commit()
-    db.refresh(db_comment)
+    if event_hub.has_subscribers(post_id):
+        event_hub.publish([post_id], "comment_created", schemas.Comment.model_validate(db_comment).model_dump(mode="json"))
     return db_comment
 
-@router.get("/posts/{post_id}/comments", response_model=List[schemas.Comment])
-def read_comments(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+def _load_comments(db: Session, post_id: int, fieldset: Optional[fieldsets.Fieldset]) -> list:
+    post = db.query(models.Post.archived_at).filter(
+        models.Post.id == post_id,
+        models.Post.deleted_at.is_(None)
+    ).first()
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    comments = db.query(models.Comment).filter(
-        models.Comment.post_id == post_id
-    ).order_by(models.Comment.created_at).all()
-    return comments
+    archived_ids = [post_id] if post.archived_at is not None else []
+    if fieldset is None:
+        # Validated here so the result can be shared by coalesced requests
+        return [
+            schemas.Comment.model_validate(comment)
+            for comment in load_comments(db, [post_id], archived_ids, lambda model: [selectinload(model.user)])
+        ]
+    
+    comments = load_comments(db, [post_id], archived_ids, lambda model: fieldsets.comment_options(fieldset, model))
+    return fieldsets.serialize_comments(comments, fieldset)
+
+@router.get("/posts/{post_id}/comments", response_model=List[schemas.Comment])
+def read_comments(
+    post_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated comment fields to return"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to embed: user"),
+    db: Session = Depends(get_db)
+):
+    fieldset = fieldsets.parse(fields, include, fieldsets.COMMENT_FIELDS, fieldsets.COMMENT_INCLUDES)
+    comments = read_coalescer.do(("read_comments", post_id, fieldset), lambda: _load_comments(db, post_id, fieldset))
+    return comments if fieldset is None else JSONResponse(comments)
 
 @router.delete("/comments/{comment_id}")
 def delete_comment(
@@ -47,11 +79,20 @@ def delete_comment(
 ):
     comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
     if comment is None:
+        comment = db.query(models.ArchivedComment).filter(models.ArchivedComment.id == comment_id).first()
+    if comment is None or db.query(models.Post.deleted_at).filter(
+        models.Post.id == comment.post_id
+    ).scalar() is not None:
+        # Comments of a tombstoned post are already gone from its stats
         raise HTTPException(status_code=404, detail="Comment not found")
     
     if comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    # Post row first, in the same lock order as create_comment
+    post_comments.adjust_counts(db, {comment.post_id: -1})
+    user_stats.adjust(db, comment.user_id, comment_count=-1)
     db.delete(comment)
     db.commit()
+    event_hub.publish([comment.post_id], "comment_deleted", {"id": comment_id, "post_id": comment.post_id})
     return {"message": "Comment deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.security import get_current_user
+from ..db.database import get_db
+from ..db import models
+from ..services.events import FEED, event_hub
+
+router = APIRouter()
+
+def _parse_post_ids(posts: Optional[str]):
+    if not posts:
+        return set()
+    try:
+        post_ids = {int(post_id) for post_id in posts.split(",") if post_id.strip()}
+    except ValueError:
+        raise HTTPException(status_code=422, detail="posts must be a comma-separated list of ids")
+    if len(post_ids) > settings.EVENTS_MAX_POSTS_PER_SUBSCRIPTION:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.EVENTS_MAX_POSTS_PER_SUBSCRIPTION} posts per subscription"
+        )
+    return post_ids
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    feed: bool = Query(False, description="Receive post_created/post_deleted for all posts"),
+    posts: Optional[str] = Query(None, description="Comma-separated post ids to follow"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Server-sent events stream.
+
+    Events: ``post_created`` and ``post_deleted`` (feed), ``comment_created``,
+    ``comment_deleted`` and coalesced ``reactions`` counts (followed posts).
+    A client that falls too far behind gets a ``resync`` event and is
+    disconnected; it should refetch and reconnect.
+    """
+    topics = _parse_post_ids(posts)
+    if feed:
+        topics.add(FEED)
+    if not topics:
+        raise HTTPException(status_code=422, detail="Subscribe to the feed and/or at least one post")
+    
+    # The stream can stay open for hours; don't hold a pooled connection
+    db.close()
+    subscription = event_hub.subscribe(topics)
+    
+    async def messages():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if subscription.overflowed:
+                    yield b"event: resync\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        messages(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,104 @@
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request, Response
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..services.image_cache import image_cache
+from ..utils.file_response import OpenFileResponse
+
+router = APIRouter()
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Resolve a single ``Range`` header to ``(start, end)`` inclusive.
+
+    Returns None to serve the whole file (no header, or a multi-range request
+    we don't support). Raises 416 when the range can't be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+@router.api_route("/{object_key:path}", methods=["GET", "HEAD"])
+def read_image(object_key: str, request: Request):
+    """Serve an image object through the local disk cache.
+
+    Supports ``If-None-Match`` and single ``Range`` requests. With
+    IMAGE_CACHE_ACCEL_REDIRECT_PREFIX set, nginx sends the cached file itself
+    (sendfile, zero-copy) and handles the range.
+    """
+    image = image_cache.get(object_key)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    etag = f'"{image.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.IMAGE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.inc("image_proxy_not_modified_total")
+        return Response(status_code=304, headers=headers)
+    
+    if settings.IMAGE_CACHE_ACCEL_REDIRECT_PREFIX:
+        headers["X-Accel-Redirect"] = settings.IMAGE_CACHE_ACCEL_REDIRECT_PREFIX + image_cache.relative_path(image)
+        metrics.inc("image_proxy_bytes_served_total", image.size)
+        return Response(headers=headers, media_type=image.content_type)
+    
+    file = image_cache.open(image)
+    if file is None:
+        # Evicted by another worker between lookup and open
+        image = image_cache.get(object_key)
+        file = image_cache.open(image) if image is not None else None
+        if file is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+    
+    try:
+        byte_range = _parse_range(request.headers.get("range"), image.size)
+    except HTTPException:
+        file.close()
+        raise
+    
+    if byte_range is None:
+        start, length, status_code = 0, image.size, 200
+    else:
+        start, end = byte_range
+        length, status_code = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{image.size}"
+    
+    metrics.inc("image_proxy_bytes_served_total", length)
+    return OpenFileResponse(
+        file,
+        offset=start,
+        length=length,
+        status_code=status_code,
+        headers=headers,
+        media_type=image.content_type,
+        method=request.method
+    )
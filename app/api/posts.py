@@ -1,56 +1,231 @@
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session, joinedload, selectinload, undefer
+from sqlalchemy import desc, func, select, union_all
 from ..db.database import get_db
 from ..db import models, schemas
-from ..core.security import get_current_user
+from ..core.config import settings
+from ..core.security import get_current_user, get_current_user_optional
 from ..utils.minio_client import minio_client
+from ..services.image_processing import image_processor, IMAGE_STATUS_READY
+from ..services import stored_objects, object_deletion, search, user_stats, fieldsets, post_purge, post_comments
+from ..services.reaction_buffer import reaction_counts_many, viewer_reactions
+from ..services.post_details import load_post_details
+from ..services.events import FEED, event_hub
+from ..services.single_flight import read_coalescer
+from ..services.archival import load_comments
+from ..services.rate_limit import limit_posts
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.Post])
+UPLOAD_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+VARIANT_COLUMNS = (
+    "thumbnail_key", "medium_key", "webp_key",
+    "image_width", "image_height", "placeholder_hash", "image_status",
+)
+
+MAX_BATCH_IDS = 100
+
+def _create_post_record(
+    db: Session,
+    title: str,
+    description: Optional[str],
+    object_name: str,
+    user_id: int,
+    shared: bool = True
+) -> models.Post:
+    """Insert a post for a stored image; ``shared=False`` for bytes no other post can reference.
+
+    The caller has already taken the post's reference to the image with
+    ``stored_objects.acquire``.
+    """
+    db_post = models.Post(
+        title=title,
+        description=description,
+        image_key=object_name,
+        user_id=user_id
+    )
+    
+    # Re-use the variants of a post that already shares this image
+    processed = db.query(models.Post).filter(
+        models.Post.image_key == object_name,
+        models.Post.image_status == IMAGE_STATUS_READY
+    ).first() if shared else None
+    if processed is not None:
+        for column in VARIANT_COLUMNS:
+            setattr(db_post, column, getattr(processed, column))
+    
+    db.add(db_post)
+    user_stats.adjust(db, user_id, post_count=1)
+    db.commit()
+    
+    # Variants are generated in the background; the response doesn't wait for them
+    if processed is None:
+        image_processor.submit(db_post.id, object_name)
+    if event_hub.has_subscribers(FEED):
+        event_hub.publish([FEED], "post_created", schemas.Post.model_validate(db_post).model_dump(mode="json"))
+    return db_post
+
+FIELDS_DESCRIPTION = "Comma-separated post fields to return, e.g. id,thumbnail_url,like_count"
+INCLUDE_DESCRIPTION = "Comma-separated relations to embed: user"
+
+@router.get("/", response_model=List[schemas.FeedPost])
 def read_posts(
     skip: int = Query(0, alias="page", ge=0),
     limit: int = Query(10, ge=1, le=100),
     sort: str = Query("new", regex="^(new|popular)$"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_user_optional)
 ):
-    query = db.query(models.Post)
+    """Feed page with comment counts and previews.
+
+    ``my_reaction`` is the authenticated caller's reaction to each post.
+    """
+    fieldset = fieldsets.parse(fields, include, fieldsets.FEED_FIELDS, fieldsets.FEED_INCLUDES)
+    query = db.query(models.Post).filter(models.Post.deleted_at.is_(None))
     
     if sort == "popular":
-        query = query.outerjoin(models.Reaction).join(models.User, models.User.id == models.Post.user_id).group_by(models.Post.id).order_by(
-            desc(func.count(models.Reaction.id))
+        # Archived posts keep their ranking
+        reactions = union_all(
+            select(models.Reaction.post_id), select(models.ArchivedReaction.post_id)
+        ).subquery()
+        query = query.outerjoin(reactions, reactions.c.post_id == models.Post.id).group_by(models.Post.id).order_by(
+            desc(func.count(reactions.c.post_id))
         )
     else:
-        query = query.join(models.User, models.User.id == models.Post.user_id).order_by(desc(models.Post.created_at))
+        query = query.order_by(desc(models.Post.created_at))
     
-    posts = query.offset(skip * limit).limit(limit).all()
-    return posts
+    if fieldset is None:
+        # Authors come in one extra query instead of a lazy load per post
+        posts = query.options(selectinload(models.Post.user)).offset(skip * limit).limit(limit).all()
+        previews = post_comments.load_previews(db, posts, settings.FEED_COMMENT_PREVIEW_SIZE)
+        mine = viewer_reactions(db, current_user.id, [post.id for post in posts]) if current_user else {}
+        return [
+            schemas.FeedPost.model_validate(post).model_copy(update={
+                "comment_preview": previews.get(post.id, []),
+                "my_reaction": mine.get(post.id)
+            })
+            for post in posts
+        ]
+    
+    options = fieldsets.post_options(fieldset)
+    if "comment_preview" in fieldset.include:
+        options += [undefer(models.Post.comment_count), undefer(models.Post.archived_at)]
+    posts = query.options(*options).offset(skip * limit).limit(limit).all()
+    items = fieldsets.serialize_posts(db, posts, fieldset)
+    if "comment_preview" in fieldset.include:
+        previews = post_comments.load_previews(db, posts, settings.FEED_COMMENT_PREVIEW_SIZE)
+        for post, item in zip(posts, items):
+            item["comment_preview"] = [comment.model_dump(mode="json") for comment in previews.get(post.id, [])]
+    if current_user is not None and "my_reaction" in fieldset.fields:
+        mine = viewer_reactions(db, current_user.id, [post.id for post in posts])
+        for post, item in zip(posts, items):
+            item["my_reaction"] = mine.get(post.id)
+    return JSONResponse(items)
 
-@router.get("/{post_id}", response_model=schemas.PostWithDetails)
-def read_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if post is None:
-        raise HTTPException(status_code=404, detail="Post not found")
+@router.get("/search", response_model=schemas.PostPage)
+def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=200),
+    db: Session = Depends(get_db)
+):
+    posts, next_cursor = search.search_posts(db, q, limit, cursor)
+    return schemas.PostPage(items=posts, next_cursor=next_cursor)
+
+@router.get("/batch", response_model=schemas.PostBatch)
+def read_posts_batch(
+    ids: str = Query(..., description="Comma-separated post ids, at most 100"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=INCLUDE_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    """Hydrate many posts at once, in request order; unknown ids are null"""
+    try:
+        post_ids = [int(post_id) for post_id in ids.split(",") if post_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be a comma-separated list of integers")
+    if not post_ids or len(post_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"Between 1 and {MAX_BATCH_IDS} ids are required")
     
-    like_count = db.query(models.Reaction).filter(
-        models.Reaction.post_id == post_id,
-        models.Reaction.reaction_type == "like"
-    ).count()
+    fieldset = fieldsets.parse(fields, include, fieldsets.POST_FIELDS, fieldsets.POST_INCLUDES)
+    unique_ids = list(dict.fromkeys(post_ids))
+    if fieldset is None:
+        found = load_post_details(db, unique_ids)
+    else:
+        posts = db.query(models.Post).options(*fieldsets.post_options(fieldset)).filter(
+            models.Post.id.in_(unique_ids),
+            models.Post.deleted_at.is_(None)
+        ).all()
+        found = dict(zip((post.id for post in posts), fieldsets.serialize_posts(db, posts, fieldset)))
     
-    dislike_count = db.query(models.Reaction).filter(
-        models.Reaction.post_id == post_id,
-        models.Reaction.reaction_type == "dislike"
-    ).count()
+    items = [found.get(post_id) for post_id in post_ids]
+    missing = [post_id for post_id in unique_ids if post_id not in found]
+    if fieldset is not None:
+        return JSONResponse({"items": items, "missing": missing})
+    return schemas.PostBatch(items=items, missing=missing)
+
+def _load_post(db: Session, post_id: int, fieldset: Optional[fieldsets.Fieldset]):
+    """Post details as a schema (full representation) or a dict (sparse)"""
+    if fieldset is None:
+        post = load_post_details(db, [post_id], with_comments=True).get(post_id)
+        if post is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return post
     
-    post_dict = post.__dict__.copy()
-    post_dict["like_count"] = like_count
-    post_dict["dislike_count"] = dislike_count
+    options = fieldsets.post_options(fieldset)
+    if "comments" in fieldset.include:
+        options.append(undefer(models.Post.archived_at))
+    post = db.query(models.Post).options(*options).filter(
+        models.Post.id == post_id,
+        models.Post.deleted_at.is_(None)
+    ).first()
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
     
-    return post_dict
+    counts = reaction_counts_many(db, [post_id])[post_id] if fieldsets.needs_counts(fieldset) else None
+    post_comments = None
+    if "comments" in fieldset.include:
+        archived_ids = [post_id] if post.archived_at is not None else []
+        post_comments = [
+            schemas.Comment.model_validate(comment).model_dump(mode="json")
+            for comment in load_comments(db, [post_id], archived_ids, lambda model: [joinedload(model.user)])
+        ]
+    return fieldsets.serialize_post(post, fieldset, counts, post_comments)
+
+@router.get("/{post_id}", response_model=schemas.PostWithDetails)
+def read_post(
+    post_id: int,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description="Comma-separated relations to embed: user, comments"),
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_user_optional)
+):
+    fieldset = fieldsets.parse(fields, include, fieldsets.FEED_FIELDS, fieldsets.POST_DETAIL_INCLUDES)
+    # The coalesced result is shared between callers: it is built without
+    # viewer data, which is added to a copy per request
+    post = read_coalescer.do(("read_post", post_id, fieldset), lambda: _load_post(db, post_id, fieldset))
+    if fieldset is None:
+        if current_user is None:
+            return post
+        mine = viewer_reactions(db, current_user.id, [post_id]).get(post_id)
+        return post.model_copy(update={"my_reaction": mine})
+    if current_user is not None and "my_reaction" in fieldset.fields:
+        post = {**post, "my_reaction": viewer_reactions(db, current_user.id, [post_id]).get(post_id)}
+    return JSONResponse(post)
 
-@router.post("/", response_model=schemas.Post)
+@router.post("/", response_model=schemas.Post, dependencies=[Depends(limit_posts)])
 def create_post(
     title: str = Form(...),
     description: str = Form(None),
@@ -58,18 +233,92 @@ def create_post(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    image_url = minio_client.upload_file(image)
+    object_name, size = minio_client.hash_file(image)
+    # Referencing the bytes before looking for them in storage keeps a queued
+    # deletion of an identical image from removing the object we re-use
+    stored_objects.acquire(db, object_name, size, image.content_type)
+    stored = minio_client.store_file(image, object_name, size)
+    return _create_post_record(
+        db, title, description, stored.object_name, current_user.id, shared=stored.deduplicated
+    )
+
+@router.post("/uploads", response_model=schemas.UploadTicket, dependencies=[Depends(limit_posts)])
+def create_upload(
+    upload: schemas.UploadCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Issue a presigned POST policy so the client uploads the image to storage directly"""
+    if upload.content_type not in settings.DIRECT_UPLOAD_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Only image files are allowed")
     
-    db_post = models.Post(
-        title=title,
-        description=description,
-        image_url=image_url,
-        user_id=current_user.id
+    upload_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(seconds=settings.DIRECT_UPLOAD_EXPIRY_SECONDS)
+    
+    # New bytes always go to a random key; finalize_upload hashes what was
+    # actually uploaded and deduplicates then
+    object_name = f"{uuid.uuid4()}.{UPLOAD_EXTENSIONS.get(upload.content_type, 'jpg')}"
+    presigned = minio_client.presigned_upload(
+        object_name,
+        upload.content_type,
+        settings.DIRECT_UPLOAD_MAX_BYTES,
+        expires_at.replace(tzinfo=timezone.utc)
     )
-    db.add(db_post)
+    
+    db.add(models.PendingUpload(
+        id=upload_id,
+        user_id=current_user.id,
+        object_key=object_name,
+        content_type=upload.content_type,
+        max_size=settings.DIRECT_UPLOAD_MAX_BYTES,
+        expires_at=expires_at
+    ))
     db.commit()
-    db.refresh(db_post)
-    return db_post
+    
+    return schemas.UploadTicket(
+        upload_id=upload_id,
+        object_key=object_name,
+        url=presigned["url"],
+        fields=presigned["fields"],
+        max_size=settings.DIRECT_UPLOAD_MAX_BYTES,
+        expires_at=expires_at
+    )
+
+@router.post("/uploads/{upload_id}/finalize", response_model=schemas.Post, dependencies=[Depends(limit_posts)])
+def finalize_upload(
+    upload_id: str,
+    post: schemas.PostCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Create the post for an image the client uploaded via ``create_upload``"""
+    upload = db.query(models.PendingUpload).filter(models.PendingUpload.id == upload_id).first()
+    if upload is None or upload.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    stat = minio_client.stat_file(upload.object_key)
+    if stat is None:
+        raise HTTPException(status_code=400, detail="Image has not been uploaded")
+    if stat.size > upload.max_size or stat.content_type != upload.content_type:
+        raise HTTPException(status_code=400, detail="Uploaded image does not match the upload policy")
+    
+    # Deduplicate on the bytes that were actually uploaded: the post gets the
+    # content-addressed object and the uploaded copy is queued for deletion
+    object_name = minio_client.hash_object(upload.object_key)
+    created = stored_objects.acquire(db, object_name, stat.size, stat.content_type)
+    if created and minio_client.stat_file(object_name) is None:
+        minio_client.copy_file(upload.object_key, object_name)
+        deduplicated = False
+    else:
+        minio_client.record_deduplicated(stat.size)
+        deduplicated = True
+    if object_name != upload.object_key:
+        object_deletion.enqueue(db, [upload.object_key], owner_key=upload.object_key)
+    
+    db.delete(upload)
+    return _create_post_record(
+        db, post.title, post.description, object_name, current_user.id, shared=deduplicated
+    )
 
 @router.put("/{post_id}", response_model=schemas.Post)
 def update_post(
@@ -78,7 +327,7 @@ def update_post(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    post = db.query(models.Post).filter(models.Post.id == post_id, models.Post.deleted_at.is_(None)).first()
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
@@ -91,7 +340,6 @@ def update_post(
         post.description = post_update.description
     
     db.commit()
-    db.refresh(post)
     return post
 
 @router.delete("/{post_id}")
@@ -100,15 +348,22 @@ def delete_post(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    post = db.query(models.Post).filter(models.Post.id == post_id, models.Post.deleted_at.is_(None)).first()
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
     if post.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    minio_client.delete_file(post.image_url)
+    # Shared images are only removed with the last post that references them.
+    # Storage deletion is queued in this transaction and done by a worker.
+    if stored_objects.release(db, post.image_key):
+        object_deletion.enqueue(db, stored_objects.object_keys(post), owner_key=post.image_key)
     
-    db.delete(post)
+    user_stats.release_post(db, post)
+    # Comments and reactions go with the post (ON DELETE CASCADE), or are
+    # purged in the background when there are too many of them
+    post_purge.delete_post(db, post)
     db.commit()
+    event_hub.publish([FEED, post_id], "post_deleted", {"id": post_id})
     return {"message": "Post deleted successfully"}
\ No newline at end of file
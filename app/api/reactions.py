@@ -1,70 +1,109 @@
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..db import models, schemas
 from ..core.security import get_current_user
+from ..services.reaction_buffer import reaction_buffer, reaction_counts, upsert_reactions
+from ..services.events import reaction_count_publisher
+from ..services import user_stats
+from ..services.archival import promote_reactions
+from ..services.single_flight import read_coalescer
+from ..services.rate_limit import limit_reactions
 
 router = APIRouter()
 
-@router.post("/posts/{post_id}/reaction", response_model=schemas.Reaction)
+@router.post("/posts/{post_id}/reaction", response_model=schemas.Reaction, dependencies=[Depends(limit_reactions)])
 def create_or_update_reaction(
     post_id: int,
     reaction: schemas.ReactionCreate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    # Shared lock: the archival job can't move this post's reactions until commit
+    post = db.query(models.Post).filter(
+        models.Post.id == post_id,
+        models.Post.deleted_at.is_(None)
+    ).with_for_update(read=True).first()
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    existing_reaction = db.query(models.Reaction).filter(
-        models.Reaction.user_id == current_user.id,
-        models.Reaction.post_id == post_id
-    ).first()
-    
-    if existing_reaction:
-        existing_reaction.reaction_type = reaction.reaction_type
-        db.commit()
-        db.refresh(existing_reaction)
-        return existing_reaction
-    else:
-        db_reaction = models.Reaction(
+    if reaction_buffer.enabled:
+        # Acknowledged from memory; the row is written by the next flush
+        reaction_buffer.put(current_user.id, post_id, reaction.reaction_type.value)
+        reaction_count_publisher.mark(post_id)
+        return schemas.Reaction(
             user_id=current_user.id,
             post_id=post_id,
-            reaction_type=reaction.reaction_type
+            reaction_type=reaction.reaction_type,
+            created_at=datetime.now(timezone.utc)
         )
-        db.add(db_reaction)
-        db.commit()
-        db.refresh(db_reaction)
-        return db_reaction
+    
+    if post.archived_at is not None:
+        promote_reactions(db, post_id, [current_user.id])
+    previous = db.query(models.Reaction.reaction_type).filter(
+        models.Reaction.user_id == current_user.id,
+        models.Reaction.post_id == post_id
+    ).with_for_update().scalar()
+    upsert_reactions(db, [{
+        "user_id": current_user.id,
+        "post_id": post_id,
+        "reaction_type": models.ReactionType(reaction.reaction_type.value)
+    }])
+    user_stats.adjust(
+        db, post.user_id,
+        likes_received=user_stats.like_delta(previous.value if previous else None, reaction.reaction_type.value)
+    )
+    db.commit()
+    reaction_count_publisher.mark(post_id)
+    return db.query(models.Reaction).filter(
+        models.Reaction.user_id == current_user.id,
+        models.Reaction.post_id == post_id
+    ).first()
 
-@router.get("/posts/{post_id}/reactions", response_model=schemas.ReactionSummary)
-def get_post_reactions(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if post is None:
+def _load_reaction_summary(db: Session, post_id: int) -> schemas.ReactionSummary:
+    if db.query(models.Post.id).filter(models.Post.id == post_id, models.Post.deleted_at.is_(None)).first() is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    like_count = db.query(models.Reaction).filter(
-        models.Reaction.post_id == post_id,
-        models.Reaction.reaction_type == "like"
-    ).count()
-    
-    dislike_count = db.query(models.Reaction).filter(
-        models.Reaction.post_id == post_id,
-        models.Reaction.reaction_type == "dislike"
-    ).count()
-    
+    like_count, dislike_count = reaction_counts(db, post_id)
     return schemas.ReactionSummary(
         like_count=like_count,
         dislike_count=dislike_count
     )
 
-@router.delete("/posts/{post_id}/reaction")
+@router.get("/posts/{post_id}/reactions", response_model=schemas.ReactionSummary)
+def get_post_reactions(post_id: int, db: Session = Depends(get_db)):
+    return read_coalescer.do(("get_post_reactions", post_id), lambda: _load_reaction_summary(db, post_id))
+
+@router.delete("/posts/{post_id}/reaction", dependencies=[Depends(limit_reactions)])
 def delete_reaction(
     post_id: int,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
+    if reaction_buffer.enabled:
+        buffered, reaction_type = reaction_buffer.pending_reaction(current_user.id, post_id)
+        exists = reaction_type is not None if buffered else db.query(models.Reaction.id).filter(
+            models.Reaction.user_id == current_user.id,
+            models.Reaction.post_id == post_id
+        ).first() is not None or db.query(models.ArchivedReaction.post_id).filter(
+            models.ArchivedReaction.user_id == current_user.id,
+            models.ArchivedReaction.post_id == post_id
+        ).first() is not None
+        if not exists:
+            raise HTTPException(status_code=404, detail="Reaction not found")
+        reaction_buffer.put(current_user.id, post_id, None)
+        reaction_count_publisher.mark(post_id)
+        return {"message": "Reaction removed successfully"}
+    
+    post = db.query(models.Post.user_id, models.Post.archived_at).filter(
+        models.Post.id == post_id,
+        models.Post.deleted_at.is_(None)
+    ).with_for_update(read=True).first()
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if post.archived_at is not None:
+        promote_reactions(db, post_id, [current_user.id])
     reaction = db.query(models.Reaction).filter(
         models.Reaction.user_id == current_user.id,
         models.Reaction.post_id == post_id
@@ -73,6 +112,8 @@ def delete_reaction(
     if reaction is None:
         raise HTTPException(status_code=404, detail="Reaction not found")
     
+    user_stats.adjust(db, post.user_id, likes_received=user_stats.like_delta(reaction.reaction_type.value, None))
     db.delete(reaction)
     db.commit()
+    reaction_count_publisher.mark(post_id)
     return {"message": "Reaction removed successfully"}
\ No newline at end of file
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..db import models, schemas
-from ..core.security import get_current_user, get_password_hash, get_user_by_email
+from sqlalchemy.exc import IntegrityError
+from ..db.constraints import unique_violation
+from ..core.security import get_current_user, get_password_hash
+from ..services import user_stats, fieldsets, export
+from ..services.rate_limit import limit_exports
+from ..utils.cursor import decode_cursor, encode_cursor
 
 router = APIRouter()
 
@@ -17,12 +24,6 @@ def update_user_me(
     current_user: models.User = Depends(get_current_user)
 ):
     if user_update.email:
-        existing_user = get_user_by_email(db, email=user_update.email)
-        if existing_user and existing_user.id != current_user.id:
-            raise HTTPException(
-                status_code=400,
-                detail="Email already registered"
-            )
         current_user.email = user_update.email
     
     if user_update.password:
@@ -31,6 +32,73 @@ def update_user_me(
     if user_update.avatar_url is not None:
         current_user.avatar_url = user_update.avatar_url
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
\ No newline at end of file
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if unique_violation(e, models.User.email):
+            raise HTTPException(
+                status_code=400,
+                detail="Email already registered"
+            )
+        raise
+    return current_user
+
+@router.get("/me/export", dependencies=[Depends(limit_exports)])
+def export_user_data(
+    format: str = Query("ndjson", regex="^(ndjson|zip)$"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Everything the user created as streamed NDJSON, or a zip that also holds their images"""
+    filename = f"haivler-export-{current_user.id}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "zip":
+        return StreamingResponse(export.export_zip(current_user.id), media_type="application/zip", headers=headers)
+    return StreamingResponse(export.export_ndjson(current_user.id), media_type="application/x-ndjson", headers=headers)
+
+def _get_user(db: Session, user_id: int) -> models.User:
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.get("/{user_id}", response_model=schemas.UserProfile)
+def read_user_profile(user_id: int, db: Session = Depends(get_db)):
+    """Public profile with counters read from ``user_stats`` (no aggregation)"""
+    user = _get_user(db, user_id)
+    return schemas.UserProfile(
+        id=user.id,
+        username=user.username,
+        avatar_url=user.avatar_url,
+        created_at=user.created_at,
+        **user_stats.get(db, user_id)
+    )
+
+@router.get("/{user_id}/posts", response_model=schemas.PostPage)
+def read_user_posts(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=200),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return"),
+    include: Optional[str] = Query(None, description="Comma-separated relations to embed: user"),
+    db: Session = Depends(get_db)
+):
+    """A user's posts, newest first, keyset-paginated on ``ix_posts_user_id_id``"""
+    fieldset = fieldsets.parse(fields, include, fieldsets.POST_FIELDS, fieldsets.POST_INCLUDES)
+    # Loaded once here; every post's ``user`` resolves from the identity map
+    _get_user(db, user_id)
+    query = db.query(models.Post).filter(models.Post.user_id == user_id, models.Post.deleted_at.is_(None))
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(models.Post.id < last_id)
+    if fieldset is not None:
+        query = query.options(*fieldsets.post_options(fieldset))
+    
+    posts = query.order_by(models.Post.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(posts[-1].id)
+    if fieldset is not None:
+        return JSONResponse({"items": fieldsets.serialize_posts(db, posts, fieldset), "next_cursor": next_cursor})
+    return schemas.PostPage(items=posts, next_cursor=next_cursor)
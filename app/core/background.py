@@ -0,0 +1,46 @@
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class PeriodicWorker:
+    """Runs ``run_once`` on a daemon thread every ``interval`` seconds.
+
+    Subclasses implement ``run_once``; exceptions are logged and the loop
+    keeps going. ``stop`` wakes the thread immediately and waits for it.
+    """
+
+    name = "periodic-worker"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"{self.name} failed: {e}")
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -20,7 +20,105 @@ class Settings:
     MINIO_SECRET_KEY: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
     MINIO_BUCKET_NAME: str = os.getenv("MINIO_BUCKET_NAME", "haivler-images")
     MINIO_SECURE: bool = os.getenv("MINIO_SECURE", "False").lower() == "true"
-    
+    # Presigned GET URLs are generated per request and cached per (key, time bucket)
+    PRESIGNED_URL_EXPIRY_SECONDS: int = int(os.getenv("PRESIGNED_URL_EXPIRY_SECONDS", "7200"))
+    PRESIGNED_URL_BUCKET_SECONDS: int = int(os.getenv("PRESIGNED_URL_BUCKET_SECONDS", "900"))
+    PRESIGNED_URL_CACHE_SIZE: int = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "20000"))
+    # "minio" talks to MINIO_ENDPOINT, "memory" keeps objects in process (local runs, benchmarks)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "minio")
+
+    # Caching image proxy (GET /api/v1/images/{key})
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "/tmp/haivler-image-cache")
+    IMAGE_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+    IMAGE_CACHE_FETCH_TIMEOUT_SECONDS: float = float(os.getenv("IMAGE_CACHE_FETCH_TIMEOUT_SECONDS", "30"))
+    IMAGE_CACHE_CONTROL: str = os.getenv("IMAGE_CACHE_CONTROL", "public, max-age=31536000, immutable")
+    # When set (e.g. "/_image_cache/"), nginx serves cached files via X-Accel-Redirect + sendfile
+    IMAGE_CACHE_ACCEL_REDIRECT_PREFIX: str = os.getenv("IMAGE_CACHE_ACCEL_REDIRECT_PREFIX", "")
+    # When set, post image URLs point at the proxy instead of presigned MinIO URLs
+    IMAGE_PROXY_BASE_URL: str = os.getenv("IMAGE_PROXY_BASE_URL", "").rstrip("/")
+
+    # Direct-to-storage uploads (presigned POST policy + finalize)
+    DIRECT_UPLOAD_MAX_BYTES: int = int(os.getenv("DIRECT_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+    DIRECT_UPLOAD_EXPIRY_SECONDS: int = int(os.getenv("DIRECT_UPLOAD_EXPIRY_SECONDS", "900"))
+    DIRECT_UPLOAD_CONTENT_TYPES: list = os.getenv(
+        "DIRECT_UPLOAD_CONTENT_TYPES",
+        "image/jpeg,image/png,image/gif,image/webp"
+    ).split(",")
+    # Unfinalized uploads are removed this long after their policy expired
+    UPLOAD_ORPHAN_GRACE_SECONDS: int = int(os.getenv("UPLOAD_ORPHAN_GRACE_SECONDS", "3600"))
+    UPLOAD_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("UPLOAD_SWEEP_INTERVAL_SECONDS", "300"))
+
+    # Asynchronous object deletion queue
+    OBJECT_DELETION_INTERVAL_SECONDS: float = float(os.getenv("OBJECT_DELETION_INTERVAL_SECONDS", "5"))
+    OBJECT_DELETION_BATCH_SIZE: int = int(os.getenv("OBJECT_DELETION_BATCH_SIZE", "500"))
+    OBJECT_DELETION_MAX_BACKOFF_SECONDS: int = int(os.getenv("OBJECT_DELETION_MAX_BACKOFF_SECONDS", "3600"))
+
+    # Image post-processing (thumbnail / medium / WebP variants)
+    IMAGE_PROCESSING_WORKERS: int = int(os.getenv("IMAGE_PROCESSING_WORKERS", "2"))
+    IMAGE_PROCESSING_QUEUE_SIZE: int = int(os.getenv("IMAGE_PROCESSING_QUEUE_SIZE", "100"))
+    IMAGE_THUMBNAIL_SIZE: int = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "320"))
+    IMAGE_MEDIUM_SIZE: int = int(os.getenv("IMAGE_MEDIUM_SIZE", "1080"))
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+
+    # Write-behind reaction buffer: coalesce clicks in memory, flush in batches
+    REACTION_WRITE_BEHIND: bool = os.getenv("REACTION_WRITE_BEHIND", "False").lower() == "true"
+    REACTION_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("REACTION_FLUSH_INTERVAL_SECONDS", "0.5"))
+    REACTION_BUFFER_MAX_ENTRIES: int = int(os.getenv("REACTION_BUFFER_MAX_ENTRIES", "10000"))
+
+    # Server-sent events (GET /api/v1/events)
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+    EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    EVENTS_REACTION_INTERVAL_SECONDS: float = float(os.getenv("EVENTS_REACTION_INTERVAL_SECONDS", "1"))
+    EVENTS_MAX_POSTS_PER_SUBSCRIPTION: int = int(os.getenv("EVENTS_MAX_POSTS_PER_SUBSCRIPTION", "100"))
+    # memory: streams only see writes of their own worker process; redis: of every worker and host
+    EVENTS_BACKEND: str = os.getenv("EVENTS_BACKEND", "memory")  # memory | redis
+    EVENTS_REDIS_URL: str = os.getenv("EVENTS_REDIS_URL", "redis://localhost:6379/0")
+    EVENTS_REDIS_CHANNEL: str = os.getenv("EVENTS_REDIS_CHANNEL", "haivler:events")
+
+    # Concurrent identical reads (post, comments, reaction counts) share one computation
+    SINGLE_FLIGHT_ENABLED: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "True").lower() == "true"
+    SINGLE_FLIGHT_TIMEOUT_SECONDS: float = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "5"))
+
+    # Token-bucket rate limits per route class, "<requests>/<seconds>"
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    RATE_LIMIT_AUTH: str = os.getenv("RATE_LIMIT_AUTH", "10/60")
+    RATE_LIMIT_POSTS: str = os.getenv("RATE_LIMIT_POSTS", "30/3600")
+    RATE_LIMIT_COMMENTS: str = os.getenv("RATE_LIMIT_COMMENTS", "30/60")
+    RATE_LIMIT_REACTIONS: str = os.getenv("RATE_LIMIT_REACTIONS", "120/60")
+    RATE_LIMIT_EXPORTS: str = os.getenv("RATE_LIMIT_EXPORTS", "5/3600")
+
+    # Cold archival: comments/reactions of old posts move to compact archive tables
+    ARCHIVE_ENABLED: bool = os.getenv("ARCHIVE_ENABLED", "False").lower() == "true"
+    ARCHIVE_AFTER_DAYS: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+    ARCHIVE_INTERVAL_SECONDS: float = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "100"))
+
+    # Posts with more comments + reactions than this are tombstoned on delete
+    # and purged in chunks by a background worker (0 deletes every post inline)
+    POST_PURGE_THRESHOLD: int = int(os.getenv("POST_PURGE_THRESHOLD", "10000"))
+    POST_PURGE_BATCH_SIZE: int = int(os.getenv("POST_PURGE_BATCH_SIZE", "1000"))
+    POST_PURGE_INTERVAL_SECONDS: float = float(os.getenv("POST_PURGE_INTERVAL_SECONDS", "10"))
+
+    # Comments embedded in each feed item (0 disables the preview query)
+    FEED_COMMENT_PREVIEW_SIZE: int = int(os.getenv("FEED_COMMENT_PREVIEW_SIZE", "2"))
+
+    # Request tracing: spans exported as OTLP/JSON to a file or an OTLP/HTTP endpoint
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")  # none | file | otlp
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "/tmp/haivler-traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "haivler-api")
+    TRACING_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACING_EXPORT_INTERVAL_SECONDS", "2"))
+    TRACING_QUEUE_SIZE: int = int(os.getenv("TRACING_QUEUE_SIZE", "20000"))
+    TRACING_BATCH_SIZE: int = int(os.getenv("TRACING_BATCH_SIZE", "512"))
+
+    # Database/storage initialization at startup is retried in the background
+    STARTUP_RETRY_MAX_DELAY_SECONDS: float = float(os.getenv("STARTUP_RETRY_MAX_DELAY_SECONDS", "30"))
+
     # CORS Origins - can be set as comma-separated string in env
     CORS_ORIGINS: list = os.getenv(
         "CORS_ORIGINS", 
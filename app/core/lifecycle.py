@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """Tracks which external dependencies have been initialized.
+
+    ``/health`` only says the process is alive; ``/ready`` reports this state
+    so load balancers hold traffic until the database and storage are usable.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checks: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def register(self, name: str):
+        with self._lock:
+            self._checks.setdefault(name, {"ready": False, "error": None})
+
+    def mark_ready(self, name: str):
+        with self._lock:
+            self._checks[name] = {"ready": True, "error": None}
+
+    def mark_failed(self, name: str, error: str):
+        with self._lock:
+            self._checks[name] = {"ready": False, "error": error}
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return bool(self._checks) and all(check["ready"] for check in self._checks.values())
+
+    def snapshot(self) -> Dict[str, Dict[str, Optional[str]]]:
+        with self._lock:
+            return {name: dict(check) for name, check in self._checks.items()}
+
+readiness = Readiness()
+
+def initialize_with_retry(
+    name: str,
+    init: Callable[[], None],
+    stop: threading.Event,
+    max_delay: float,
+    base_delay: float = 0.5
+):
+    """Run ``init`` until it succeeds, backing off exponentially up to ``max_delay``"""
+    readiness.register(name)
+    delay = base_delay
+    while not stop.is_set():
+        try:
+            init()
+            readiness.mark_ready(name)
+            logger.info(f"{name} initialized")
+            return
+        except Exception as e:
+            readiness.mark_failed(name, str(e))
+            logger.warning(f"{name} not available yet ({e}), retrying in {delay:.1f}s")
+            stop.wait(delay)
+            delay = min(delay * 2, max_delay)
+
+class DependencyInitializer:
+    """Initializes external dependencies on a background thread.
+
+    Startup never blocks on the network: the app answers ``/health``
+    immediately and ``/ready`` flips once every dependency is up.
+    """
+
+    def __init__(self, max_delay: float):
+        self.max_delay = max_delay
+        self._dependencies: Dict[str, Callable[[], None]] = {}
+        self._stop = threading.Event()
+        self._threads = []
+
+    def add(self, name: str, init: Callable[[], None]):
+        self._dependencies[name] = init
+        readiness.register(name)
+
+    def start(self):
+        self._stop.clear()
+        for name, init in self._dependencies.items():
+            thread = threading.Thread(
+                target=initialize_with_retry,
+                args=(name, init, self._stop, self.max_delay),
+                name=f"init-{name}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+        return readiness.is_ready()
+
+    def stop(self):
+        self._stop.set()
+        self._threads = []
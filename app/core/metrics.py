@@ -0,0 +1,38 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+class Metrics:
+    """Process-local counters and gauges exposed at /api/v1/system/metrics.
+
+    Counters are incremented in place; gauges are callables evaluated when a
+    snapshot is taken so they always report the current value.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, fn: Callable[[], float]):
+        self._gauges[name] = fn
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            values = dict(self._counters)
+        for name, fn in self._gauges.items():
+            try:
+                values[name] = fn()
+            except Exception:
+                values[name] = None
+        return values
+
+metrics = Metrics()
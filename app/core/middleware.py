@@ -6,6 +6,7 @@ from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from .config import settings
+from .tracing import tracer
 
 class URLObfuscationMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, secret_key: str = None):
@@ -21,9 +22,12 @@ class URLObfuscationMiddleware(BaseHTTPMiddleware):
             "/api/v1/auth/login", 
             "/api/v1/auth/logout",
             "/api/v1/users/me",
+            "/api/v1/users",
             "/api/v1/posts",
             "/api/v1/comments",
-            "/api/v1/reactions"
+            "/api/v1/reactions",
+            "/api/v1/images",
+            "/api/v1/events"
         ]
         
         mapping = {}
@@ -59,6 +63,10 @@ class URLObfuscationMiddleware(BaseHTTPMiddleware):
         return hmac.compare_digest(token, expected_token)
     
     async def dispatch(self, request: Request, call_next):
+        with tracer.span("middleware.URLObfuscationMiddleware", **{"http.target": request.url.path}):
+            return await self._dispatch(request, call_next)
+    
+    async def _dispatch(self, request: Request, call_next):
         path = request.url.path
         
         # Skip middleware for docs, health, root, and system endpoints
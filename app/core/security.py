@@ -8,9 +8,11 @@ from sqlalchemy.orm import Session
 from ..db.database import get_db
 from ..db import models, schemas
 from .config import settings
+from .tracing import tracer
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -43,6 +45,10 @@ def authenticate_user(db: Session, username: str, password: str):
     return user
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    with tracer.span("auth.current_user"):
+        return _current_user(token, db)
+
+def _current_user(token: str, db: Session) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,4 +65,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     user = get_user_by_username(db, username=token_data.username)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_user_optional(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    db: Session = Depends(get_db)
+) -> Optional[models.User]:
+    """The authenticated user, or None for anonymous requests; invalid tokens are still rejected"""
+    if token is None:
+        return None
+    return await get_current_user(token, db)
@@ -0,0 +1,405 @@
+"""Request tracing with W3C ``traceparent`` propagation.
+
+``TracingMiddleware`` opens a server span per request, continuing the trace
+of an incoming ``traceparent`` header. Everything that runs under it can add
+child spans with ``tracer.span(...)``: the URL obfuscation middleware, auth,
+every SQL statement (engine events), every object storage call
+(``traced_calls``) and response serialization/rendering. Spans outside a
+request (background workers) are not recorded.
+
+Sampling is decided once per trace: an incoming ``traceparent`` keeps its
+sampled flag, new traces are sampled with ``TRACING_SAMPLE_RATE``. Finished
+spans are buffered and exported in batches by a background thread, encoded
+as OTLP/JSON: ``file`` appends one ``ExportTraceServiceRequest`` per line
+(the format of the OpenTelemetry collector's file exporter, readable by its
+``otlpjsonfile`` receiver), ``otlp`` posts the same payload to an OTLP/HTTP
+endpoint such as a local collector or Jaeger.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import JSONResponse
+from .config import settings
+from .metrics import metrics
+from .background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+SQL_STATEMENT_MAX_LENGTH = 1000
+
+# OTLP enums
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_ERROR = 0, 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "sampled",
+        "attributes", "start_ns", "end_ns", "status", "status_message",
+    )
+
+    def __init__(self, name: str, kind: int, trace_id: str, parent_id: Optional[str],
+                 sampled: bool, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64) or 1:016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = str(exc)[:500]
+        self.attributes["exception.type"] = type(exc).__name__
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+def parse_traceparent(header: Optional[str]):
+    """``(trace_id, parent_span_id, sampled)`` of a valid W3C header, else None"""
+    match = TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == INVALID_TRACE_ID or span_id == INVALID_SPAN_ID:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def encode_otlp(spans: List[Span], service_name: str) -> dict:
+    """An OTLP/JSON ``ExportTraceServiceRequest`` for ``spans``"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "haivler"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": span.status, **({"message": span.status_message} if span.status_message else {})},
+            } for span in spans],
+        }],
+    }]}
+
+class SpanExporter(PeriodicWorker):
+    """Buffers finished spans and exports them in batches every ``interval`` seconds.
+
+    At most ``queue_size`` spans wait for export; more are dropped and counted.
+    """
+
+    name = "trace-exporter"
+
+    def __init__(self, interval: float, queue_size: int, batch_size: int, service_name: str):
+        super().__init__(interval)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.service_name = service_name
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+
+    def enqueue(self, span: Span):
+        with self._lock:
+            if len(self._queue) >= self.queue_size:
+                metrics.inc("tracing_spans_dropped_total")
+                return
+            self._queue.append(span)
+
+    def run_once(self) -> int:
+        exported = 0
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return exported
+            try:
+                self.export(encode_otlp(batch, self.service_name))
+                exported += len(batch)
+                metrics.inc("tracing_spans_exported_total", len(batch))
+            except Exception as e:
+                metrics.inc("tracing_spans_dropped_total", len(batch))
+                logger.warning(f"Exporting {len(batch)} spans failed: {e}")
+                return exported
+
+    def export(self, payload: dict):
+        raise NotImplementedError
+
+    def stop(self, timeout: Optional[float] = None):
+        super().stop(timeout)
+        # Spans of the last requests
+        self.run_once()
+
+class FileSpanExporter(SpanExporter):
+    """Appends one OTLP/JSON request per line to ``path``"""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._file_lock = threading.Lock()
+
+    def export(self, payload: dict):
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        with self._file_lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """Posts OTLP/JSON to an OTLP/HTTP traces endpoint (e.g. http://localhost:4318/v1/traces)"""
+
+    def __init__(self, endpoint: str, timeout: float = 10, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, payload: dict):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload, separators=(",", ":")).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class Tracer:
+    """Creates spans and hands sampled, finished ones to the exporter.
+
+    Without an exporter tracing is off: no spans are created at all.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter], sample_rate: float):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_request_span(self, name: str, traceparent: Optional[str], attributes: Dict[str, Any]) -> Span:
+        """Root span of a request, continuing the caller's trace when ``traceparent`` is valid"""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128) or 1:032x}", None
+            sampled = random.random() < self.sample_rate
+        return Span(name, KIND_SERVER, trace_id, parent_id, sampled, attributes)
+
+    def start_child(self, name: str, kind: int = KIND_INTERNAL,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Child of the current span, or None outside a sampled trace"""
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            return None
+        return Span(name, kind, parent.trace_id, parent.span_id, True, attributes)
+
+    def end(self, span: Span):
+        span.end_ns = time.time_ns()
+        if span.sampled and self.exporter is not None:
+            self.exporter.enqueue(span)
+
+    @contextmanager
+    def activate(self, span: Optional[Span]):
+        """Make ``span`` the parent of spans started in this context"""
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes):
+        """Child span around a block; yields None when nothing is recorded"""
+        span = self.start_child(name, kind, attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end(span)
+
+    def start(self):
+        if self.exporter is not None:
+            self.exporter.start()
+
+    def stop(self):
+        if self.exporter is not None:
+            self.exporter.stop()
+
+def _exporter() -> Optional[SpanExporter]:
+    options = dict(
+        interval=settings.TRACING_EXPORT_INTERVAL_SECONDS,
+        queue_size=settings.TRACING_QUEUE_SIZE,
+        batch_size=settings.TRACING_BATCH_SIZE,
+        service_name=settings.TRACING_SERVICE_NAME,
+    )
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE, **options)
+    if settings.TRACING_EXPORTER == "otlp":
+        return OtlpHttpSpanExporter(settings.TRACING_OTLP_ENDPOINT, **options)
+    return None
+
+tracer = Tracer(_exporter(), settings.TRACING_SAMPLE_RATE)
+
+class TracingMiddleware:
+    """Server span per HTTP request (ASGI); sends the span's ``traceresponse`` header back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent")
+        span = tracer.start_request_span(
+            f"HTTP {scope['method']}",
+            traceparent.decode("latin-1") if traceparent else None,
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        )
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"traceresponse", span.traceparent.encode())]
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                span.set_attribute("http.route", route.path)
+            tracer.end(span)
+
+class TracedProxy:
+    """Wraps every method call of ``target`` in a client span named ``<prefix>.<method>``"""
+
+    def __init__(self, target, prefix: str, **attributes):
+        self._target = target
+        self._prefix = prefix
+        self._attributes = attributes
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value) or name.startswith("_"):
+            return value
+
+        def call(*args, **kwargs):
+            with tracer.span(f"{self._prefix}.{name}", KIND_CLIENT, **self._attributes):
+                return value(*args, **kwargs)
+        return call
+
+def traced_calls(target, prefix: str, **attributes):
+    """``target`` behind a ``TracedProxy`` when tracing is on, else unchanged"""
+    return TracedProxy(target, prefix, **attributes) if tracer.enabled else target
+
+class TracedJSONResponse(JSONResponse):
+    """Default response class: JSON encoding of the body gets its own span"""
+
+    def render(self, content) -> bytes:
+        with tracer.span("response.render"):
+            return super().render(content)
+
+def instrument_fastapi():
+    """Span response validation/serialization (``fastapi.routing.serialize_response``)"""
+    import fastapi.routing
+
+    original = fastapi.routing.serialize_response
+    if getattr(original, "_traced", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        with tracer.span("response.serialize"):
+            return await original(*args, **kwargs)
+
+    serialize_response._traced = True
+    fastapi.routing.serialize_response = serialize_response
+
+# Every engine, including ones bound by scripts and the benchmark harness
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not tracer.enabled or context is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    span = tracer.start_child(f"db.{operation}", KIND_CLIENT, {
+        "db.system": conn.dialect.name,
+        "db.operation": operation,
+        "db.statement": statement[:SQL_STATEMENT_MAX_LENGTH],
+    })
+    if span is not None:
+        context._trace_span = span
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        context._trace_span = None
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rows", cursor.rowcount)
+        tracer.end(span)
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    span = getattr(context, "_trace_span", None) if context is not None else None
+    if span is not None:
+        context._trace_span = None
+        span.record_exception(exception_context.original_exception)
+        tracer.end(span)
@@ -0,0 +1,25 @@
+"""Recognizing constraint violations in ``IntegrityError``.
+
+Writes insert or update directly and let the database enforce uniqueness
+instead of checking with a SELECT first; these helpers tell which
+constraint failed so the API can answer as it did before. Drivers report
+the constraint differently:
+
+- MySQL: ``Duplicate entry 'x' for key 'users.ix_users_email'``
+- PostgreSQL: ``duplicate key value violates unique constraint "ix_users_email"``
+- SQLite: ``UNIQUE constraint failed: users.email``
+"""
+from sqlalchemy import Column
+from sqlalchemy.exc import IntegrityError
+
+def _constraint_text(error: IntegrityError) -> str:
+    # Only the part naming the constraint: the first line, without the
+    # duplicate value MySQL puts before it
+    lines = str(error.orig).splitlines()
+    return lines[0].split(" for key ", 1)[-1].lower() if lines else ""
+
+def unique_violation(error: IntegrityError, column: Column) -> bool:
+    """True if ``error`` is a duplicate of the unique-indexed ``column``"""
+    table, name = column.table.name, column.name
+    text = _constraint_text(error)
+    return f"ix_{table}_{name}" in text or f"{table}.{name}" in text
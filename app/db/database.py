@@ -40,8 +40,12 @@ CONNECTION_URL = URL.create(
     database=os.getenv("MYSQL_DATABASE", "haivler") #"haivler"
 )
 
-engine = create_engine(CONNECTION_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# No connection is made here; the pool connects on first use and
+# pool_pre_ping replaces connections dropped while the database was away
+engine = create_engine(CONNECTION_URL, pool_pre_ping=True)
+# Objects stay loaded after commit, so responses are built from what was
+# just written instead of reloading every row with another SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 import enum
 
+def utc_now() -> datetime:
+    """Naive UTC to the second, as CURRENT_TIMESTAMP stores it in a DATETIME column"""
+    return datetime.utcnow().replace(microsecond=0)
+
 class ReactionType(enum.Enum):
     like = "like"
     dislike = "dislike"
@@ -16,25 +21,92 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
     avatar_url = Column(String(500), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set by the application too, so the INSERT leaves nothing to fetch back
+    created_at = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
     
     posts = relationship("Post", back_populates="user")
     comments = relationship("Comment", back_populates="user")
     reactions = relationship("Reaction", back_populates="user")
 
+class UserStats(Base):
+    """Per-user counters maintained by post, comment and reaction writes"""
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0)
+    comment_count = Column(Integer, nullable=False, default=0)
+    likes_received = Column(Integer, nullable=False, default=0)
+
 class Post(Base):
     __tablename__ = "posts"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
-    image_url = Column(String(500), nullable=False)
+    image_key = Column(String(255), nullable=False)
+    thumbnail_key = Column(String(255), nullable=True)
+    medium_key = Column(String(255), nullable=True)
+    webp_key = Column(String(255), nullable=True)
+    image_width = Column(Integer, nullable=True)
+    image_height = Column(Integer, nullable=True)
+    placeholder_hash = Column(String(64), nullable=True)
+    image_status = Column(String(20), nullable=False, default="pending", server_default="pending")
+    # Maintained by comment writes, including comments moved to the archive
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
+    # Set once the archival job moved the post's comments and reactions to the archive tables
+    archived_at = Column(DateTime, nullable=True)
+    # Tombstone of a deleted post whose rows are still being purged in the background
+    deleted_at = Column(DateTime, nullable=True, index=True)
     
     user = relationship("User", back_populates="posts")
-    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
-    reactions = relationship("Reaction", back_populates="post", cascade="all, delete-orphan")
+    # Deleting a post deletes its comments and reactions through ON DELETE
+    # CASCADE foreign keys instead of loading them
+    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    reactions = relationship("Reaction", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    
+    __table_args__ = (
+        # Profile feed: a user's posts, newest first
+        Index("ix_posts_user_id_id", "user_id", "id"),
+        # Backs /posts/search; other databases fall back to LIKE
+        Index("ix_posts_fulltext", "title", "description", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+        # Archival job: unarchived posts older than the cutoff
+        Index("ix_posts_archived_at_created_at", "archived_at", "created_at"),
+    )
+
+class StoredObject(Base):
+    __tablename__ = "stored_objects"
+    
+    object_key = Column(String(255), primary_key=True)
+    size = Column(BigInteger, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ObjectDeletion(Base):
+    __tablename__ = "object_deletions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    object_key = Column(String(255), nullable=False)
+    # Image key whose last reference was released; the deletion is cancelled
+    # if that image gets referenced again before the worker runs
+    owner_key = Column(String(255), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PendingUpload(Base):
+    __tablename__ = "pending_uploads"
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    object_key = Column(String(255), index=True, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    max_size = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -42,18 +114,23 @@ class Comment(Base):
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
     
     user = relationship("User", back_populates="comments")
     post = relationship("Post", back_populates="comments")
+    
+    __table_args__ = (
+        # A post's thread in display order (comment lists and feed previews)
+        Index("ix_comments_post_id_created_at", "post_id", "created_at", "id"),
+    )
 
 class Reaction(Base):
     __tablename__ = "reactions"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     reaction_type = Column(Enum(ReactionType), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -61,5 +138,40 @@ class Reaction(Base):
     post = relationship("Post", back_populates="reactions")
     
     __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="uq_reactions_user_post"),
         {"mysql_engine": "InnoDB"},
-    )
\ No newline at end of file
+    )
+
+class ArchivedComment(Base):
+    """Comments of archived posts.
+
+    Keyed by (post_id, id) so one post's comments are stored together and
+    read as a single range; comment ids are kept so they stay addressable.
+    """
+    __tablename__ = "comments_archive"
+    
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    content = Column(Text, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    
+    user = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_comments_archive_id", "id", unique=True),
+        {"mysql_engine": "InnoDB", "mysql_row_format": "COMPRESSED"},
+    )
+
+class ArchivedReaction(Base):
+    """Reactions of archived posts, without a surrogate id or secondary indexes"""
+    __tablename__ = "reactions_archive"
+    
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    reaction_type = Column(Enum(ReactionType), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        {"mysql_engine": "InnoDB", "mysql_row_format": "COMPRESSED"},
+    )
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, computed_field
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
+from ..utils.minio_client import minio_client
 
 class ReactionType(str, Enum):
     like = "like"
@@ -27,6 +28,15 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserProfile(BaseModel):
+    id: int
+    username: str
+    avatar_url: Optional[str] = None
+    created_at: datetime
+    post_count: int = 0
+    comment_count: int = 0
+    likes_received: int = 0
+
 class PostBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -40,19 +50,80 @@ class PostUpdate(BaseModel):
 
 class Post(PostBase):
     id: int
-    image_url: str
+    image_key: str = Field(exclude=True)
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    placeholder_hash: Optional[str] = None
+    image_status: str = "pending"
+    thumbnail_key: Optional[str] = Field(None, exclude=True)
+    medium_key: Optional[str] = Field(None, exclude=True)
+    webp_key: Optional[str] = Field(None, exclude=True)
     user_id: int
     created_at: datetime
     user: User
     
+    @computed_field
+    @property
+    def image_url(self) -> str:
+        return minio_client.get_file_url(self.image_key)
+    
+    @computed_field
+    @property
+    def thumbnail_url(self) -> Optional[str]:
+        return minio_client.get_file_url(self.thumbnail_key) if self.thumbnail_key else None
+    
+    @computed_field
+    @property
+    def medium_url(self) -> Optional[str]:
+        return minio_client.get_file_url(self.medium_key) if self.medium_key else None
+    
+    @computed_field
+    @property
+    def webp_url(self) -> Optional[str]:
+        return minio_client.get_file_url(self.webp_key) if self.webp_key else None
+    
     class Config:
         from_attributes = True
 
-class PostWithDetails(Post):
-    comments: List["Comment"] = []
+class UploadCreate(BaseModel):
+    content_type: str
+
+class UploadTicket(BaseModel):
+    upload_id: str
+    object_key: str
+    # Always False: uploads are deduplicated by the server at finalize. Kept
+    # for clients that skipped the upload when it was True
+    exists: bool = False
+    url: Optional[str] = None
+    fields: Dict[str, str] = {}
+    max_size: int
+    expires_at: datetime
+
+class PostPage(BaseModel):
+    items: List[Post]
+    # Pass as ``cursor`` to fetch the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class PostWithCounts(Post):
     like_count: int = 0
     dislike_count: int = 0
 
+class FeedPost(Post):
+    comment_count: int = 0
+    # The first FEED_COMMENT_PREVIEW_SIZE comments of the thread
+    comment_preview: List["Comment"] = []
+    # The requesting user's reaction; None for anonymous requests
+    my_reaction: Optional[ReactionType] = None
+
+class PostWithDetails(PostWithCounts):
+    comments: List["Comment"] = []
+    my_reaction: Optional[ReactionType] = None
+
+class PostBatch(BaseModel):
+    # In request order; None where the id doesn't exist
+    items: List[Optional[PostWithCounts]]
+    missing: List[int] = []
+
 class CommentBase(BaseModel):
     content: str
 
@@ -73,7 +144,8 @@ class ReactionCreate(BaseModel):
     reaction_type: ReactionType
 
 class Reaction(BaseModel):
-    id: int
+    # None while the reaction is held in the write-behind buffer
+    id: Optional[int] = None
     user_id: int
     post_id: int
     reaction_type: ReactionType
@@ -93,4 +165,5 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
 
+FeedPost.model_rebuild()
 PostWithDetails.model_rebuild()
\ No newline at end of file
@@ -1,22 +1,82 @@
-from fastapi import FastAPI, Depends, HTTPException, Form, File, UploadFile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Form, File, UploadFile, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from typing import Optional
-from .api import auth, users, posts, comments, reactions
+from typing import List, Optional
+from .api import auth, users, posts, comments, reactions, images, events
 from .core.config import settings
+from .core.lifecycle import DependencyInitializer, readiness
+from .core.metrics import metrics
 from .core.middleware import URLObfuscationMiddleware, URLMappingResponse
-from .core.security import get_current_user
+from .core.tracing import tracer, TracingMiddleware, TracedJSONResponse, instrument_fastapi
+from .core.security import get_current_user, get_current_user_optional
 from .db.database import engine, get_db
 from .db import models, schemas
+from .services.image_processing import image_processor
+from .services.image_cache import image_cache
+from .services.upload_sweeper import upload_sweeper
+from .services import stored_objects
+from .services.object_deletion import object_deletion_worker
+from .services.reaction_buffer import reaction_buffer
+from .services.events import event_hub, reaction_count_publisher
+from .services.archival import archive_worker
+from .services.post_purge import post_purge_worker
+from .services.rate_limit import (
+    RateLimitHeadersMiddleware, limit_auth, limit_posts, limit_comments, limit_reactions, limit_exports
+)
+from .utils.minio_client import minio_client
 from sqlalchemy.orm import Session
 
-models.Base.metadata.create_all(bind=engine)
+def init_database():
+    models.Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importing the app has no side effects; network dependencies are
+    # initialized in the background and reported through /ready
+    initializer = DependencyInitializer(max_delay=settings.STARTUP_RETRY_MAX_DELAY_SECONDS)
+    initializer.add("database", init_database)
+    initializer.add("storage", minio_client.ensure_bucket)
+    initializer.add("image_cache", image_cache.load_index)
+    tracer.start()
+    initializer.start()
+    upload_sweeper.start()
+    object_deletion_worker.start()
+    post_purge_worker.start()
+    if reaction_buffer.enabled:
+        reaction_buffer.start()
+    event_hub.start()
+    reaction_count_publisher.start()
+    if archive_worker.enabled:
+        archive_worker.start()
+    yield
+    reaction_count_publisher.stop()
+    event_hub.stop()
+    archive_worker.stop()
+    initializer.stop()
+    upload_sweeper.stop()
+    object_deletion_worker.stop()
+    post_purge_worker.stop()
+    # Writes buffered reactions before the worker exits
+    reaction_buffer.stop()
+    image_processor.shutdown(wait=True)
+    # Exports the spans still buffered
+    tracer.stop()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=TracedJSONResponse if tracer.enabled else JSONResponse
 )
+if tracer.enabled:
+    instrument_fastapi()
+
+# Innermost: the URL obfuscation middleware hands the app a copy of the scope,
+# and the limit dependencies record their headers in the scope they see
+app.add_middleware(RateLimitHeadersMiddleware)
 
 # Add URL obfuscation middleware
 url_obfuscation_middleware = URLObfuscationMiddleware(app, settings.SECRET_KEY)
@@ -30,11 +90,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the request span covers the other middleware
+app.add_middleware(TracingMiddleware)
+
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
 app.include_router(posts.router, prefix=f"{settings.API_V1_STR}/posts", tags=["posts"])
 app.include_router(comments.router, prefix=f"{settings.API_V1_STR}", tags=["comments"])
 app.include_router(reactions.router, prefix=f"{settings.API_V1_STR}", tags=["reactions"])
+app.include_router(images.router, prefix=f"{settings.API_V1_STR}/images", tags=["images"])
+app.include_router(events.router, prefix=f"{settings.API_V1_STR}/events", tags=["events"])
 
 @app.get("/")
 def read_root():
@@ -44,6 +109,15 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check():
+    """Ready once the database and object storage have been initialized"""
+    ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "dependencies": readiness.snapshot()}
+    )
+
 @app.get("/api/v1/system/endpoints")
 def get_obfuscated_endpoints(current_user: models.User = Depends(get_current_user)):
     """Get obfuscated endpoint URLs for authenticated users"""
@@ -58,6 +132,29 @@ def get_obfuscated_endpoints(current_user: models.User = Depends(get_current_use
         }
     }
 
+@app.get("/api/v1/system/metrics")
+def get_metrics(current_user: models.User = Depends(get_current_user)):
+    """Process-local counters and gauges of this API worker"""
+    return metrics.snapshot()
+
+@app.get("/api/v1/system/storage")
+def get_storage_stats(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Stored image objects and the savings from content-addressed deduplication"""
+    counters = metrics.snapshot()
+    return {
+        **stored_objects.storage_summary(db),
+        "this_worker": {
+            "dedup_hits": counters.get("storage_dedup_hits_total", 0),
+            "dedup_bytes_saved": counters.get("storage_dedup_bytes_saved_total", 0),
+            "dedup_upload_seconds_avoided": counters.get("storage_dedup_upload_seconds_avoided_total", 0),
+            "uploads": counters.get("storage_uploads_total", 0),
+            "upload_bytes": counters.get("storage_upload_bytes_total", 0),
+        }
+    }
+
 @app.get("/api/v1/system/token/{endpoint_hash}")
 def generate_access_token(endpoint_hash: str, current_user: models.User = Depends(get_current_user)):
     """Generate fresh access token for a specific obfuscated endpoint"""
@@ -80,11 +177,11 @@ def generate_access_token(endpoint_hash: str, current_user: models.User = Depend
 # Create dynamic routes for obfuscated endpoints
 from fastapi.security import OAuth2PasswordRequestForm
 
-@app.post("/api/x/1f217a698b25")  # Register endpoint
+@app.post("/api/x/1f217a698b25", dependencies=[Depends(limit_auth)])  # Register endpoint
 def obfuscated_register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return auth.register(user, db)
 
-@app.post("/api/login")  # Login endpoint  
+@app.post("/api/login", dependencies=[Depends(limit_auth)])  # Login endpoint  
 def obfuscated_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     return auth.login(form_data, db)
 
@@ -100,16 +197,41 @@ def obfuscated_users_update(
 ):
     return users.update_user_me(user_update, db, current_user)
 
-@app.get("/api/x/ff0d498c575b")  # Posts endpoint
+@app.get("/api/x/5baaf1c55a0a/export", dependencies=[Depends(limit_exports)])  # Users/me data export
+def obfuscated_users_export(
+    format: str = Query("ndjson", regex="^(ndjson|zip)$"),
+    current_user: models.User = Depends(get_current_user)
+):
+    return users.export_user_data(format, current_user)
+
+@app.get("/api/x/58e74c92e79b/{user_id}", response_model=schemas.UserProfile)  # User profile summary
+def obfuscated_user_profile(user_id: int, db: Session = Depends(get_db)):
+    return users.read_user_profile(user_id, db)
+
+@app.get("/api/x/58e74c92e79b/{user_id}/posts", response_model=schemas.PostPage)  # User's posts
+def obfuscated_user_posts(
+    user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=200),
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return users.read_user_posts(user_id, limit, cursor, fields, include, db)
+
+@app.get("/api/x/ff0d498c575b", response_model=List[schemas.FeedPost])  # Posts endpoint
 def obfuscated_posts_list(
     skip: int = 0,
     limit: int = 10,
     sort: str = "new",
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_user_optional)
 ):
-    return posts.read_posts(skip, limit, sort, db)
+    return posts.read_posts(skip, limit, sort, fields, include, db, current_user)
 
-@app.post("/api/x/ff0d498c575b")  # Posts create endpoint
+@app.post("/api/x/ff0d498c575b", response_model=schemas.Post, dependencies=[Depends(limit_posts)])  # Posts create endpoint
 def obfuscated_posts_create(
     title: str = Form(...),
     description: Optional[str] = Form(None),
@@ -119,11 +241,52 @@ def obfuscated_posts_create(
 ):
     return posts.create_post(title, description, image, db, current_user)
 
-@app.get("/api/x/ff0d498c575b/{post_id}")  # Get single post
-def obfuscated_get_post(post_id: int, db: Session = Depends(get_db)):
-    return posts.read_post(post_id, db)
+@app.post("/api/x/ff0d498c575b/uploads", response_model=schemas.UploadTicket, dependencies=[Depends(limit_posts)])  # Direct upload ticket
+def obfuscated_create_upload(
+    upload: schemas.UploadCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    return posts.create_upload(upload, db, current_user)
+
+@app.post("/api/x/ff0d498c575b/uploads/{upload_id}/finalize", response_model=schemas.Post, dependencies=[Depends(limit_posts)])  # Finalize direct upload
+def obfuscated_finalize_upload(
+    upload_id: str,
+    post: schemas.PostCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    return posts.finalize_upload(upload_id, post, db, current_user)
+
+@app.get("/api/x/ff0d498c575b/search", response_model=schemas.PostPage)  # Search posts
+def obfuscated_search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=200),
+    db: Session = Depends(get_db)
+):
+    return posts.search_posts(q, limit, cursor, db)
+
+@app.get("/api/x/ff0d498c575b/batch", response_model=schemas.PostBatch)  # Hydrate posts by id
+def obfuscated_posts_batch(
+    ids: str,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return posts.read_posts_batch(ids, fields, include, db)
 
-@app.put("/api/x/ff0d498c575b/{post_id}")  # Update post
+@app.get("/api/x/ff0d498c575b/{post_id}", response_model=schemas.PostWithDetails)  # Get single post
+def obfuscated_get_post(
+    post_id: int,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Optional[models.User] = Depends(get_current_user_optional)
+):
+    return posts.read_post(post_id, fields, include, db, current_user)
+
+@app.put("/api/x/ff0d498c575b/{post_id}", response_model=schemas.Post)  # Update post
 def obfuscated_update_post(
     post_id: int,
     post_update: schemas.PostUpdate,
@@ -142,10 +305,15 @@ def obfuscated_delete_post(
 
 # Comments endpoints
 @app.get("/api/x/ff0d498c575b/{post_id}/comments")  # Get comments
-def obfuscated_get_comments(post_id: int, db: Session = Depends(get_db)):
-    return comments.read_comments(post_id, db)
+def obfuscated_get_comments(
+    post_id: int,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return comments.read_comments(post_id, fields, include, db)
 
-@app.post("/api/x/ff0d498c575b/{post_id}/comments")  # Create comment
+@app.post("/api/x/ff0d498c575b/{post_id}/comments", dependencies=[Depends(limit_comments)])  # Create comment
 def obfuscated_create_comment(
     post_id: int,
     comment: schemas.CommentCreate,
@@ -162,12 +330,28 @@ def obfuscated_delete_comment(
 ):
     return comments.delete_comment(comment_id, db, current_user)
 
+# Image proxy endpoint
+@app.api_route("/api/x/aed8ef5f79ef/{object_key:path}", methods=["GET", "HEAD"])  # Cached image
+def obfuscated_read_image(object_key: str, request: Request):
+    return images.read_image(object_key, request)
+
+# Server-sent events endpoint
+@app.get("/api/x/04fd28571d2d")  # Live updates stream
+async def obfuscated_stream_events(
+    request: Request,
+    feed: bool = False,
+    posts: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    return await events.stream_events(request, feed, posts, db, current_user)
+
 # Reactions endpoints
 @app.get("/api/x/ff0d498c575b/{post_id}/reactions")  # Get reactions
 def obfuscated_get_reactions(post_id: int, db: Session = Depends(get_db)):
     return reactions.get_post_reactions(post_id, db)
 
-@app.post("/api/x/ff0d498c575b/{post_id}/reaction")  # Create reaction
+@app.post("/api/x/ff0d498c575b/{post_id}/reaction", dependencies=[Depends(limit_reactions)])  # Create reaction
 def obfuscated_create_reaction(
     post_id: int,
     reaction: schemas.ReactionCreate,
@@ -176,7 +360,7 @@ def obfuscated_create_reaction(
 ):
     return reactions.create_or_update_reaction(post_id, reaction, db, current_user)
 
-@app.delete("/api/x/ff0d498c575b/{post_id}/reaction")  # Delete reaction
+@app.delete("/api/x/ff0d498c575b/{post_id}/reaction", dependencies=[Depends(limit_reactions)])  # Delete reaction
 def obfuscated_delete_reaction(
     post_id: int,
     db: Session = Depends(get_db),
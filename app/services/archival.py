@@ -0,0 +1,132 @@
+"""Cold archival of comments and reactions of old posts.
+
+Almost all reads hit recent posts, so the archival job moves the comments
+and reactions of posts older than ``ARCHIVE_AFTER_DAYS`` out of the hot
+``comments``/``reactions`` tables into ``comments_archive`` and
+``reactions_archive``, which are clustered by post and have no secondary
+indexes beyond comment ids. The hot tables and their indexes then only hold
+recent history.
+
+Archived posts stay fully readable and writable through the same
+endpoints: reads of an archived post also read the archive tables, new
+comments and reactions go to the hot tables, and a user's archived reaction
+is moved back to the hot table before it is changed or removed.
+"""
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from ..core.background import PeriodicWorker
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import SessionLocal
+from ..db import models
+
+logger = logging.getLogger(__name__)
+
+COMMENT_COLUMNS = ("id", "post_id", "user_id", "content", "created_at")
+REACTION_COLUMNS = ("post_id", "user_id", "reaction_type", "created_at")
+
+def _move(db: Session, source, target, columns, condition) -> int:
+    db.execute(insert(target).from_select(
+        columns, select(*(getattr(source, column) for column in columns)).where(condition)
+    ))
+    return db.execute(delete(source).where(condition)).rowcount
+
+def promote_reactions(db: Session, post_id: int, user_ids: List[int]):
+    """Move reactions of ``user_ids`` on an archived post back to ``reactions``.
+
+    Called before those reactions are changed or removed, so every write
+    path only deals with the hot table.
+    """
+    condition = (models.ArchivedReaction.post_id == post_id) & models.ArchivedReaction.user_id.in_(user_ids)
+    _move(db, models.ArchivedReaction, models.Reaction, REACTION_COLUMNS, condition)
+
+def load_comments(
+    db: Session,
+    post_ids: List[int],
+    archived_ids: Iterable[int],
+    options: Callable[[type], list]
+) -> list:
+    """Comments of ``post_ids`` ordered by (created_at, id).
+
+    Posts in ``archived_ids`` are also read from ``comments_archive``;
+    ``options(model)`` returns the loader options for either table.
+    """
+    def query(model, ids):
+        return db.query(model).options(*options(model)).filter(
+            model.post_id.in_(ids)
+        ).order_by(model.created_at, model.id).all()
+
+    comments = query(models.Comment, post_ids)
+    archived_ids = list(archived_ids)
+    if not archived_ids:
+        return comments
+    archived = query(models.ArchivedComment, archived_ids)
+    return list(heapq.merge(archived, comments, key=lambda comment: (comment.created_at, comment.id)))
+
+class ArchiveWorker(PeriodicWorker):
+    """Moves comments and reactions of posts older than ``after_days`` to the archive tables.
+
+    Each batch of posts is archived in one transaction. Posts are claimed
+    with ``FOR UPDATE SKIP LOCKED``; comment writers update the post row's
+    ``comment_count`` and reaction writers take a shared lock on it, so no
+    write can slip in between the copy and the delete.
+    """
+
+    name = "archive-worker"
+
+    def __init__(self, interval: float, after_days: int, batch_size: int, enabled: bool):
+        super().__init__(interval)
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.enabled = enabled
+
+    def run_once(self) -> int:
+        archived_total = 0
+        while True:
+            archived = self._archive_batch()
+            archived_total += archived
+            if archived < self.batch_size:
+                return archived_total
+
+    def _archive_batch(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(days=self.after_days)
+        db = SessionLocal()
+        try:
+            post_ids = [post_id for (post_id,) in db.query(models.Post.id).filter(
+                models.Post.archived_at.is_(None),
+                models.Post.deleted_at.is_(None),
+                models.Post.created_at < cutoff
+            ).order_by(models.Post.id).limit(self.batch_size).with_for_update(skip_locked=True)]
+            if not post_ids:
+                return 0
+
+            comments = _move(
+                db, models.Comment, models.ArchivedComment, COMMENT_COLUMNS,
+                models.Comment.post_id.in_(post_ids)
+            )
+            reactions = _move(
+                db, models.Reaction, models.ArchivedReaction, REACTION_COLUMNS,
+                models.Reaction.post_id.in_(post_ids)
+            )
+            db.query(models.Post).filter(models.Post.id.in_(post_ids)).update(
+                {models.Post.archived_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+            metrics.inc("archive_posts_total", len(post_ids))
+            metrics.inc("archive_comments_total", comments)
+            metrics.inc("archive_reactions_total", reactions)
+            logger.info(f"Archived {len(post_ids)} posts ({comments} comments, {reactions} reactions)")
+            return len(post_ids)
+        finally:
+            db.close()
+
+archive_worker = ArchiveWorker(
+    interval=settings.ARCHIVE_INTERVAL_SECONDS,
+    after_days=settings.ARCHIVE_AFTER_DAYS,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    enabled=settings.ARCHIVE_ENABLED
+)
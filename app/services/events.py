@@ -0,0 +1,263 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+from ..core.background import PeriodicWorker
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import SessionLocal
+from .reaction_buffer import reaction_counts
+
+logger = logging.getLogger(__name__)
+
+FEED = "feed"
+
+# A topic is FEED or a post id
+Topic = Union[str, int]
+
+class Subscription:
+    """One connected client: a bounded queue of encoded SSE messages.
+
+    A client that falls ``max_queued`` messages behind is marked
+    ``overflowed`` and disconnected instead of buffering without limit;
+    it reconnects and refetches current state.
+    """
+
+    def __init__(self, topics: Set[Topic], loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.topics = topics
+        self.loop = loop
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=max_queued)
+        self.overflowed = False
+
+    def _deliver(self, message: bytes):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.inc("events_slow_consumers_dropped_total")
+
+class RedisEventBroker:
+    """Relays events between processes over Redis pub/sub (``pip install redis``).
+
+    Every process publishes to one channel and runs a listener thread that
+    hands each message to its own hub, so a stream sees the writes of every
+    worker and host.
+    """
+
+    def __init__(self, url: str, channel: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def send(self, topics: List[Topic], event: str, data: dict):
+        self.client.publish(self.channel, json.dumps(
+            {"topics": topics, "event": event, "data": data}, default=str
+        ))
+
+    def start(self, receive: Callable[[List[Topic], str, dict], None]):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, args=(receive,), name="events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _listen(self, receive):
+        delay = 0.5
+        while not self._stop.is_set():
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                delay = 0.5
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    payload = json.loads(message["data"])
+                    receive(payload["topics"], payload["event"], payload["data"])
+            except Exception as e:
+                # Events published while disconnected are lost; clients
+                # refetch state when they reconnect
+                metrics.inc("events_broker_errors_total")
+                logger.warning(f"Event broker unavailable ({e}), retrying in {delay:.1f}s")
+                self._stop.wait(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                pubsub.close()
+
+class EventHub:
+    """Fan-out of events to SSE subscribers.
+
+    ``publish`` may be called from any thread (endpoints run in the thread
+    pool). Without a broker, events only reach streams served by the
+    publishing process; with one, every process receives every event.
+    Each event is encoded once per process and handed to every event loop
+    with subscribers in a single ``call_soon_threadsafe``.
+
+    Events with a registered listener are notices between processes and
+    go to the listener instead of the streams.
+    """
+
+    def __init__(self, max_queued: int, broker: Optional[RedisEventBroker] = None):
+        self.max_queued = max_queued
+        self.broker = broker
+        self._lock = threading.Lock()
+        self._subscribers: Dict[Topic, Set[Subscription]] = defaultdict(set)
+        self._listeners: Dict[str, Callable[[List[Topic], dict], None]] = {}
+        self._ids = itertools.count(1)
+
+    def start(self):
+        if self.broker is not None:
+            self.broker.start(self._receive)
+
+    def stop(self):
+        if self.broker is not None:
+            self.broker.stop()
+
+    def subscribe(self, topics: Iterable[Topic]) -> Subscription:
+        subscription = Subscription(set(topics), asyncio.get_running_loop(), self.max_queued)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def listen(self, event: str, listener: Callable[[List[Topic], dict], None]):
+        self._listeners[event] = listener
+
+    def has_local_subscribers(self, topic: Topic) -> bool:
+        return bool(self._subscribers.get(topic))
+
+    def has_subscribers(self, topic: Topic) -> bool:
+        """Whether an event for ``topic`` may reach anyone.
+
+        With a broker, subscribers of other processes are unknown here.
+        """
+        return self.broker is not None or self.has_local_subscribers(topic)
+
+    @property
+    def subscriber_count(self) -> int:
+        """Streams served by this process"""
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    def publish(self, topics: Iterable[Topic], event: str, data: dict):
+        topics = list(topics)
+        metrics.inc("events_published_total")
+        if self.broker is None:
+            self._receive(topics, event, data)
+            return
+        try:
+            self.broker.send(topics, event, data)
+        except Exception as e:
+            # A broker outage must not fail the write; local streams still get it
+            metrics.inc("events_broker_errors_total")
+            logger.warning(f"Event broker unavailable, delivering {event} locally only: {e}")
+            self._receive(topics, event, data)
+
+    def _receive(self, topics: List[Topic], event: str, data: dict):
+        listener = self._listeners.get(event)
+        if listener is not None:
+            listener(topics, data)
+        else:
+            self.deliver(topics, event, data)
+
+    def deliver(self, topics: Iterable[Topic], event: str, data: dict):
+        """Send an event to the streams of this process only"""
+        with self._lock:
+            targets = {s for topic in topics for s in self._subscribers.get(topic, ())}
+        if not targets:
+            return
+        message = f"id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+        by_loop = defaultdict(list)
+        for subscription in targets:
+            by_loop[subscription.loop].append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_fan_out, subscriptions, message)
+            except RuntimeError:
+                # Loop already closed (shutdown); its clients are gone
+                pass
+        metrics.inc("events_delivered_total", len(targets))
+
+def _fan_out(subscriptions, message: bytes):
+    for subscription in subscriptions:
+        subscription._deliver(message)
+
+# Notice that a post's reactions changed; each process recounts for its own streams
+REACTIONS_CHANGED = "reactions_changed"
+
+class ReactionCountPublisher(PeriodicWorker):
+    """Coalesces reaction changes into one count update per post per interval.
+
+    A change is announced to every process through the hub; each one only
+    counts posts its own streams follow and delivers the counts locally.
+    """
+
+    name = "reaction-count-publisher"
+
+    def __init__(self, hub: EventHub, interval: float):
+        super().__init__(interval)
+        self.hub = hub
+        self._lock = threading.Lock()
+        self._dirty: Set[int] = set()
+        hub.listen(REACTIONS_CHANGED, self._changed)
+
+    def mark(self, post_id: int):
+        if self.hub.has_subscribers(post_id):
+            self.hub.publish([post_id], REACTIONS_CHANGED, {})
+
+    def _changed(self, topics: List[Topic], data: dict):
+        post_ids = [post_id for post_id in topics if self.hub.has_local_subscribers(post_id)]
+        if post_ids:
+            with self._lock:
+                self._dirty.update(post_ids)
+
+    def run_once(self) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        db = SessionLocal()
+        try:
+            for post_id in dirty:
+                like_count, dislike_count = reaction_counts(db, post_id)
+                self.hub.deliver([post_id], "reactions", {
+                    "post_id": post_id,
+                    "like_count": like_count,
+                    "dislike_count": dislike_count
+                })
+        finally:
+            db.close()
+        return len(dirty)
+
+def _create_broker() -> Optional[RedisEventBroker]:
+    if settings.EVENTS_BACKEND == "redis":
+        return RedisEventBroker(settings.EVENTS_REDIS_URL, settings.EVENTS_REDIS_CHANNEL)
+    return None
+
+event_hub = EventHub(max_queued=settings.EVENTS_QUEUE_SIZE, broker=_create_broker())
+reaction_count_publisher = ReactionCountPublisher(event_hub, interval=settings.EVENTS_REACTION_INTERVAL_SECONDS)
+
+metrics.register_gauge("events_subscribers", lambda: event_hub.subscriber_count)
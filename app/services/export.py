@@ -0,0 +1,140 @@
+"""Streaming export of a user's data.
+
+Rows are read with server-side cursors (``stream_results`` + ``yield_per``)
+and written out as NDJSON in chunks of about ``CHUNK_SIZE`` bytes, so memory
+use doesn't depend on how much history a user has. The zip bundle adds the
+user's images, streamed from object storage one chunk at a time.
+
+The generators open their own session: they run after the request handler
+has returned, while the response body is being sent.
+"""
+import json
+import logging
+import time
+import zipfile
+from datetime import datetime
+from typing import Iterable, Iterator, List
+from sqlalchemy import select
+from ..db.database import SessionLocal
+from ..db import models
+from ..utils.minio_client import minio_client
+
+logger = logging.getLogger(__name__)
+
+YIELD_PER = 500
+CHUNK_SIZE = 64 * 1024
+
+def _records(db, user_id: int) -> Iterator[dict]:
+    """One dict per exported row: the user, then posts, comments and reactions"""
+    user = db.get(models.User, user_id)
+    yield {
+        "type": "user", "id": user.id, "username": user.username, "email": user.email,
+        "avatar_url": user.avatar_url, "created_at": user.created_at,
+    }
+
+    live = models.Post.deleted_at.is_(None)
+    queries = [
+        ("post", select(
+            models.Post.id, models.Post.title, models.Post.description, models.Post.image_key,
+            models.Post.image_width, models.Post.image_height, models.Post.created_at
+        ).where(models.Post.user_id == user_id, live).order_by(models.Post.id)),
+    ]
+    # Comments and reactions live in the hot or the archive table
+    for model in (models.Comment, models.ArchivedComment):
+        queries.append(("comment", select(
+            model.id, model.post_id, model.content, model.created_at
+        ).join(models.Post, models.Post.id == model.post_id).where(model.user_id == user_id, live)))
+    for model in (models.Reaction, models.ArchivedReaction):
+        queries.append(("reaction", select(
+            model.post_id, model.reaction_type, model.created_at
+        ).join(models.Post, models.Post.id == model.post_id).where(model.user_id == user_id, live)))
+
+    for record_type, query in queries:
+        # Each cursor is drained before the next query runs on the connection
+        for row in db.execute(query.execution_options(stream_results=True, yield_per=YIELD_PER)):
+            record = {"type": record_type, **row._asdict()}
+            if record_type == "reaction":
+                record["reaction_type"] = record["reaction_type"].value
+            yield record
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _ndjson(records: Iterable[dict]) -> Iterator[bytes]:
+    lines: List[str] = []
+    size = 0
+    for record in records:
+        line = json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(lines).encode()
+            lines, size = [], 0
+    if lines:
+        yield "".join(lines).encode()
+
+def export_ndjson(user_id: int) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        yield from _ndjson(_records(db, user_id))
+    finally:
+        db.close()
+
+class _ZipStream:
+    """Write-only, unseekable file for ``zipfile``; ``drain`` hands out what was written"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def export_zip(user_id: int) -> Iterator[bytes]:
+    """``data.ndjson`` plus ``images/<image_key>`` for every distinct image of the user's posts"""
+    stream = _ZipStream()
+    db = SessionLocal()
+    try:
+        # An unseekable target makes zipfile write sizes in data descriptors
+        with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            with bundle.open("data.ndjson", mode="w", force_zip64=True) as entry:
+                for chunk in _ndjson(_records(db, user_id)):
+                    entry.write(chunk)
+                    yield stream.drain()
+
+            image_keys = select(models.Post.image_key).where(
+                models.Post.user_id == user_id, models.Post.deleted_at.is_(None)
+            ).distinct().order_by(models.Post.image_key)
+            for (image_key,) in db.execute(image_keys.execution_options(stream_results=True, yield_per=YIELD_PER)):
+                yield from _zip_image(bundle, stream, image_key)
+        yield stream.drain()
+    finally:
+        db.close()
+
+def _zip_image(bundle: zipfile.ZipFile, stream: _ZipStream, image_key: str) -> Iterator[bytes]:
+    try:
+        response = minio_client.open_object(image_key)
+    except Exception as e:
+        logger.warning(f"Export skipped image {image_key}: {e}")
+        return
+    if response is None:
+        return
+    try:
+        # Images are already compressed
+        info = zipfile.ZipInfo(f"images/{image_key}", date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with bundle.open(info, mode="w", force_zip64=True) as entry:
+            for chunk in response.stream(CHUNK_SIZE):
+                entry.write(chunk)
+                yield stream.drain()
+    finally:
+        response.close()
+        response.release_conn()
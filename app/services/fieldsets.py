@@ -0,0 +1,155 @@
+"""Sparse fieldsets (``fields=``/``include=``) for post and comment endpoints.
+
+A fieldset decides which columns are loaded (``load_only``), whether the
+author is loaded at all, and whether reaction counts are queried; the
+response is built from exactly those attributes. Without ``fields`` and
+``include`` endpoints return their full schema as before.
+"""
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, load_only, selectinload
+from ..db import models, schemas
+from ..utils.minio_client import minio_client
+from .reaction_buffer import reaction_counts_many
+
+# Response field -> model columns it needs
+POST_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "title": ("title",),
+    "description": ("description",),
+    "image_url": ("image_key",),
+    "thumbnail_url": ("thumbnail_key",),
+    "medium_url": ("medium_key",),
+    "webp_url": ("webp_key",),
+    "image_width": ("image_width",),
+    "image_height": ("image_height",),
+    "placeholder_hash": ("placeholder_hash",),
+    "image_status": ("image_status",),
+    "comment_count": ("comment_count",),
+    "user_id": ("user_id",),
+    "created_at": ("created_at",),
+    "like_count": (),
+    "dislike_count": (),
+}
+POST_INCLUDES = frozenset({"user"})
+POST_DETAIL_INCLUDES = POST_INCLUDES | {"comments"}
+FEED_INCLUDES = POST_INCLUDES | {"comment_preview"}
+# Per-viewer fields of the feed and post endpoints. They are left None in the
+# shared (cacheable, coalesced) payload and filled in per request.
+VIEWER_FIELDS: Dict[str, Tuple[str, ...]] = {"my_reaction": ()}
+FEED_FIELDS = {**POST_FIELDS, **VIEWER_FIELDS}
+
+COMMENT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "id": ("id",),
+    "content": ("content",),
+    "user_id": ("user_id",),
+    "post_id": ("post_id",),
+    "created_at": ("created_at",),
+}
+COMMENT_INCLUDES = frozenset({"user"})
+
+URL_FIELDS = {
+    "image_url": "image_key",
+    "thumbnail_url": "thumbnail_key",
+    "medium_url": "medium_key",
+    "webp_url": "webp_key",
+}
+COUNT_FIELDS = frozenset({"like_count", "dislike_count"})
+
+class Fieldset(NamedTuple):
+    fields: Tuple[str, ...]
+    include: FrozenSet[str]
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+def parse(
+    fields: Optional[str],
+    include: Optional[str],
+    known_fields: Dict[str, Tuple[str, ...]],
+    known_includes: FrozenSet[str]
+) -> Optional[Fieldset]:
+    """Fieldset for a request, or None for the full default representation"""
+    if fields is None and include is None:
+        return None
+    selected = _split(fields) or list(known_fields)
+    relations = _split(include)
+    unknown = [name for name in selected if name not in known_fields]
+    unknown += [name for name in relations if name not in known_includes]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+    return Fieldset(tuple(dict.fromkeys(selected)), frozenset(relations))
+
+def _load_options(model, fieldset: Fieldset, known_fields: Dict[str, Tuple[str, ...]], foreign_keys: Tuple[str, ...]):
+    columns = {"id"}
+    for name in fieldset.fields:
+        columns.update(known_fields[name])
+    if "user" in fieldset.include:
+        columns.update(foreign_keys)
+    options = [load_only(*(getattr(model, column) for column in columns))]
+    if "user" in fieldset.include:
+        options.append(selectinload(model.user))
+    return options
+
+def post_options(fieldset: Fieldset):
+    return _load_options(models.Post, fieldset, FEED_FIELDS, ("user_id",))
+
+def comment_options(fieldset: Fieldset, model=models.Comment):
+    """Loader options for ``models.Comment`` or ``models.ArchivedComment``"""
+    return _load_options(model, fieldset, COMMENT_FIELDS, ("user_id", "post_id"))
+
+def needs_counts(fieldset: Fieldset) -> bool:
+    return not COUNT_FIELDS.isdisjoint(fieldset.fields)
+
+def _value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+def _user(user: models.User, cache: Optional[Dict[int, dict]]) -> dict:
+    # Authors repeat across a page; serialize each one once per response
+    if cache is None:
+        return schemas.User.model_validate(user).model_dump(mode="json")
+    if user.id not in cache:
+        cache[user.id] = schemas.User.model_validate(user).model_dump(mode="json")
+    return cache[user.id]
+
+def serialize_post(
+    post: models.Post,
+    fieldset: Fieldset,
+    counts: Optional[Tuple[int, int]] = None,
+    comments: Optional[List[dict]] = None,
+    user_cache: Optional[Dict[int, dict]] = None
+) -> dict:
+    data = {}
+    for name in fieldset.fields:
+        if name in URL_FIELDS:
+            key = getattr(post, URL_FIELDS[name])
+            data[name] = minio_client.get_file_url(key) if key else None
+        elif name == "like_count":
+            data[name] = counts[0] if counts else 0
+        elif name == "dislike_count":
+            data[name] = counts[1] if counts else 0
+        elif name in VIEWER_FIELDS:
+            data[name] = None
+        else:
+            data[name] = _value(getattr(post, name))
+    if "user" in fieldset.include:
+        data["user"] = _user(post.user, user_cache)
+    if comments is not None:
+        data["comments"] = comments
+    return data
+
+def serialize_posts(db: Session, posts: List[models.Post], fieldset: Fieldset) -> List[dict]:
+    """Serialize posts, querying reaction counts only if they were asked for"""
+    counts = reaction_counts_many(db, [post.id for post in posts]) if needs_counts(fieldset) else {}
+    user_cache = {}
+    return [serialize_post(post, fieldset, counts.get(post.id), user_cache=user_cache) for post in posts]
+
+def serialize_comment(comment: models.Comment, fieldset: Fieldset, user_cache: Optional[Dict[int, dict]] = None) -> dict:
+    data = {name: _value(getattr(comment, name)) for name in fieldset.fields}
+    if "user" in fieldset.include:
+        data["user"] = _user(comment.user, user_cache)
+    return data
+
+def serialize_comments(comments: List[models.Comment], fieldset: Fieldset) -> List[dict]:
+    user_cache = {}
+    return [serialize_comment(comment, fieldset, user_cache) for comment in comments]
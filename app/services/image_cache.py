@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import BinaryIO, Dict, Iterable, NamedTuple, Optional
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..utils.minio_client import MinIOClient, minio_client
+
+logger = logging.getLogger(__name__)
+
+FETCH_CHUNK_SIZE = 256 * 1024
+
+class CachedImage(NamedTuple):
+    object_key: str
+    path: str
+    size: int
+    content_type: str
+    etag: str
+
+class DiskImageCache:
+    """Bounded on-disk LRU cache of image objects in front of MinIO.
+
+    Files are written to a temporary name and renamed into place, so several
+    worker processes can share one cache directory; a file another worker
+    fetched is adopted instead of downloaded again. ``max_bytes`` bounds what
+    each process indexes and evicts. Concurrent misses for the same key in
+    one process share a single download.
+    """
+
+    def __init__(self, storage: MinIOClient, directory: str, max_bytes: int, fetch_timeout: float):
+        self.storage = storage
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fetch_timeout = fetch_timeout
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._scanned = False
+        self._scan_lock = threading.Lock()
+
+    def _paths(self, object_key: str):
+        digest = hashlib.sha256(object_key.encode()).hexdigest()
+        base = os.path.join(self.directory, digest[:2], digest)
+        return base, base + ".meta"
+
+    def relative_path(self, image: CachedImage) -> str:
+        return os.path.relpath(image.path, self.directory)
+
+    def load_index(self):
+        """Index files left by earlier runs or other workers (oldest first).
+
+        Runs once, from app startup or else the first lookup. The directory
+        walk happens outside the cache lock.
+        """
+        with self._scan_lock:
+            if self._scanned:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            found = []
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".meta"):
+                        continue
+                    image = self._read_meta(os.path.join(root, name))
+                    if image is not None:
+                        found.append((os.path.getmtime(image.path), image))
+            with self._lock:
+                for _, image in sorted(found, key=lambda item: item[0]):
+                    self._insert(image)
+            self._scanned = True
+
+    def _read_meta(self, meta_path: str) -> Optional[CachedImage]:
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            path = meta_path[:-len(".meta")]
+            return CachedImage(meta["object_key"], path, os.path.getsize(path), meta["content_type"], meta["etag"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, object_key: str) -> Optional[CachedImage]:
+        """Cached image for ``object_key``, fetched from storage on a miss.
+
+        Returns None when the object doesn't exist.
+        """
+        if not self._scanned:
+            self.load_index()
+        with self._lock:
+            image = self._entries.get(object_key)
+            if image is not None:
+                self._entries.move_to_end(object_key)
+                metrics.inc("image_cache_hits_total")
+                return image
+            future = self._inflight.get(object_key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[object_key] = future
+
+        if not leader:
+            metrics.inc("image_cache_coalesced_total")
+            try:
+                return future.result(timeout=self.fetch_timeout)
+            except FutureTimeoutError:
+                # The shared download is stuck; a second one is cheaper than an error
+                metrics.inc("image_cache_coalesce_timeouts_total")
+                logger.warning(f"Timed out waiting for a download of {object_key}, fetching it directly")
+                return self._load(object_key)
+
+        try:
+            image = self._load(object_key)
+            future.set_result(image)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(object_key, None)
+        return image
+
+    def _load(self, object_key: str) -> Optional[CachedImage]:
+        """Adopt a file another worker cached, or fetch the object, and index it"""
+        _, meta_path = self._paths(object_key)
+        image = self._read_meta(meta_path)
+        if image is not None:
+            metrics.inc("image_cache_hits_total")
+        else:
+            metrics.inc("image_cache_misses_total")
+            image = self._fetch(object_key)
+        if image is not None:
+            with self._lock:
+                self._insert(image)
+        return image
+
+    def _fetch(self, object_key: str) -> Optional[CachedImage]:
+        response = self.storage.open_object(object_key)
+        if response is None:
+            return None
+
+        path, meta_path = self._paths(object_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        suffix = f".tmp-{uuid.uuid4().hex}"
+        size = 0
+        try:
+            with open(path + suffix, "wb") as f:
+                for chunk in response.stream(FETCH_CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            content_type = response.headers.get("Content-Type") or "application/octet-stream"
+            etag = (response.headers.get("ETag") or "").strip('"') or hashlib.md5(
+                object_key.encode(), usedforsecurity=False
+            ).hexdigest()
+            with open(meta_path + suffix, "w") as f:
+                json.dump({"object_key": object_key, "content_type": content_type, "etag": etag}, f)
+            # Data first: a reader only trusts files that have metadata
+            os.replace(path + suffix, path)
+            os.replace(meta_path + suffix, meta_path)
+        except BaseException:
+            for leftover in (path + suffix, meta_path + suffix):
+                try:
+                    os.unlink(leftover)
+                except OSError:
+                    pass
+            raise
+        finally:
+            response.close()
+            response.release_conn()
+
+        metrics.inc("image_cache_fetched_bytes_total", size)
+        return CachedImage(object_key, path, size, content_type, etag)
+
+    def _insert(self, image: CachedImage):
+        previous = self._entries.pop(image.object_key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[image.object_key] = image
+        self._bytes += image.size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            metrics.inc("image_cache_evictions_total")
+            for leftover in (evicted.path + ".meta", evicted.path):
+                try:
+                    os.unlink(leftover)
+                except OSError:
+                    pass
+
+    def open(self, image: CachedImage) -> Optional[BinaryIO]:
+        """Open a cached file, or None if another worker evicted it meanwhile.
+
+        An open file stays readable after eviction unlinks it.
+        """
+        try:
+            return open(image.path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                if self._entries.get(image.object_key) == image:
+                    self._entries.pop(image.object_key)
+                    self._bytes -= image.size
+            return None
+
+    def evict(self, object_keys: Iterable[str]):
+        """Drop deleted objects from the index and the shared directory.
+
+        Other workers on this host notice the missing files on their next
+        ``open``; they may answer conditional requests until then.
+        """
+        for object_key in object_keys:
+            with self._lock:
+                image = self._entries.pop(object_key, None)
+                if image is not None:
+                    self._bytes -= image.size
+            path, meta_path = self._paths(object_key)
+            for leftover in (meta_path, path):
+                try:
+                    os.unlink(leftover)
+                except OSError:
+                    pass
+
+    @property
+    def cached_bytes(self) -> int:
+        return self._bytes
+
+    def hit_ratio(self) -> Optional[float]:
+        hits = metrics.get("image_cache_hits_total") + metrics.get("image_cache_coalesced_total")
+        total = hits + metrics.get("image_cache_misses_total")
+        return hits / total if total else None
+
+image_cache = DiskImageCache(
+    minio_client,
+    directory=settings.IMAGE_CACHE_DIR,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    fetch_timeout=settings.IMAGE_CACHE_FETCH_TIMEOUT_SECONDS
+)
+
+metrics.register_gauge("image_cache_bytes", lambda: image_cache.cached_bytes)
+metrics.register_gauge("image_cache_hit_ratio", image_cache.hit_ratio)
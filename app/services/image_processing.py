@@ -0,0 +1,170 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from PIL import Image, ImageOps
+from ..core.config import settings
+from ..db.database import SessionLocal
+from ..db import models
+from ..utils import blurhash
+from ..utils.minio_client import MinIOClient, minio_client
+from . import object_deletion
+
+logger = logging.getLogger(__name__)
+
+IMAGE_STATUS_PENDING = "pending"
+IMAGE_STATUS_READY = "ready"
+IMAGE_STATUS_FAILED = "failed"
+
+PLACEHOLDER_SAMPLE_SIZE = 32
+
+VARIANT_KEYS = ("thumbnail_key", "medium_key", "webp_key")
+
+class ImageProcessor:
+    """Generates resized variants of uploaded images off the request path.
+
+    Jobs run on a small thread pool. At most ``max_pending`` jobs are queued
+    or running at once; when the pool is saturated new jobs are rejected and
+    the post keeps ``image_status = "pending"`` so clients fall back to the
+    original image.
+    """
+
+    def __init__(self, storage: MinIOClient, max_workers: int, max_pending: int):
+        self.storage = storage
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="image-processing"
+                )
+            return self._executor
+
+    def submit(self, post_id: int, object_name: str) -> bool:
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"Image processing queue full, skipping variants for post {post_id}")
+            return False
+        try:
+            future = self._get_executor().submit(self._run, post_id, object_name)
+        except RuntimeError:
+            self._slots.release()
+            logger.warning(f"Image processor shut down, skipping variants for post {post_id}")
+            return False
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+    def _run(self, post_id: int, object_name: str):
+        try:
+            values = self.process(object_name)
+            values["image_status"] = IMAGE_STATUS_READY
+        except Exception as e:
+            logger.error(f"Error processing image {object_name} for post {post_id}: {e}")
+            values = {"image_status": IMAGE_STATUS_FAILED}
+
+        db = SessionLocal()
+        try:
+            updated = db.query(models.Post).filter(
+                models.Post.id == post_id, models.Post.deleted_at.is_(None)
+            ).update(values)
+            if not updated:
+                # The post was deleted while its variants were generated; its
+                # delete only queued the keys it knew about. The deletion
+                # worker keeps them if another post still shares the image.
+                variants = [values[key] for key in VARIANT_KEYS if values.get(key)]
+                if variants:
+                    object_deletion.enqueue(db, variants, owner_key=object_name)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error saving image variants for post {post_id}: {e}")
+        finally:
+            db.close()
+
+    def process(self, object_name: str) -> Dict[str, object]:
+        """Build thumbnail, medium and WebP variants for a stored image.
+
+        Returns the ``Post`` column values describing the variants.
+        """
+        data = self.storage.get_bytes(object_name)
+        with Image.open(io.BytesIO(data)) as source:
+            image = ImageOps.exif_transpose(source)
+            image.load()
+
+        width, height = image.size
+        stem = object_name.rsplit('.', 1)[0]
+
+        rgb = image if image.mode == "RGB" else image.convert("RGB")
+
+        thumbnail_key = self.storage.put_bytes(
+            f"{stem}_thumb.jpg",
+            self._encode_jpeg(rgb, settings.IMAGE_THUMBNAIL_SIZE),
+            "image/jpeg"
+        )
+        medium_key = self.storage.put_bytes(
+            f"{stem}_medium.jpg",
+            self._encode_jpeg(rgb, settings.IMAGE_MEDIUM_SIZE),
+            "image/jpeg"
+        )
+        webp_key = self.storage.put_bytes(
+            f"{stem}.webp",
+            self._encode_webp(image, settings.IMAGE_MEDIUM_SIZE),
+            "image/webp"
+        )
+
+        return {
+            "thumbnail_key": thumbnail_key,
+            "medium_key": medium_key,
+            "webp_key": webp_key,
+            "image_width": width,
+            "image_height": height,
+            "placeholder_hash": self._placeholder_hash(rgb),
+        }
+
+    @staticmethod
+    def _resized(image: Image.Image, max_size: int) -> Image.Image:
+        if max(image.size) <= max_size:
+            return image
+        resized = image.copy()
+        resized.thumbnail((max_size, max_size), Image.LANCZOS)
+        return resized
+
+    def _encode_jpeg(self, image: Image.Image, max_size: int) -> bytes:
+        buffer = io.BytesIO()
+        self._resized(image, max_size).save(
+            buffer, format="JPEG", quality=settings.IMAGE_JPEG_QUALITY, optimize=True, progressive=True
+        )
+        return buffer.getvalue()
+
+    def _encode_webp(self, image: Image.Image, max_size: int) -> bytes:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        buffer = io.BytesIO()
+        self._resized(image, max_size).save(
+            buffer, format="WEBP", quality=settings.IMAGE_WEBP_QUALITY, method=4
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def _placeholder_hash(image: Image.Image) -> str:
+        sample = image.resize((PLACEHOLDER_SAMPLE_SIZE, PLACEHOLDER_SAMPLE_SIZE), Image.BILINEAR)
+        return blurhash.encode(
+            list(sample.getdata()), PLACEHOLDER_SAMPLE_SIZE, PLACEHOLDER_SAMPLE_SIZE
+        )
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+image_processor = ImageProcessor(
+    minio_client,
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    max_pending=settings.IMAGE_PROCESSING_QUEUE_SIZE
+)
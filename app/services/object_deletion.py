@@ -0,0 +1,134 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.background import PeriodicWorker
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import SessionLocal
+from ..db import models
+from ..utils.minio_client import MinIOClient, minio_client
+from .image_cache import DiskImageCache, image_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_BACKOFF_SECONDS = 10
+
+def enqueue(db: Session, object_keys: Iterable[str], owner_key: str):
+    """Queue objects for deletion inside the caller's transaction.
+
+    Nothing is removed from storage until the transaction commits, so a
+    rolled back delete never leaves a row pointing at a missing object.
+    """
+    now = datetime.utcnow()
+    db.add_all([
+        models.ObjectDeletion(object_key=key, owner_key=owner_key, attempts=0, next_attempt_at=now)
+        for key in object_keys
+    ])
+
+def queue_depth() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(func.count(models.ObjectDeletion.id)).scalar()
+    finally:
+        db.close()
+
+class ObjectDeletionWorker(PeriodicWorker):
+    """Drains ``object_deletions`` with bulk ``remove_objects`` calls.
+
+    Failed keys are retried with exponential backoff capped at
+    ``max_backoff`` seconds. Removed objects are evicted from ``cache``.
+    """
+
+    name = "object-deletion-worker"
+
+    def __init__(
+        self,
+        storage: MinIOClient,
+        cache: DiskImageCache,
+        interval: float,
+        batch_size: int,
+        max_backoff: int
+    ):
+        super().__init__(interval)
+        self.storage = storage
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+
+    def _backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), self.max_backoff))
+
+    def run_once(self) -> int:
+        deleted_total = 0
+        while True:
+            deleted, fetched = self._drain_batch()
+            deleted_total += deleted
+            if fetched < self.batch_size:
+                return deleted_total
+
+    def _drain_batch(self):
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            # Every server worker runs this loop; SKIP LOCKED hands each one
+            # a disjoint batch
+            rows = db.query(models.ObjectDeletion).filter(
+                models.ObjectDeletion.next_attempt_at <= now
+            ).order_by(models.ObjectDeletion.id).limit(self.batch_size).with_for_update(skip_locked=True).all()
+            if not rows:
+                return 0, 0
+
+            # Images referenced again since their deletion was queued are kept.
+            # The locking read waits for uploads that are taking a reference
+            # right now and holds off new ones until the objects are gone, so
+            # an upload never re-uses an object removed below.
+            owners = {row.owner_key for row in rows}
+            referenced = {
+                key for (key,) in db.query(models.StoredObject.object_key).filter(
+                    models.StoredObject.object_key.in_(owners)
+                ).with_for_update()
+            }
+            pending = []
+            for row in rows:
+                if row.owner_key in referenced:
+                    db.delete(row)
+                else:
+                    pending.append(row)
+
+            try:
+                errors = self.storage.delete_files([row.object_key for row in pending]) if pending else {}
+            except Exception as e:
+                logger.error(f"Bulk object deletion failed: {e}")
+                errors = {row.object_key: str(e) for row in pending}
+
+            removed = []
+            for row in pending:
+                error = errors.get(row.object_key)
+                if error is None:
+                    db.delete(row)
+                    removed.append(row.object_key)
+                    continue
+                row.attempts += 1
+                row.last_error = error
+                row.next_attempt_at = now + self._backoff(row.attempts)
+
+            db.commit()
+            self.cache.evict(removed)
+            deleted = len(removed)
+            metrics.inc("object_deletions_total", deleted)
+            metrics.inc("object_deletion_failures_total", len(pending) - deleted)
+            return deleted, len(rows)
+        finally:
+            db.close()
+
+object_deletion_worker = ObjectDeletionWorker(
+    minio_client,
+    image_cache,
+    interval=settings.OBJECT_DELETION_INTERVAL_SECONDS,
+    batch_size=settings.OBJECT_DELETION_BATCH_SIZE,
+    max_backoff=settings.OBJECT_DELETION_MAX_BACKOFF_SECONDS
+)
+
+metrics.register_gauge("object_deletion_queue_depth", queue_depth)
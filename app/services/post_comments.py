@@ -0,0 +1,59 @@
+"""Comment counts and comment previews of feed posts.
+
+``posts.comment_count`` is adjusted by every comment write in the same
+transaction, and the previews of a whole feed page come from one windowed
+query (``ROW_NUMBER() OVER (PARTITION BY post_id ...)``) over the hot and,
+for archived posts, the archive comment table.
+"""
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy import case, func, select, union_all
+from sqlalchemy.orm import Session
+from ..db import models, schemas
+
+def adjust_counts(db: Session, deltas: Dict[int, int]):
+    """Add ``{post_id: delta}`` to the posts' comment counts in one statement"""
+    deltas = {post_id: delta for post_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    db.query(models.Post).filter(models.Post.id.in_(list(deltas))).update(
+        {models.Post.comment_count: models.Post.comment_count + case(deltas, value=models.Post.id, else_=0)},
+        synchronize_session=False
+    )
+
+def load_previews(db: Session, posts: List[models.Post], size: int) -> Dict[int, List[schemas.Comment]]:
+    """``{post_id: comments}`` with the first ``size`` comments, ordered by (created_at, id)"""
+    post_ids = [post.id for post in posts if post.comment_count]
+    if size <= 0 or not post_ids:
+        return {}
+    archived_ids = [post.id for post in posts if post.comment_count and post.archived_at is not None]
+
+    def threads(model, ids):
+        return select(
+            model.id, model.content, model.user_id, model.post_id, model.created_at
+        ).where(model.post_id.in_(ids))
+
+    comments = threads(models.Comment, post_ids)
+    if archived_ids:
+        comments = union_all(comments, threads(models.ArchivedComment, archived_ids))
+    comments = comments.subquery()
+    ranked = select(comments, func.row_number().over(
+        partition_by=comments.c.post_id,
+        order_by=(comments.c.created_at, comments.c.id)
+    ).label("position")).subquery()
+    rows = db.execute(select(
+        ranked.c.id, ranked.c.content, ranked.c.user_id, ranked.c.post_id, ranked.c.created_at, models.User
+    ).join(models.User, models.User.id == ranked.c.user_id).where(
+        ranked.c.position <= size
+    ).order_by(ranked.c.post_id, ranked.c.position))
+
+    previews = defaultdict(list)
+    users = {}
+    for row in rows:
+        if row.user_id not in users:
+            users[row.user_id] = schemas.User.model_validate(row.User)
+        previews[row.post_id].append(schemas.Comment(
+            id=row.id, content=row.content, user_id=row.user_id,
+            post_id=row.post_id, created_at=row.created_at, user=users[row.user_id]
+        ))
+    return previews
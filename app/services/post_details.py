@@ -0,0 +1,47 @@
+"""Hydration of posts with author, reaction counts and optionally comments.
+
+Shared by the single-post and batch endpoints so both return identical
+objects, built with a fixed number of queries regardless of how many posts
+are requested.
+"""
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from ..db import models, schemas
+from .reaction_buffer import reaction_counts_many
+from .archival import load_comments
+
+def load_post_details(db: Session, post_ids: List[int], with_comments: bool = False) -> Dict[int, schemas.PostWithCounts]:
+    """``{post_id: post}`` for the ids that exist.
+
+    Queries: posts with authors, reaction counts, and comments with authors
+    when ``with_comments`` (then values are ``PostWithDetails``).
+    """
+    posts = db.query(models.Post).options(joinedload(models.Post.user)).filter(
+        models.Post.id.in_(post_ids),
+        models.Post.deleted_at.is_(None)
+    ).all()
+    if not posts:
+        return {}
+    ids = [post.id for post in posts]
+    counts = reaction_counts_many(db, ids)
+    
+    schema = schemas.PostWithCounts
+    if with_comments:
+        schema = schemas.PostWithDetails
+        comments = defaultdict(list)
+        archived_ids = [post.id for post in posts if post.archived_at is not None]
+        for comment in load_comments(db, ids, archived_ids, lambda model: [joinedload(model.user)]):
+            comments[comment.post_id].append(comment)
+        for post in posts:
+            # Populate the relationship without triggering a lazy load per post
+            set_committed_value(post, "comments", comments[post.id])
+    
+    return {
+        post.id: schema.model_validate(post).model_copy(update={
+            "like_count": counts[post.id][0],
+            "dislike_count": counts[post.id][1]
+        })
+        for post in posts
+    }
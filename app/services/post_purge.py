@@ -0,0 +1,104 @@
+"""Deletion of posts with many comments and reactions.
+
+Comments and reactions reference their post with ``ON DELETE CASCADE``, so
+deleting a post is a single statement. For a post with more than
+``POST_PURGE_THRESHOLD`` dependent rows that statement would still delete
+and lock all of them in one transaction, so such posts are tombstoned
+instead: ``deleted_at`` hides the post from every read and write right away,
+and the purge worker deletes its rows in chunks before removing the post.
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.background import PeriodicWorker
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import SessionLocal
+from ..db import models
+
+logger = logging.getLogger(__name__)
+
+# Dependent tables and the column deleted rows are selected by
+CHILD_KEYS = (
+    (models.Comment, models.Comment.id),
+    (models.Reaction, models.Reaction.id),
+    (models.ArchivedComment, models.ArchivedComment.id),
+    (models.ArchivedReaction, models.ArchivedReaction.user_id),
+)
+
+def dependent_rows(db: Session, post_id: int, limit: int) -> int:
+    """Comments and reactions of a post, counting at most ``limit`` per table"""
+    return sum(
+        db.query(func.count()).select_from(
+            db.query(key).filter(model.post_id == post_id).limit(limit).subquery()
+        ).scalar()
+        for model, key in CHILD_KEYS
+    )
+
+def delete_post(db: Session, post: models.Post) -> bool:
+    """Delete ``post`` or tombstone it when it is too large to delete inline.
+
+    Returns True when the post was tombstoned. The caller commits.
+    """
+    threshold = settings.POST_PURGE_THRESHOLD
+    if threshold > 0 and dependent_rows(db, post.id, threshold + 1) > threshold:
+        post.deleted_at = datetime.utcnow()
+        metrics.inc("post_tombstones_total")
+        return True
+    db.delete(post)
+    return False
+
+class PostPurgeWorker(PeriodicWorker):
+    """Deletes the rows of tombstoned posts, ``batch_size`` per table and transaction.
+
+    Each chunk is its own short transaction on the post row claimed with
+    ``FOR UPDATE SKIP LOCKED``; the post itself goes once nothing is left.
+    """
+
+    name = "post-purge"
+
+    def __init__(self, interval: float, batch_size: int):
+        super().__init__(interval)
+        self.batch_size = batch_size
+
+    def run_once(self) -> int:
+        purged_total = 0
+        while True:
+            purged = self._purge_chunk()
+            if purged is None:
+                return purged_total
+            purged_total += purged
+
+    def _purge_chunk(self):
+        """Rows deleted by one chunk, or None when no tombstone is left"""
+        db = SessionLocal()
+        try:
+            post = db.query(models.Post).filter(
+                models.Post.deleted_at.isnot(None)
+            ).order_by(models.Post.id).with_for_update(skip_locked=True).first()
+            if post is None:
+                return None
+
+            deleted = 0
+            for model, key in CHILD_KEYS:
+                keys = [value for (value,) in db.query(key).filter(
+                    model.post_id == post.id
+                ).limit(self.batch_size)]
+                if keys:
+                    deleted += db.query(model).filter(
+                        model.post_id == post.id, key.in_(keys)
+                    ).delete(synchronize_session=False)
+            if not deleted:
+                db.delete(post)
+                logger.info(f"Purged tombstoned post {post.id}")
+            db.commit()
+            metrics.inc("post_purge_rows_total", deleted)
+            return deleted
+        finally:
+            db.close()
+
+post_purge_worker = PostPurgeWorker(
+    interval=settings.POST_PURGE_INTERVAL_SECONDS,
+    batch_size=settings.POST_PURGE_BATCH_SIZE
+)
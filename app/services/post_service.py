@@ -38,7 +38,7 @@ class PostService:
                 "id": post.id,
                 "title": post.title,
                 "description": post.description,
-                "image_url": post.image_url,
+                "image_key": post.image_key,
                 "user_id": post.user_id,
                 "created_at": post.created_at,
                 "user": post.user,
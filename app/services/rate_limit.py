@@ -0,0 +1,244 @@
+"""Token-bucket rate limits for write and authentication routes.
+
+Each route class (``auth``, ``posts``, ``comments``, ``reactions``,
+``exports``) has a
+bucket of ``capacity`` tokens that refills over ``period`` seconds. Buckets
+are keyed by user id on authenticated routes and by client IP on anonymous
+ones. The in-process store keeps buckets per worker; the Redis store shares
+them between workers and hosts.
+"""
+import logging
+import math
+import time
+from typing import Dict, NamedTuple, Tuple
+from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.security import get_current_user
+from ..db import models
+
+logger = logging.getLogger(__name__)
+
+class Limit(NamedTuple):
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second"""
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit":
+        """``"<requests>/<seconds>"``, e.g. ``"10/60"``"""
+        capacity, _, period = value.partition("/")
+        return cls(int(capacity), float(period or 1))
+
+class MemoryBucketStore:
+    """Buckets in a dict of ``key -> [tokens, updated_at, rate, capacity]``.
+
+    Only used from the event loop thread, so it takes no lock. When more
+    than ``max_keys`` buckets exist, buckets that have refilled completely
+    (indistinguishable from new ones) are dropped, then the oldest ones.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+
+    def take(self, key: str, limit: Limit) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, tokens left)"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [limit.capacity - 1.0, now, limit.rate, limit.capacity]
+            return True, limit.capacity - 1.0
+        tokens, updated_at, rate, capacity = bucket
+        tokens += (now - updated_at) * rate
+        if tokens > capacity:
+            tokens = capacity
+        bucket[1] = now
+        if tokens >= 1:
+            tokens -= 1
+            bucket[0] = tokens
+            return True, tokens
+        bucket[0] = tokens
+        return False, tokens
+
+    def _prune(self, now: float):
+        full = [key for key, (tokens, updated_at, rate, capacity) in self._buckets.items()
+                if tokens + (now - updated_at) * rate >= capacity]
+        for key in full:
+            del self._buckets[key]
+        excess = len(self._buckets) - self.max_keys // 2
+        for key in list(self._buckets)[:max(excess, 0)]:
+            del self._buckets[key]
+        metrics.inc("rate_limit_buckets_pruned_total", len(full) + max(excess, 0))
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+# Refill and take in one round trip; Redis' clock keeps workers consistent
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+class RedisBucketStore:
+    """Buckets shared by every worker through Redis (``pip install redis``)"""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key: str, limit: Limit) -> Tuple[bool, float]:
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[limit.capacity, limit.rate])
+        return bool(allowed), float(tokens)
+
+# Request scope entry holding the RateLimit headers of an allowed request
+HEADERS_SCOPE_KEY = "rate_limit_headers"
+
+class RateLimitHeadersMiddleware:
+    """Adds the RateLimit headers a limit dependency recorded to the response.
+
+    Routes that return their own Response (streams, pre-rendered JSON)
+    would otherwise drop the headers FastAPI merges from dependencies.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = scope.get(HEADERS_SCOPE_KEY)
+                if headers:
+                    message["headers"] = list(message.get("headers", ())) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class RateLimiter:
+    def __init__(self, store, limits: Dict[str, Limit], enabled: bool = True):
+        self.store = store
+        self.limits = limits
+        self.enabled = enabled
+        # Headers that only depend on the limit, encoded once
+        self._static_headers = {
+            route_class: [
+                (b"ratelimit-limit", str(limit.capacity).encode()),
+                (b"ratelimit-policy", f"{limit.capacity};w={limit.period:g}".encode()),
+            ]
+            for route_class, limit in limits.items()
+        }
+
+    def check(self, route_class: str, key: str, request: Request):
+        """Take a token for ``key`` or raise 429; sets the RateLimit headers"""
+        limit = self.limits[route_class]
+        try:
+            allowed, tokens = self.store.take(f"{route_class}:{key}", limit)
+        except Exception as e:
+            # A limiter outage must not take the write paths down with it
+            metrics.inc("rate_limit_store_errors_total")
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return
+
+        if not allowed:
+            metrics.inc("rate_limit_rejected_total")
+            retry_after = str(math.ceil((1 - tokens) / limit.rate))
+            raise HTTPException(status_code=429, detail="Too many requests", headers={
+                "RateLimit-Limit": str(limit.capacity),
+                "RateLimit-Remaining": "0",
+                "RateLimit-Reset": retry_after,
+                "RateLimit-Policy": f"{limit.capacity};w={limit.period:g}",
+                "Retry-After": retry_after,
+            })
+        # Added to whatever response the route returns by
+        # RateLimitHeadersMiddleware, already encoded
+        request.scope[HEADERS_SCOPE_KEY] = self._static_headers[route_class] + [
+            (b"ratelimit-remaining", str(int(tokens)).encode()),
+            (b"ratelimit-reset", str(math.ceil((limit.capacity - tokens) / limit.rate)).encode()),
+        ]
+
+    async def _limit(self, route_class: str, key: str, request: Request):
+        if not self.enabled:
+            return
+        if self.store.blocking:
+            await run_in_threadpool(self.check, route_class, key, request)
+        else:
+            # Cheap enough to run on the event loop
+            self.check(route_class, key, request)
+
+    def per_user(self, route_class: str):
+        """Dependency limiting ``route_class`` per authenticated user"""
+        async def limit_user(request: Request, current_user: models.User = Depends(get_current_user)):
+            await self._limit(route_class, f"user:{current_user.id}", request)
+
+        return limit_user
+
+    def per_ip(self, route_class: str):
+        """Dependency limiting ``route_class`` per client address.
+
+        Behind a reverse proxy the address comes from X-Forwarded-For when
+        the server trusts the proxy (``FORWARDED_ALLOW_IPS``, read by
+        uvicorn and gunicorn.conf.py).
+        """
+        async def limit_ip(request: Request):
+            host = request.client.host if request.client else "unknown"
+            await self._limit(route_class, f"ip:{host}", request)
+
+        return limit_ip
+
+def _create_store():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBucketStore(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryBucketStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
+rate_limiter = RateLimiter(
+    _create_store(),
+    limits={
+        "auth": Limit.parse(settings.RATE_LIMIT_AUTH),
+        "posts": Limit.parse(settings.RATE_LIMIT_POSTS),
+        "comments": Limit.parse(settings.RATE_LIMIT_COMMENTS),
+        "reactions": Limit.parse(settings.RATE_LIMIT_REACTIONS),
+        "exports": Limit.parse(settings.RATE_LIMIT_EXPORTS),
+    },
+    enabled=settings.RATE_LIMIT_ENABLED
+)
+
+limit_auth = rate_limiter.per_ip("auth")
+limit_posts = rate_limiter.per_user("posts")
+limit_comments = rate_limiter.per_user("comments")
+limit_reactions = rate_limiter.per_user("reactions")
+limit_exports = rate_limiter.per_user("exports")
+
+if isinstance(rate_limiter.store, MemoryBucketStore):
+    metrics.register_gauge("rate_limit_buckets", lambda: len(rate_limiter.store))
@@ -0,0 +1,261 @@
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, union_all
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..core.background import PeriodicWorker
+from ..core.config import settings
+from ..core.metrics import metrics
+from ..db.database import SessionLocal
+from ..db import models
+from . import user_stats
+from .archival import promote_reactions
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHUNK_SIZE = 500
+
+# post_id -> user_id -> reaction type, or None for a removed reaction
+PendingReactions = Dict[int, Dict[int, Optional[str]]]
+
+def upsert_reactions(db: Session, rows: List[dict]):
+    """Insert or update reactions in one multi-row statement.
+
+    Relies on the (user_id, post_id) unique constraint; the latest
+    ``reaction_type`` wins.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(models.Reaction).values(rows)
+        stmt = stmt.on_duplicate_key_update(reaction_type=stmt.inserted.reaction_type)
+    else:
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(models.Reaction).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "post_id"],
+            set_={"reaction_type": stmt.excluded.reaction_type}
+        )
+    db.execute(stmt)
+
+class ReactionBuffer(PeriodicWorker):
+    """Write-behind buffer for reactions on hot posts.
+
+    Clicks are coalesced per post in memory, latest wins per (user, post),
+    and flushed every ``interval`` seconds as batched upserts and deletes in
+    a single transaction. When ``max_entries`` is reached the writer flushes
+    synchronously first, which bounds memory and pushes back on clients.
+    Entries stay visible to reads until their flush has committed.
+    """
+
+    name = "reaction-buffer"
+
+    def __init__(self, interval: float, max_entries: int, enabled: bool):
+        super().__init__(interval)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: PendingReactions = defaultdict(dict)
+        self._flushing: PendingReactions = {}
+        self._size = 0
+
+    def put(self, user_id: int, post_id: int, reaction_type: Optional[str]):
+        while True:
+            with self._lock:
+                users = self._pending[post_id]
+                if user_id in users:
+                    users[user_id] = reaction_type
+                    metrics.inc("reaction_buffer_coalesced_total")
+                    return
+                if self._size < self.max_entries:
+                    users[user_id] = reaction_type
+                    self._size += 1
+                    return
+            metrics.inc("reaction_buffer_full_total")
+            self.flush()
+
+    def pending_for_post(self, post_id: int) -> Dict[int, Optional[str]]:
+        with self._lock:
+            merged = dict(self._flushing.get(post_id, {}))
+            merged.update(self._pending.get(post_id, {}))
+            return merged
+
+    def pending_for_user(self, user_id: int, post_ids: List[int]) -> Dict[int, Optional[str]]:
+        """``{post_id: reaction_type}`` of the user's buffered changes among ``post_ids``"""
+        pending = {}
+        with self._lock:
+            for post_id in post_ids:
+                for entries in (self._flushing.get(post_id), self._pending.get(post_id)):
+                    if entries and user_id in entries:
+                        pending[post_id] = entries[user_id]
+        return pending
+
+    def pending_reaction(self, user_id: int, post_id: int) -> Tuple[bool, Optional[str]]:
+        """``(buffered, reaction_type)``; reaction_type is None for a buffered removal"""
+        pending = self.pending_for_post(post_id)
+        return user_id in pending, pending.get(user_id)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def run_once(self) -> int:
+        return self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                if not self._size:
+                    return 0
+                batch, self._flushing = self._pending, self._pending
+                self._pending = defaultdict(dict)
+                self._size = 0
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                logger.error(f"Reaction flush failed, requeueing: {e}")
+                metrics.inc("reaction_buffer_flush_failures_total")
+                with self._lock:
+                    # Entries written again meanwhile are newer; keep those
+                    for post_id, users in batch.items():
+                        for user_id, reaction_type in users.items():
+                            if user_id not in self._pending[post_id]:
+                                self._pending[post_id][user_id] = reaction_type
+                                self._size += 1
+                    self._flushing = {}
+                return 0
+            with self._lock:
+                self._flushing = {}
+            metrics.inc("reaction_buffer_flushes_total")
+            metrics.inc("reaction_buffer_rows_flushed_total", written)
+            return written
+
+    def _write(self, batch: PendingReactions) -> int:
+        db = SessionLocal()
+        try:
+            # Reactions to posts deleted since the click are dropped. The
+            # shared lock keeps the archival job off these posts until commit.
+            posts = {
+                post.id: post for post in db.query(models.Post.id, models.Post.user_id, models.Post.archived_at).filter(
+                    models.Post.id.in_(list(batch)),
+                    models.Post.deleted_at.is_(None)
+                ).with_for_update(read=True)
+            }
+            owners = {post_id: post.user_id for post_id, post in posts.items()}
+            upserts, deletes = [], {}
+            for post_id, users in batch.items():
+                if post_id not in owners:
+                    continue
+                if posts[post_id].archived_at is not None:
+                    promote_reactions(db, post_id, list(users))
+                stored = dict(db.query(models.Reaction.user_id, models.Reaction.reaction_type).filter(
+                    models.Reaction.post_id == post_id,
+                    models.Reaction.user_id.in_(list(users))
+                ))
+                user_stats.adjust(db, owners[post_id], likes_received=sum(
+                    user_stats.like_delta(stored[user_id].value if user_id in stored else None, reaction_type)
+                    for user_id, reaction_type in users.items()
+                ))
+                removed = [user_id for user_id, reaction_type in users.items() if reaction_type is None]
+                if removed:
+                    deletes[post_id] = removed
+                upserts.extend(
+                    {"user_id": user_id, "post_id": post_id, "reaction_type": models.ReactionType(reaction_type)}
+                    for user_id, reaction_type in users.items() if reaction_type is not None
+                )
+            for start in range(0, len(upserts), UPSERT_CHUNK_SIZE):
+                upsert_reactions(db, upserts[start:start + UPSERT_CHUNK_SIZE])
+            for post_id, user_ids in deletes.items():
+                db.query(models.Reaction).filter(
+                    models.Reaction.post_id == post_id,
+                    models.Reaction.user_id.in_(user_ids)
+                ).delete(synchronize_session=False)
+            db.commit()
+            return len(upserts) + sum(len(user_ids) for user_ids in deletes.values())
+        finally:
+            db.close()
+
+    def stop(self, timeout: Optional[float] = None):
+        super().stop(timeout)
+        self.flush()
+
+def reaction_counts_many(db: Session, post_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+    """``{post_id: (like_count, dislike_count)}`` including buffered and archived reactions.
+
+    One grouped query for all posts (over the hot and archive tables), plus
+    one for stored rows that buffered reactions replace.
+    """
+    counts = {post_id: {"like": 0, "dislike": 0} for post_id in post_ids}
+    if not post_ids:
+        return {}
+    grouped = union_all(*(
+        select(model.post_id, model.reaction_type, func.count()).where(
+            model.post_id.in_(post_ids)
+        ).group_by(model.post_id, model.reaction_type)
+        for model in (models.Reaction, models.ArchivedReaction)
+    ))
+    for post_id, reaction_type, count in db.execute(grouped):
+        counts[post_id][models.ReactionType(reaction_type).value] += count
+
+    pending = {}
+    if reaction_buffer.enabled:
+        pending = {post_id: users for post_id in post_ids if (users := reaction_buffer.pending_for_post(post_id))}
+    if pending:
+        user_ids = {user_id for users in pending.values() for user_id in users}
+        stored = {
+            (post_id, user_id): models.ReactionType(reaction_type)
+            for post_id, user_id, reaction_type in db.execute(union_all(*(
+                select(model.post_id, model.user_id, model.reaction_type).where(
+                    model.post_id.in_(list(pending)), model.user_id.in_(user_ids)
+                )
+                for model in (models.Reaction, models.ArchivedReaction)
+            )))
+        }
+        for post_id, users in pending.items():
+            for user_id, reaction_type in users.items():
+                previous = stored.get((post_id, user_id))
+                if previous is not None:
+                    counts[post_id][previous.value] -= 1
+                if reaction_type is not None:
+                    counts[post_id][reaction_type] += 1
+    return {post_id: (c["like"], c["dislike"]) for post_id, c in counts.items()}
+
+def viewer_reactions(db: Session, user_id: int, post_ids: List[int]) -> Dict[int, str]:
+    """``{post_id: reaction_type}`` for the posts among ``post_ids`` the user reacted to.
+
+    One ``user_id = ? AND post_id IN (...)`` query over the hot and archive
+    tables (served by their (user_id, post_id) keys), with buffered changes
+    applied on top.
+    """
+    if not post_ids:
+        return {}
+    reactions = {
+        post_id: models.ReactionType(reaction_type).value
+        for post_id, reaction_type in db.execute(union_all(*(
+            select(model.post_id, model.reaction_type).where(
+                model.user_id == user_id, model.post_id.in_(post_ids)
+            )
+            for model in (models.Reaction, models.ArchivedReaction)
+        )))
+    }
+    if reaction_buffer.enabled:
+        for post_id, reaction_type in reaction_buffer.pending_for_user(user_id, post_ids).items():
+            if reaction_type is None:
+                reactions.pop(post_id, None)
+            else:
+                reactions[post_id] = reaction_type
+    return reactions
+
+def reaction_counts(db: Session, post_id: int) -> Tuple[int, int]:
+    """``(like_count, dislike_count)`` for a post, including buffered reactions"""
+    return reaction_counts_many(db, [post_id])[post_id]
+
+reaction_buffer = ReactionBuffer(
+    interval=settings.REACTION_FLUSH_INTERVAL_SECONDS,
+    max_entries=settings.REACTION_BUFFER_MAX_ENTRIES,
+    enabled=settings.REACTION_WRITE_BEHIND
+)
+
+metrics.register_gauge("reaction_buffer_pending", lambda: reaction_buffer.size)
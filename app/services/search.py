@@ -0,0 +1,47 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, literal, or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session, joinedload
+from ..db import models
+from ..utils.cursor import decode_cursor, encode_cursor
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_posts(
+    db: Session, q: str, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[models.Post], Optional[str]]:
+    """Posts matching ``q`` in title or description, best match first.
+
+    On MySQL this uses the FULLTEXT index (natural language mode relevance).
+    Other databases fall back to matching every term with LIKE, newest first.
+    Pagination is keyset-based on (score, id): the cursor holds the last
+    row's position, so deep pages cost the same as the first.
+    """
+    if db.get_bind().dialect.name == "mysql":
+        score = match(models.Post.title, models.Post.description, against=q).in_natural_language_mode()
+        condition = score > 0
+    else:
+        score = literal(0.0)
+        condition = and_(*(
+            or_(
+                models.Post.title.ilike(f"%{_escape_like(term)}%", escape="\\"),
+                models.Post.description.ilike(f"%{_escape_like(term)}%", escape="\\")
+            )
+            for term in q.split()
+        ))
+    
+    query = db.query(models.Post, score.label("score")).options(
+        joinedload(models.Post.user)
+    ).filter(condition, models.Post.deleted_at.is_(None))
+    if cursor is not None:
+        last_score, last_id = decode_cursor(cursor, float, int)
+        query = query.filter(or_(score < last_score, and_(score == last_score, models.Post.id < last_id)))
+    
+    rows = query.order_by(score.desc(), models.Post.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_post, last_score = rows[-1]
+        next_cursor = encode_cursor(float(last_score), last_post.id)
+    return [post for post, _ in rows], next_cursor
@@ -0,0 +1,80 @@
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Hashable, TypeVar
+from ..core.config import settings
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Runs one computation per key at a time and hands its result to every
+    caller that asks for the same key while it is in flight.
+
+    Keys must capture everything the result depends on (route, parameters
+    and, for per-user responses, the user). Results are shared between
+    requests, so they must not be mutated and must not hold ORM objects
+    bound to the leader's session. Exceptions, including HTTP errors, are
+    shared the same way. A caller that waits longer than ``timeout`` stops
+    waiting and computes the result itself.
+
+    Only callers in the same process are coalesced; every server worker
+    runs its own computations.
+    """
+
+    def __init__(self, timeout: float, enabled: bool = True):
+        self.timeout = timeout
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            metrics.inc("single_flight_collapsed_total")
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                metrics.inc("single_flight_timeouts_total")
+                logger.warning(f"Timed out waiting for in-flight {key!r}, computing it again")
+                return fn()
+
+        metrics.inc("single_flight_leaders_total")
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future)
+            future.set_exception(e)
+            raise
+        # Only callers that arrived while the computation ran share it;
+        # later ones start a fresh one
+        self._finish(key, future)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+read_coalescer = SingleFlight(
+    timeout=settings.SINGLE_FLIGHT_TIMEOUT_SECONDS,
+    enabled=settings.SINGLE_FLIGHT_ENABLED
+)
+
+metrics.register_gauge("single_flight_inflight", read_coalescer.inflight)
@@ -0,0 +1,94 @@
+"""Reference counting for image objects shared between posts.
+
+Objects are keyed by content hash, so the same bytes uploaded twice map to
+one object. Each post holds one reference; the object (and its variants) may
+only be removed from storage once the last reference is released.
+"""
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..db import models
+
+def acquire(
+    db: Session,
+    object_key: str,
+    size: Optional[int],
+    content_type: Optional[str],
+    count: int = 1
+) -> bool:
+    """Add ``count`` references to ``object_key`` inside the caller's transaction.
+
+    Returns True when the object had no references left. Its storage
+    deletion may then still be queued: the deletion worker re-checks
+    references under a lock, so the object is either kept or already gone
+    once this returns, and the caller must check it exists afterwards.
+    """
+    updated = db.query(models.StoredObject).filter(
+        models.StoredObject.object_key == object_key
+    ).update({models.StoredObject.ref_count: models.StoredObject.ref_count + count})
+    if updated:
+        return False
+
+    try:
+        with db.begin_nested():
+            db.add(models.StoredObject(
+                object_key=object_key,
+                size=size,
+                content_type=content_type,
+                ref_count=count
+            ))
+        return True
+    except IntegrityError:
+        # A concurrent upload of the same bytes created the row first
+        db.query(models.StoredObject).filter(
+            models.StoredObject.object_key == object_key
+        ).update({models.StoredObject.ref_count: models.StoredObject.ref_count + count})
+        return False
+
+def release(db: Session, object_key: str) -> bool:
+    """Drop a reference inside the caller's transaction.
+
+    Returns True when it was the last one and the object may be deleted.
+    Objects without a row (stored before reference counting) count as a
+    single reference.
+    """
+    stored = db.query(models.StoredObject).filter(
+        models.StoredObject.object_key == object_key
+    ).with_for_update().first()
+    if stored is None:
+        return True
+
+    if stored.ref_count <= 1:
+        db.delete(stored)
+        return True
+
+    stored.ref_count -= 1
+    return False
+
+def is_referenced(db: Session, object_key: str) -> bool:
+    return db.query(models.StoredObject.object_key).filter(
+        models.StoredObject.object_key == object_key
+    ).first() is not None
+
+def storage_summary(db: Session) -> dict:
+    """Objects stored, bytes stored and bytes saved by deduplication"""
+    count, stored_bytes, saved_bytes, references = db.query(
+        func.count(models.StoredObject.object_key),
+        func.coalesce(func.sum(models.StoredObject.size), 0),
+        func.coalesce(func.sum((models.StoredObject.ref_count - 1) * models.StoredObject.size), 0),
+        func.coalesce(func.sum(models.StoredObject.ref_count), 0),
+    ).one()
+    return {
+        "objects": count,
+        "references": int(references),
+        "stored_bytes": int(stored_bytes),
+        "deduplicated_bytes": int(saved_bytes),
+    }
+
+def object_keys(post: models.Post) -> List[str]:
+    """Every storage object belonging to a post's image"""
+    return [
+        key for key in (post.image_key, post.thumbnail_key, post.medium_key, post.webp_key)
+        if key
+    ]
@@ -0,0 +1,48 @@
+import logging
+from datetime import datetime, timedelta
+from ..core.background import PeriodicWorker
+from ..core.config import settings
+from ..db.database import SessionLocal
+from ..db import models
+from . import stored_objects, object_deletion
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+class UploadSweeper(PeriodicWorker):
+    """Removes direct uploads that were never finalized into a post.
+
+    Objects are handed to the deletion queue in the same transaction that
+    drops the pending upload.
+    """
+
+    name = "upload-sweeper"
+
+    def __init__(self, interval: float, grace_seconds: int):
+        super().__init__(interval)
+        self.grace_seconds = grace_seconds
+
+    def run_once(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.grace_seconds)
+        db = SessionLocal()
+        try:
+            uploads = db.query(models.PendingUpload).filter(
+                models.PendingUpload.expires_at < cutoff
+            ).limit(SWEEP_BATCH_SIZE).with_for_update(skip_locked=True).all()
+            for upload in uploads:
+                # Tickets for already stored images point at shared objects
+                if not stored_objects.is_referenced(db, upload.object_key):
+                    object_deletion.enqueue(db, [upload.object_key], owner_key=upload.object_key)
+                db.delete(upload)
+            db.commit()
+            if uploads:
+                logger.info(f"Removed {len(uploads)} unfinalized uploads")
+            return len(uploads)
+        finally:
+            db.close()
+
+upload_sweeper = UploadSweeper(
+    interval=settings.UPLOAD_SWEEP_INTERVAL_SECONDS,
+    grace_seconds=settings.UPLOAD_ORPHAN_GRACE_SECONDS
+)
@@ -0,0 +1,96 @@
+"""Materialized per-user counters for profile pages.
+
+Every write that changes a count adjusts ``user_stats`` by a delta inside
+the same transaction, so profile views read one row instead of aggregating
+over posts, comments and reactions.
+"""
+from collections import defaultdict
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..db import models
+
+COUNTERS = ("post_count", "comment_count", "likes_received")
+
+def adjust(db: Session, user_id: int, **deltas: int):
+    """Add ``deltas`` (e.g. ``post_count=1``) to a user's stats row"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = {getattr(models.UserStats, name): getattr(models.UserStats, name) + delta for name, delta in deltas.items()}
+    updated = db.query(models.UserStats).filter(models.UserStats.user_id == user_id).update(values)
+    if updated:
+        return
+
+    try:
+        with db.begin_nested():
+            row = {name: 0 for name in COUNTERS}
+            row.update(deltas)
+            db.add(models.UserStats(user_id=user_id, **row))
+    except IntegrityError:
+        # A concurrent write created the row first
+        db.query(models.UserStats).filter(models.UserStats.user_id == user_id).update(values)
+
+def adjust_many(db: Session, deltas: Dict[int, Dict[str, int]]):
+    """``adjust`` for many users in one multi-row upsert: ``{user_id: {"post_count": 1}}``"""
+    rows = [
+        {"user_id": user_id, **{name: user_deltas.get(name, 0) for name in COUNTERS}}
+        for user_id, user_deltas in deltas.items()
+        if any(user_deltas.values())
+    ]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(models.UserStats).values(rows)
+        stmt = stmt.on_duplicate_key_update({
+            name: getattr(models.UserStats, name) + getattr(stmt.inserted, name) for name in COUNTERS
+        })
+    else:
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(models.UserStats).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={name: getattr(models.UserStats, name) + getattr(stmt.excluded, name) for name in COUNTERS}
+        )
+    db.execute(stmt)
+
+def like_delta(previous: Optional[str], current: Optional[str]) -> int:
+    """Change in likes received when a reaction goes from ``previous`` to ``current``"""
+    return (current == "like") - (previous == "like")
+
+def release_post(db: Session, post: models.Post):
+    """Remove a post's contribution, before it and its comments/reactions are deleted.
+
+    All affected users are adjusted in one ``adjust_many`` statement, however
+    many people commented.
+    """
+    comment_models, reaction_models = [models.Comment], [models.Reaction]
+    if post.archived_at is not None:
+        comment_models.append(models.ArchivedComment)
+        reaction_models.append(models.ArchivedReaction)
+
+    deltas: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for model in comment_models:
+        comment_authors = db.query(model.user_id, func.count()).filter(
+            model.post_id == post.id
+        ).group_by(model.user_id)
+        for user_id, count in comment_authors:
+            deltas[user_id]["comment_count"] -= count
+
+    likes = sum(
+        db.query(func.count()).select_from(model).filter(
+            model.post_id == post.id,
+            model.reaction_type == models.ReactionType.like
+        ).scalar()
+        for model in reaction_models
+    )
+    deltas[post.user_id]["post_count"] -= 1
+    deltas[post.user_id]["likes_received"] -= likes
+    adjust_many(db, deltas)
+
+def get(db: Session, user_id: int) -> Dict[str, int]:
+    stats = db.query(models.UserStats).filter(models.UserStats.user_id == user_id).first()
+    return {name: getattr(stats, name) if stats else 0 for name in COUNTERS}
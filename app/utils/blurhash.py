@@ -0,0 +1,84 @@
+import math
+from typing import List, Sequence, Tuple
+
+BASE83_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def _base83(value: int, length: int) -> str:
+    result = ""
+    for i in range(1, length + 1):
+        digit = (value // 83 ** (length - i)) % 83
+        result += BASE83_CHARS[digit]
+    return result
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255.0
+    if v <= 0.04045:
+        return v / 12.92
+    return ((v + 0.055) / 1.055) ** 2.4
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def _sign_pow(value: float, exp: float) -> float:
+    return math.copysign(abs(value) ** exp, value)
+
+def encode(
+    pixels: Sequence[Tuple[int, int, int]],
+    width: int,
+    height: int,
+    x_components: int = 4,
+    y_components: int = 3
+) -> str:
+    """Encode row-major RGB pixels as a BlurHash placeholder string.
+
+    Callers should pass a small (e.g. 32x32) downscaled image; the cost is
+    O(width * height * components).
+    """
+    linear = [tuple(_srgb_to_linear(c) for c in px) for px in pixels]
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(x_components)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(y_components)]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1.0 if i == 0 and j == 0 else 2.0
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = cos_y[j][y]
+                for x in range(width):
+                    basis = basis_y * cos_x[i][x]
+                    pr, pg, pb = linear[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(c) for factor in ac for c in factor)
+        quantised_max = max(0, min(82, int(math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+
+    result += _base83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4
+    )
+
+    for factor in ac:
+        quant = [
+            max(0, min(18, int(math.floor(_sign_pow(c / max_value, 0.5) * 9 + 9.5))))
+            for c in factor
+        ]
+        result += _base83(quant[0] * 19 * 19 + quant[1] * 19 + quant[2], 2)
+
+    return result
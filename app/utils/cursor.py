@@ -0,0 +1,19 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException
+
+def encode_cursor(*values) -> str:
+    """Opaque keyset pagination cursor holding the last row's sort key"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decode a cursor into ``len(types)`` values, converting each with its type"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if len(values) != len(types):
+            raise ValueError
+        return tuple(cast(value) for cast, value in zip(types, values))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
@@ -0,0 +1,122 @@
+import hashlib
+import io
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from minio.error import S3Error
+
+
+class FakeObject:
+    def __init__(self, data: bytes, content_type: str):
+        self.data = data
+        self.content_type = content_type
+        self.etag = hashlib.md5(data, usedforsecurity=False).hexdigest()
+        self.last_modified = datetime.now(timezone.utc)
+
+
+class FakeObjectStat:
+    def __init__(self, bucket_name: str, object_name: str, obj: FakeObject):
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.size = len(obj.data)
+        self.content_type = obj.content_type
+        self.etag = obj.etag
+        self.last_modified = obj.last_modified
+
+
+class FakeResponse(io.BytesIO):
+    """Mimics the urllib3 response returned by ``Minio.get_object``"""
+
+    def __init__(self, data: bytes, headers: Optional[Dict[str, str]] = None):
+        super().__init__(data)
+        self.headers = headers or {}
+
+    def stream(self, amt: int = 64 * 1024):
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                break
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    """In-process stand-in for the ``minio.Minio`` client.
+
+    Implements the subset of the SDK that ``MinIOClient`` uses so the storage
+    layer can run without a MinIO server (STORAGE_BACKEND=memory).
+    """
+
+    def __init__(self, base_url: str = "http://fake-minio.local"):
+        self.base_url = base_url
+        self._buckets: Dict[str, Dict[str, FakeObject]] = {}
+        self._lock = threading.Lock()
+
+    def _error(self, code: str, bucket_name: str, object_name: Optional[str] = None) -> S3Error:
+        return S3Error(
+            code, f"{code}: {bucket_name}/{object_name or ''}",
+            f"/{bucket_name}/{object_name or ''}", None, None, None,
+            bucket_name=bucket_name, object_name=object_name
+        )
+
+    def _bucket(self, bucket_name: str) -> Dict[str, FakeObject]:
+        bucket = self._buckets.get(bucket_name)
+        if bucket is None:
+            raise self._error("NoSuchBucket", bucket_name)
+        return bucket
+
+    def bucket_exists(self, bucket_name: str) -> bool:
+        return bucket_name in self._buckets
+
+    def make_bucket(self, bucket_name: str):
+        with self._lock:
+            self._buckets.setdefault(bucket_name, {})
+
+    def put_object(self, bucket_name: str, object_name: str, data, length: int,
+                   content_type: str = "application/octet-stream", **kwargs):
+        payload = data.read(length) if length is not None and length >= 0 else data.read()
+        with self._lock:
+            self._bucket(bucket_name)[object_name] = FakeObject(payload, content_type)
+
+    def get_object(self, bucket_name: str, object_name: str, **kwargs) -> FakeResponse:
+        obj = self._bucket(bucket_name).get(object_name)
+        if obj is None:
+            raise self._error("NoSuchKey", bucket_name, object_name)
+        return FakeResponse(obj.data, {
+            "Content-Type": obj.content_type,
+            "Content-Length": str(len(obj.data)),
+            "ETag": f'"{obj.etag}"',
+        })
+
+    def stat_object(self, bucket_name: str, object_name: str, **kwargs) -> FakeObjectStat:
+        obj = self._bucket(bucket_name).get(object_name)
+        if obj is None:
+            raise self._error("NoSuchKey", bucket_name, object_name)
+        return FakeObjectStat(bucket_name, object_name, obj)
+
+    def copy_object(self, bucket_name: str, object_name: str, source, **kwargs):
+        with self._lock:
+            bucket = self._bucket(bucket_name)
+            obj = self._bucket(source.bucket_name).get(source.object_name)
+            if obj is None:
+                raise self._error("NoSuchKey", source.bucket_name, source.object_name)
+            bucket[object_name] = FakeObject(obj.data, obj.content_type)
+
+    def remove_object(self, bucket_name: str, object_name: str, **kwargs):
+        with self._lock:
+            self._bucket(bucket_name).pop(object_name, None)
+
+    def remove_objects(self, bucket_name: str, delete_object_list, **kwargs):
+        with self._lock:
+            bucket = self._bucket(bucket_name)
+            for delete_object in delete_object_list:
+                bucket.pop(delete_object._name, None)
+        return iter(())
+
+    def presigned_post_policy(self, policy) -> Dict[str, str]:
+        return {"policy": "fake-policy", "x-amz-signature": "fake-signature"}
+
+    def presigned_get_object(self, bucket_name: str, object_name: str, **kwargs) -> str:
+        return f"{self.base_url}/{bucket_name}/{object_name}"
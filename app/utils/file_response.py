@@ -0,0 +1,65 @@
+import typing
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+class OpenFileResponse(Response):
+    """Streams ``length`` bytes of an already open file, starting at ``offset``.
+
+    The caller opens the file, so the response keeps working even if the
+    file is unlinked (e.g. evicted from a cache) while it is being sent.
+    The file is closed once the body has been sent.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(
+        self,
+        file: typing.BinaryIO,
+        offset: int,
+        length: int,
+        status_code: int = 200,
+        headers: typing.Optional[typing.Mapping[str, str]] = None,
+        media_type: typing.Optional[str] = None,
+        method: typing.Optional[str] = None,
+        background: typing.Optional[BackgroundTask] = None,
+    ) -> None:
+        self.file = file
+        self.offset = offset
+        self.length = length
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self.send_header_only = method is not None and method.upper() == "HEAD"
+        self.init_headers(headers)
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": self.raw_headers,
+                }
+            )
+            if self.send_header_only:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                await anyio.to_thread.run_sync(self.file.seek, self.offset)
+                remaining = self.length
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(
+                        self.file.read, min(self.chunk_size, remaining)
+                    )
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            self.file.close()
+        if self.background is not None:
+            await self.background()
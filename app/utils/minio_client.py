@@ -1,52 +1,144 @@
-import uuid
-from typing import Optional
+import hashlib
+import io
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 from minio import Minio
+from minio.commonconfig import CopySource
+from minio.datatypes import PostPolicy
+from minio.deleteobjects import DeleteObject
 from minio.error import S3Error
 from ..core.config import settings
+from ..core.metrics import metrics
+from ..core.tracing import traced_calls
+from .fake_minio import FakeMinio
 import logging
 
 logger = logging.getLogger(__name__)
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
+class StoredUpload(NamedTuple):
+    object_name: str
+    size: int
+    content_type: str
+    deduplicated: bool
+
 class MinIOClient:
-    def __init__(self):
-        self.client = Minio(
+    def __init__(self, client=None):
+        # Each storage call is a span when tracing is enabled
+        self.client = traced_calls(client or Minio(
             endpoint=settings.MINIO_ENDPOINT,
             access_key=settings.MINIO_ACCESS_KEY,
             secret_key=settings.MINIO_SECRET_KEY,
             secure=settings.MINIO_SECURE
-        )
+        ), "minio", **{"storage.bucket": settings.MINIO_BUCKET_NAME})
         self.bucket_name = settings.MINIO_BUCKET_NAME
-        self._ensure_bucket_exists()
+        # A URL handed out at the end of a bucket must stay valid for a while
+        self.url_bucket_seconds = settings.PRESIGNED_URL_BUCKET_SECONDS
+        self.url_expiry_seconds = max(
+            settings.PRESIGNED_URL_EXPIRY_SECONDS, 2 * self.url_bucket_seconds
+        )
+        # Smoothed upload throughput, used to estimate time saved by deduplication
+        self._upload_bytes_per_second: Optional[float] = None
+        self._throughput_lock = threading.Lock()
+        # Per process: each server worker signs a key once per time bucket
+        self._presigned_url = lru_cache(maxsize=settings.PRESIGNED_URL_CACHE_SIZE)(self._sign_url)
+        # Checked lazily (app startup or first write) so constructing the
+        # client never touches the network
+        self._bucket_ready = False
+        self._bucket_lock = threading.Lock()
     
-    def _ensure_bucket_exists(self):
-        try:
+    def ensure_bucket(self):
+        """Create the bucket if it doesn't exist yet. Raises when storage is unreachable."""
+        if self._bucket_ready:
+            return
+        with self._bucket_lock:
+            if self._bucket_ready:
+                return
             if not self.client.bucket_exists(self.bucket_name):
                 self.client.make_bucket(self.bucket_name)
                 logger.info(f"Created bucket {self.bucket_name}")
+            self._bucket_ready = True
+    
+    def _ensure_bucket_exists(self):
+        try:
+            self.ensure_bucket()
         except S3Error as e:
             logger.error(f"Error creating bucket: {e}")
             raise HTTPException(status_code=500, detail="Storage service error")
     
-    def upload_file(self, file: UploadFile) -> str:
+    def hash_file(self, file: UploadFile) -> Tuple[str, int]:
+        """Object name (SHA-256 of the bytes) and size of an uploaded image.
+
+        The hash is computed in one streaming pass over the spooled upload.
+        """
         if not file.content_type or not file.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Only image files are allowed")
         
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        file_name = f"{uuid.uuid4()}.{file_extension}"
-        
+        digest = hashlib.sha256()
+        size = 0
+        file.file.seek(0)
+        for chunk in iter(lambda: file.file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+    
+    def hash_object(self, object_name: str) -> str:
+        """SHA-256 of a stored object's bytes, read in one streaming pass"""
+        digest = hashlib.sha256()
+        response = self.client.get_object(self.bucket_name, object_name)
         try:
+            for chunk in response.stream(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        except S3Error as e:
+            logger.error(f"Error reading {object_name}: {e}")
+            raise HTTPException(status_code=500, detail="Storage service error")
+        finally:
+            response.close()
+            response.release_conn()
+        return digest.hexdigest()
+    
+    def copy_file(self, source: str, object_name: str):
+        """Server-side copy within the bucket; no bytes pass through the app"""
+        try:
+            self.client.copy_object(self.bucket_name, object_name, CopySource(self.bucket_name, source))
+        except S3Error as e:
+            logger.error(f"Error copying {source} to {object_name}: {e}")
+            raise HTTPException(status_code=500, detail="Storage service error")
+    
+    def store_file(self, file: UploadFile, object_name: str, size: int) -> StoredUpload:
+        """Store an uploaded image under the name returned by ``hash_file``.
+
+        If an object with that name already exists the transfer is skipped
+        and the existing object is referenced instead. Callers take their
+        reference to the object first, so a queued deletion can't remove it
+        after this check.
+        """
+        self._ensure_bucket_exists()
+        try:
+            if self.stat_file(object_name) is not None:
+                self.record_deduplicated(size)
+                return StoredUpload(object_name, size, file.content_type, True)
+            
             file.file.seek(0)
+            started = time.perf_counter()
             self.client.put_object(
                 bucket_name=self.bucket_name,
-                object_name=file_name,
+                object_name=object_name,
                 data=file.file,
-                length=file.size,
+                length=size,
                 content_type=file.content_type
             )
-            
-            file_url = self.get_file_url(file_name)
-            return file_url
+            self._record_throughput(size, time.perf_counter() - started)
+            metrics.inc("storage_uploads_total")
+            metrics.inc("storage_upload_bytes_total", size)
+            return StoredUpload(object_name, size, file.content_type, False)
+        except HTTPException:
+            raise
         except S3Error as e:
             logger.error(f"Error uploading file: {e}")
             raise HTTPException(status_code=500, detail="Failed to upload file")
@@ -54,23 +146,135 @@ class MinIOClient:
             logger.error(f"Unexpected error uploading file: {e}")
             raise HTTPException(status_code=500, detail="Failed to upload file")
     
+    def _record_throughput(self, size: int, elapsed: float):
+        if elapsed <= 0 or size <= 0:
+            return
+        with self._throughput_lock:
+            sample = size / elapsed
+            previous = self._upload_bytes_per_second
+            self._upload_bytes_per_second = sample if previous is None else 0.8 * previous + 0.2 * sample
+    
+    def record_deduplicated(self, size: int):
+        """Account for an upload that was skipped because the bytes were already stored"""
+        metrics.inc("storage_dedup_hits_total")
+        metrics.inc("storage_dedup_bytes_saved_total", size)
+        if self._upload_bytes_per_second:
+            metrics.inc("storage_dedup_upload_seconds_avoided_total", size / self._upload_bytes_per_second)
+    
     def get_file_url(self, object_name: str) -> str:
-        if settings.MINIO_SECURE:
-            protocol = "https"
-        else:
-            protocol = "http"
-        # Use public URL
-        url = self.client.presigned_get_object(self.bucket_name, object_name)
-        # url = f"{protocol}://{settings.MINIO_ENDPOINT}/{self.bucket_name}/{object_name}"
-        return url
+        """URL clients use to fetch an object.
+
+        With IMAGE_PROXY_BASE_URL set this points at the caching image proxy;
+        otherwise it is a presigned GET URL.
+
+        URLs are signed as of the start of the current time bucket, so every
+        request in the same bucket gets an identical URL and the signature is
+        computed once per key per bucket instead of once per response item.
+        """
+        if settings.IMAGE_PROXY_BASE_URL:
+            return f"{settings.IMAGE_PROXY_BASE_URL}/{object_name}"
+        bucket_start = int(time.time()) // self.url_bucket_seconds * self.url_bucket_seconds
+        return self._presigned_url(object_name, bucket_start)
+    
+    def _sign_url(self, object_name: str, bucket_start: int) -> str:
+        return self.client.presigned_get_object(
+            self.bucket_name,
+            object_name,
+            expires=timedelta(seconds=self.url_expiry_seconds),
+            request_date=datetime.fromtimestamp(bucket_start, timezone.utc)
+        )
+    
+    def put_bytes(self, object_name: str, data: bytes, content_type: str) -> str:
+        self.ensure_bucket()
+        try:
+            self.client.put_object(
+                bucket_name=self.bucket_name,
+                object_name=object_name,
+                data=io.BytesIO(data),
+                length=len(data),
+                content_type=content_type
+            )
+            return object_name
+        except S3Error as e:
+            logger.error(f"Error uploading {object_name}: {e}")
+            raise
+    
+    def open_object(self, object_name: str):
+        """Streaming response for an object, or None when it doesn't exist.
+
+        The caller must ``close()`` and ``release_conn()`` the response.
+        """
+        try:
+            return self.client.get_object(self.bucket_name, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            logger.error(f"Error reading {object_name}: {e}")
+            raise HTTPException(status_code=500, detail="Storage service error")
+    
+    def get_bytes(self, object_name: str) -> bytes:
+        response = self.client.get_object(self.bucket_name, object_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def presigned_upload(
+        self,
+        object_name: str,
+        content_type: str,
+        max_size: int,
+        expires_at: datetime
+    ) -> Dict[str, object]:
+        """POST policy letting a client upload one object straight to the bucket.
+
+        The policy pins the object key and content type and enforces the
+        size limit on the storage side.
+        """
+        policy = PostPolicy(self.bucket_name, expires_at)
+        policy.add_equals_condition("key", object_name)
+        policy.add_equals_condition("Content-Type", content_type)
+        policy.add_content_length_range_condition(1, max_size)
+        fields = self.client.presigned_post_policy(policy)
+        fields.update({"key": object_name, "Content-Type": content_type})
+        protocol = "https" if settings.MINIO_SECURE else "http"
+        return {
+            "url": f"{protocol}://{settings.MINIO_ENDPOINT}/{self.bucket_name}",
+            "fields": fields
+        }
+    
+    def stat_file(self, object_name: str):
+        """Object metadata, or None when the object doesn't exist"""
+        try:
+            return self.client.stat_object(self.bucket_name, object_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            logger.error(f"Error reading metadata of {object_name}: {e}")
+            raise HTTPException(status_code=500, detail="Storage service error")
     
     def delete_file(self, object_name: str) -> bool:
         try:
-            object_name = object_name.split('/')[-1]
             self.client.remove_object(self.bucket_name, object_name)
             return True
         except S3Error as e:
             logger.error(f"Error deleting file: {e}")
             return False
 
-minio_client = MinIOClient()
\ No newline at end of file
+    def delete_files(self, object_names: List[str]) -> Dict[str, str]:
+        """Bulk delete; returns ``{object_name: error}`` for objects that failed.
+
+        Raises on request-level failures so callers can retry the whole batch.
+        """
+        errors = self.client.remove_objects(
+            self.bucket_name, [DeleteObject(name) for name in object_names]
+        )
+        # remove_objects is lazy: the requests are only sent while iterating
+        return {
+            error.name: f"{error.code}: {error.message}"
+            for error in errors
+            if error.code != "NoSuchKey"
+        }
+
+minio_client = MinIOClient(FakeMinio() if settings.STORAGE_BACKEND == "memory" else None)
\ No newline at end of file
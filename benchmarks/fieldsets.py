@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Payload size, latency and SQL cost of sparse fieldsets.
+
+Seeds posts (with reactions and comments) into a database, then requests the
+feed, a post and its comments with the full representation and with sparse
+fieldsets, through the ASGI app with in-memory object storage.
+
+    python benchmarks/fieldsets.py --posts 2000 --iterations 200
+    python benchmarks/fieldsets.py --database-url mysql+pymysql://user:pw@host/bench
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from sqlalchemy import create_engine, event, func, insert  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from app.db import database, models  # noqa: E402
+
+SCENARIOS = {
+    "feed_full": "/api/v1/posts/?limit={limit}",
+    "feed_grid": "/api/v1/posts/?limit={limit}&fields=id,thumbnail_url,like_count,dislike_count",
+    "feed_cards": "/api/v1/posts/?limit={limit}&fields=id,title,medium_url,like_count&include=user",
+    "post_full": "/api/v1/posts/{post_id}",
+    "post_summary": "/api/v1/posts/{post_id}?fields=id,title,image_url,like_count,dislike_count",
+    "comments_full": "/api/v1/posts/{post_id}/comments",
+    "comments_text": "/api/v1/posts/{post_id}/comments?fields=id,content",
+}
+
+def bind(url):
+    if url.startswith("sqlite") and ":memory:" in url or url == "sqlite://":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(url)
+    database.engine = engine
+    database.SessionLocal.configure(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+def seed(posts, rng):
+    db = database.SessionLocal()
+    try:
+        if db.query(func.count(models.Post.id)).scalar() >= posts:
+            return db.query(func.max(models.Post.id)).scalar()
+        users = [models.User(username=f"fieldsets-{n}", email=f"fieldsets-{n}@example.com", password_hash="!") for n in range(50)]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+        description = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+        db.execute(insert(models.Post), [
+            {
+                "title": f"Post {n}", "description": description, "image_key": f"{n:064x}",
+                "thumbnail_key": f"{n:064x}_thumb.jpg", "medium_key": f"{n:064x}_medium.jpg",
+                "image_status": "ready", "user_id": rng.choice(user_ids),
+            }
+            for n in range(posts)
+        ])
+        post_ids = [post_id for (post_id,) in db.query(models.Post.id)]
+        db.execute(insert(models.Reaction), [
+            {"user_id": user_id, "post_id": post_id, "reaction_type": rng.choice(list(models.ReactionType))}
+            for post_id in post_ids[-200:] for user_id in rng.sample(user_ids, 10)
+        ])
+        db.execute(insert(models.Comment), [
+            {"content": f"Comment {n}", "user_id": rng.choice(user_ids), "post_id": post_ids[-1]}
+            for n in range(50)
+        ])
+        db.commit()
+        return post_ids[-1]
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    engine = bind(args.database_url)
+    post_id = seed(args.posts, random.Random(42))
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    client = TestClient(app)
+
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *_: queries.append(1))
+
+    results = {}
+    for name, template in SCENARIOS.items():
+        url = template.format(limit=args.limit, post_id=post_id)
+        client.get(url)  # warm up
+        samples = []
+        queries.clear()
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            response = client.get(url)
+            samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        samples.sort()
+        results[name] = {
+            "url": url,
+            "payload_bytes": len(response.content),
+            "queries_per_request": len(queries) / args.iterations,
+            "latency_ms": {
+                "p50": statistics.median(samples) * 1000,
+                "p95": samples[int(len(samples) * 0.95) - 1] * 1000,
+            },
+        }
+
+    for sparse, full in (("feed_grid", "feed_full"), ("feed_cards", "feed_full"),
+                         ("post_summary", "post_full"), ("comments_text", "comments_full")):
+        results[sparse]["vs_" + full] = {
+            "payload_reduction": 1 - results[sparse]["payload_bytes"] / results[full]["payload_bytes"],
+            "p50_latency_reduction": 1 - results[sparse]["latency_ms"]["p50"] / results[full]["latency_ms"]["p50"],
+        }
+
+    print(json.dumps({"dialect": engine.dialect.name, "posts": args.posts, "iterations": args.iterations,
+                      "scenarios": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
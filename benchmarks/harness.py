@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+"""
+Load-test and latency benchmark for every API route.
+
+Seeds users, posts, comments and reactions into SQLite or MySQL, serves the
+app with uvicorn in this process (object storage is the in-memory fake) and
+drives each route in app/api through its direct and obfuscated path at
+several concurrency levels. Prints one JSON report with p50/p95/p99 latency,
+throughput, status codes and SQL queries per request. Write routes carry a
+query budget (``max_queries``); exceeding it makes the run exit non-zero.
+
+    python benchmarks/harness.py --concurrency 1,8,32 --requests 500
+    python benchmarks/harness.py --database-url mysql+pymysql://user:pw@127.0.0.1/bench \\
+        --users 1000 --posts 50000 --comments 200000 --reactions 500000
+    python benchmarks/harness.py --save-baseline baseline.json
+    python benchmarks/harness.py --baseline baseline.json --fail-on-regression
+
+The seed and every request sequence come from ``--seed``, so two runs with the
+same arguments send the same requests. Write scenarios get their targets
+(posts to delete, upload tickets, ...) created before each run, outside the
+timed section. The live event stream is not benchmarked: its latency is the
+heartbeat interval, not request handling.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+# Measure the handlers, not the limiter rejecting a load generator
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("IMAGE_CACHE_DIR", tempfile.mkdtemp(prefix="bench-image-cache-"))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from PIL import Image  # noqa: E402
+from sqlalchemy import create_engine, event, func, insert, text  # noqa: E402
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.db import database, models  # noqa: E402
+
+PASSWORD = "benchmark-password"
+WORDS = ("sunset", "mountain", "city", "coffee", "river", "night", "forest", "street", "beach", "snow")
+# Threads that touch the database outside of request handling
+BACKGROUND_THREADS = ("image-processing",)
+
+class Route(NamedTuple):
+    """One request shape; ``build(ctx, i, target)`` returns httpx request kwargs"""
+    method: str
+    direct: str
+    obfuscated: Optional[str]
+    build: Callable
+    auth: bool = True
+    # Creates ``count`` single-use targets (e.g. posts to delete) before a run
+    prepare: Optional[Callable] = None
+    expect: int = 200
+    # Most SQL statements a request may issue on average; a run above it fails the harness
+    max_queries: Optional[float] = None
+
+class Context:
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.user_ids: List[int] = []
+        self.usernames: Dict[int, str] = {}
+        self.post_ids: List[int] = []
+        self.image_key = ""
+        self.bench_user_id = 0
+        self.bench_post_id = 0
+        self.tokens: Dict[int, str] = {}
+        self.counter = 0
+
+    def token(self, user_id: int) -> str:
+        if user_id not in self.tokens:
+            self.tokens[user_id] = create_access_token(
+                {"sub": self.usernames[user_id]}, expires_delta=timedelta(hours=12)
+            )
+        return self.tokens[user_id]
+
+    def unique(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def random_post(self) -> int:
+        return self.rng.choice(self.post_ids)
+
+    def random_user(self) -> int:
+        return self.rng.choice(self.user_ids)
+
+def bind(url: str):
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+
+        @event.listens_for(engine, "connect")
+        def _pragmas(connection, _):
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Post deletes rely on ON DELETE CASCADE, as on MySQL
+            connection.execute("PRAGMA foreign_keys=ON")
+    else:
+        engine = create_engine(url, pool_size=32, max_overflow=32)
+    database.engine = engine
+    database.SessionLocal.configure(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+def png_bytes(seed: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), ((seed * 37) % 256, (seed * 91) % 256, (seed * 13) % 256)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def chunked(rows, size=5000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def seed(ctx: Context):
+    """Insert the configured volumes, or reuse them when the database already has them"""
+    from app.utils.minio_client import minio_client
+
+    args, rng = ctx.args, ctx.rng
+    db = database.SessionLocal()
+    try:
+        existing = db.query(func.count(models.User.id)).filter(models.User.username.like("bench-%")).scalar()
+        if existing < args.users:
+            password_hash = get_password_hash(PASSWORD)
+            for rows in chunked([
+                {"username": f"bench-{n}", "email": f"bench-{n}@example.com", "password_hash": password_hash}
+                for n in range(existing, args.users)
+            ]):
+                db.execute(insert(models.User), rows)
+            db.commit()
+        for user_id, username in db.query(models.User.id, models.User.username).filter(
+            models.User.username.like("bench-%")
+        ):
+            ctx.user_ids.append(user_id)
+            ctx.usernames[user_id] = username
+        ctx.user_ids.sort()
+        ctx.bench_user_id = ctx.user_ids[0]
+
+        ctx.image_key = "bench-image.png"
+        image = png_bytes(0)
+        minio_client.put_bytes(ctx.image_key, image, "image/png")
+
+        existing = db.query(func.count(models.Post.id)).scalar()
+        if existing < args.posts:
+            for rows in chunked([
+                {
+                    "title": " ".join(rng.sample(WORDS, 3)),
+                    "description": " ".join(rng.choices(WORDS, k=20)),
+                    "image_key": ctx.image_key, "thumbnail_key": ctx.image_key, "medium_key": ctx.image_key,
+                    "image_status": "ready", "user_id": rng.choice(ctx.user_ids),
+                }
+                for _ in range(existing, args.posts)
+            ]):
+                db.execute(insert(models.Post), rows)
+            if db.get(models.StoredObject, ctx.image_key) is None:
+                db.add(models.StoredObject(
+                    object_key=ctx.image_key, size=len(image), content_type="image/png", ref_count=args.posts
+                ))
+            db.commit()
+        ctx.post_ids = sorted(post_id for (post_id,) in db.query(models.Post.id))
+        ctx.bench_post_id = db.query(models.Post.id).filter(
+            models.Post.user_id == ctx.bench_user_id
+        ).order_by(models.Post.id).limit(1).scalar() or _insert_post(db, ctx, ctx.bench_user_id)
+
+        existing = db.query(func.count(models.Comment.id)).scalar()
+        if existing < args.comments:
+            for rows in chunked([
+                {"content": " ".join(rng.choices(WORDS, k=8)), "user_id": rng.choice(ctx.user_ids),
+                 "post_id": rng.choice(ctx.post_ids)}
+                for _ in range(existing, args.comments)
+            ]):
+                db.execute(insert(models.Comment), rows)
+            db.commit()
+
+        existing = db.query(func.count(models.Reaction.id)).scalar()
+        wanted = min(args.reactions, len(ctx.user_ids) * len(ctx.post_ids))
+        if existing < wanted:
+            taken = {tuple(pair) for pair in db.query(models.Reaction.user_id, models.Reaction.post_id)}
+            rows = []
+            while len(taken) < wanted:
+                pair = (rng.choice(ctx.user_ids), rng.choice(ctx.post_ids))
+                if pair in taken:
+                    continue
+                taken.add(pair)
+                rows.append({"user_id": pair[0], "post_id": pair[1],
+                             "reaction_type": rng.choice(list(models.ReactionType))})
+            for chunk in chunked(rows):
+                db.execute(insert(models.Reaction), chunk)
+            db.commit()
+
+        # Same backfill as migration 0009
+        db.execute(text("DELETE FROM user_stats"))
+        db.execute(text(
+            "INSERT INTO user_stats (user_id, post_count, comment_count, likes_received) "
+            "SELECT users.id, "
+            "(SELECT COUNT(*) FROM posts WHERE posts.user_id = users.id), "
+            "(SELECT COUNT(*) FROM comments WHERE comments.user_id = users.id), "
+            "(SELECT COUNT(*) FROM reactions JOIN posts ON posts.id = reactions.post_id "
+            "WHERE posts.user_id = users.id AND reactions.reaction_type = 'like') "
+            "FROM users"
+        ))
+        # Same backfill as migration 0012
+        db.execute(text(
+            "UPDATE posts SET comment_count = "
+            "(SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id) + "
+            "(SELECT COUNT(*) FROM comments_archive WHERE comments_archive.post_id = posts.id)"
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def _insert_post(db, ctx: Context, user_id: int) -> int:
+    post = models.Post(
+        title="bench", description="bench", image_key=ctx.image_key, thumbnail_key=ctx.image_key,
+        medium_key=ctx.image_key, image_status="ready", user_id=user_id
+    )
+    db.add(post)
+    db.commit()
+    return post.id
+
+# Single-use targets for write scenarios
+
+def prepare_posts(ctx: Context, count: int) -> List[int]:
+    db = database.SessionLocal()
+    try:
+        return [_insert_post(db, ctx, ctx.bench_user_id) for _ in range(count)]
+    finally:
+        db.close()
+
+def prepare_comments(ctx: Context, count: int) -> List[int]:
+    db = database.SessionLocal()
+    try:
+        comments = [models.Comment(content="bench", user_id=ctx.bench_user_id, post_id=ctx.random_post())
+                    for _ in range(count)]
+        db.add_all(comments)
+        db.commit()
+        return [comment.id for comment in comments]
+    finally:
+        db.close()
+
+def prepare_reactions(ctx: Context, count: int) -> List[tuple]:
+    """(user_id, post_id) pairs that currently have a reaction"""
+    db = database.SessionLocal()
+    try:
+        pairs = set()
+        while len(pairs) < count:
+            pairs.add((ctx.random_user(), ctx.random_post()))
+        for user_id, post_id in pairs:
+            db.query(models.Reaction).filter(
+                models.Reaction.user_id == user_id, models.Reaction.post_id == post_id
+            ).delete()
+        db.add_all([models.Reaction(user_id=user_id, post_id=post_id, reaction_type=models.ReactionType.like)
+                    for user_id, post_id in pairs])
+        db.commit()
+        return list(pairs)
+    finally:
+        db.close()
+
+def prepare_uploads(ctx: Context, count: int) -> List[str]:
+    from app.utils.minio_client import minio_client
+
+    db = database.SessionLocal()
+    try:
+        tickets = []
+        for _ in range(count):
+            n = ctx.unique()
+            upload_id = f"bench-{n}-{ctx.rng.getrandbits(64):016x}"
+            key = f"{upload_id}.png"
+            minio_client.put_bytes(key, png_bytes(n), "image/png")
+            db.add(models.PendingUpload(
+                id=upload_id, user_id=ctx.bench_user_id, object_key=key, content_type="image/png",
+                max_size=1024 * 1024, expires_at=datetime.utcnow() + timedelta(hours=1)
+            ))
+            tickets.append(upload_id)
+        db.commit()
+        return tickets
+    finally:
+        db.close()
+
+def _as(user_id: int, ctx: Context, **kwargs) -> dict:
+    kwargs["headers"] = {"Authorization": f"Bearer {ctx.token(user_id)}"}
+    return kwargs
+
+def _reader(ctx: Context, **kwargs) -> dict:
+    return _as(ctx.random_user(), ctx, **kwargs)
+
+P = "/api/x/ff0d498c575b"
+
+ROUTES: Dict[str, Route] = {
+    "auth.register": Route(
+        "POST", "/api/v1/auth/register", "/api/x/1f217a698b25", auth=False,
+        build=lambda ctx, i, _: {"json": {
+            "username": f"reg-{os.getpid()}-{time.time_ns()}-{i}", "email": f"reg-{time.time_ns()}-{i}@example.com",
+            "password": PASSWORD,
+        }},
+        # The INSERT; uniqueness comes from the indexes
+        max_queries=1,
+    ),
+    "auth.login": Route(
+        "POST", "/api/v1/auth/login", "/api/login", auth=False,
+        build=lambda ctx, i, _: {"data": {"username": ctx.usernames[ctx.random_user()], "password": PASSWORD}},
+    ),
+    "auth.logout": Route("POST", "/api/v1/auth/logout", None, auth=False, build=lambda ctx, i, _: {}),
+    "users.me": Route("GET", "/api/v1/users/me", "/api/x/5baaf1c55a0a", build=lambda ctx, i, _: _reader(ctx)),
+    "users.update_me": Route(
+        "PUT", "/api/v1/users/me", "/api/x/5baaf1c55a0a",
+        build=lambda ctx, i, _: _reader(ctx, json={"avatar_url": f"https://example.com/avatar/{i}.png"}),
+        # Current user, UPDATE
+        max_queries=2,
+    ),
+    "users.export": Route(
+        "GET", "/api/v1/users/me/export", "/api/x/5baaf1c55a0a/export",
+        build=lambda ctx, i, _: _reader(ctx, params={"format": "ndjson"}),
+    ),
+    "users.profile": Route(
+        "GET", "/api/v1/users/{user_id}", "/api/x/58e74c92e79b/{user_id}", auth=False,
+        build=lambda ctx, i, _: {"path": {"user_id": ctx.random_user()}},
+    ),
+    "users.posts": Route(
+        "GET", "/api/v1/users/{user_id}/posts", "/api/x/58e74c92e79b/{user_id}/posts", auth=False,
+        build=lambda ctx, i, _: {"path": {"user_id": ctx.random_user()}, "params": {"limit": 20}},
+    ),
+    "posts.list_new": Route(
+        "GET", "/api/v1/posts/", P, auth=False, build=lambda ctx, i, _: {"params": {"limit": 20}},
+    ),
+    "posts.list_popular": Route(
+        "GET", "/api/v1/posts/", P, auth=False,
+        build=lambda ctx, i, _: {"params": {"limit": 20, "sort": "popular"}},
+    ),
+    "posts.list_sparse": Route(
+        "GET", "/api/v1/posts/", P, auth=False,
+        build=lambda ctx, i, _: {"params": {"limit": 20, "fields": "id,thumbnail_url,like_count"}},
+    ),
+    "posts.search": Route(
+        "GET", "/api/v1/posts/search", P + "/search", auth=False,
+        build=lambda ctx, i, _: {"params": {"q": ctx.rng.choice(WORDS), "limit": 20}},
+    ),
+    "posts.batch": Route(
+        "GET", "/api/v1/posts/batch", P + "/batch", auth=False,
+        build=lambda ctx, i, _: {"params": {"ids": ",".join(
+            str(post_id) for post_id in ctx.rng.sample(ctx.post_ids, min(20, len(ctx.post_ids)))
+        )}},
+    ),
+    "posts.read": Route(
+        "GET", "/api/v1/posts/{post_id}", P + "/{post_id}", auth=False,
+        build=lambda ctx, i, _: {"path": {"post_id": ctx.random_post()}},
+    ),
+    "posts.create": Route(
+        "POST", "/api/v1/posts/", P,
+        build=lambda ctx, i, _: _reader(
+            ctx, data={"title": "bench upload", "description": "benchmark"},
+            files={"image": (f"{i}.png", png_bytes(ctx.unique()), "image/png")},
+        ),
+        # Current user, INSERT post, stored object UPDATE + savepointed INSERT for new bytes, stats UPDATE
+        max_queries=7,
+    ),
+    "posts.create_upload": Route(
+        "POST", "/api/v1/posts/uploads", P + "/uploads",
+        build=lambda ctx, i, _: _reader(ctx, json={"content_type": "image/png"}),
+    ),
+    "posts.finalize_upload": Route(
+        "POST", "/api/v1/posts/uploads/{upload_id}/finalize", P + "/uploads/{upload_id}/finalize",
+        prepare=prepare_uploads,
+        build=lambda ctx, i, upload_id: _as(
+            ctx.bench_user_id, ctx, path={"upload_id": upload_id}, json={"title": "bench", "description": "direct"}
+        ),
+        # As posts.create, plus the upload row (SELECT, DELETE) and queueing the uploaded copy's deletion
+        max_queries=10,
+    ),
+    "posts.update": Route(
+        "PUT", "/api/v1/posts/{post_id}", P + "/{post_id}",
+        build=lambda ctx, i, _: _as(ctx.bench_user_id, ctx, path={"post_id": ctx.bench_post_id},
+                                    json={"title": f"bench {i}"}),
+        # Current user, post, UPDATE
+        max_queries=3,
+    ),
+    "posts.delete": Route(
+        "DELETE", "/api/v1/posts/{post_id}", P + "/{post_id}", prepare=prepare_posts,
+        build=lambda ctx, i, post_id: _as(ctx.bench_user_id, ctx, path={"post_id": post_id}),
+    ),
+    "comments.list": Route(
+        "GET", "/api/v1/posts/{post_id}/comments", P + "/{post_id}/comments", auth=False,
+        build=lambda ctx, i, _: {"path": {"post_id": ctx.random_post()}},
+    ),
+    "comments.create": Route(
+        "POST", "/api/v1/posts/{post_id}/comments", P + "/{post_id}/comments",
+        build=lambda ctx, i, _: _reader(ctx, path={"post_id": ctx.random_post()}, json={"content": f"bench {i}"}),
+        # Current user, comment_count UPDATE (also the existence check), stats UPDATE, INSERT
+        max_queries=4,
+    ),
+    "comments.delete": Route(
+        "DELETE", "/api/v1/comments/{comment_id}", "/api/x/0ebcf2cda524/{comment_id}", prepare=prepare_comments,
+        build=lambda ctx, i, comment_id: _as(ctx.bench_user_id, ctx, path={"comment_id": comment_id}),
+    ),
+    "reactions.get": Route(
+        "GET", "/api/v1/posts/{post_id}/reactions", P + "/{post_id}/reactions", auth=False,
+        build=lambda ctx, i, _: {"path": {"post_id": ctx.random_post()}},
+    ),
+    "reactions.create": Route(
+        "POST", "/api/v1/posts/{post_id}/reaction", P + "/{post_id}/reaction",
+        build=lambda ctx, i, _: _reader(
+            ctx, path={"post_id": ctx.random_post()}, json={"reaction_type": ctx.rng.choice(["like", "dislike"])}
+        ),
+    ),
+    "reactions.delete": Route(
+        "DELETE", "/api/v1/posts/{post_id}/reaction", P + "/{post_id}/reaction", prepare=prepare_reactions,
+        build=lambda ctx, i, pair: _as(pair[0], ctx, path={"post_id": pair[1]}),
+    ),
+    "images.read": Route(
+        "GET", "/api/v1/images/{object_key}", "/api/x/aed8ef5f79ef/{object_key}", auth=False,
+        build=lambda ctx, i, _: {"path": {"object_key": ctx.image_key}},
+    ),
+}
+
+class QueryCounter:
+    """Counts SQL statements issued while handling requests"""
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_):
+        if threading.current_thread().name.startswith(BACKGROUND_THREADS):
+            return
+        with self._lock:
+            self.count += 1
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int) -> uvicorn.Server:
+    from app.main import app
+
+    # The lifespan would start background workers and their queries would
+    # land in the measurements; the harness created the schema itself
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, lifespan="off", log_level="warning", access_log=False
+    ))
+    threading.Thread(target=server.run, name="bench-server", daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    index = max(0, min(len(samples) - 1, int(round(p / 100 * len(samples))) - 1))
+    return samples[index]
+
+async def drive(client: httpx.AsyncClient, template: str, route: Route, requests: List[dict], concurrency: int):
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    position = iter(range(len(requests)))
+
+    async def worker():
+        for i in position:
+            kwargs = dict(requests[i])
+            url = template.format(**kwargs.pop("path", {}))
+            started = time.perf_counter()
+            try:
+                response = await client.request(route.method, url, **kwargs)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+def run_scenario(ctx: Context, client: httpx.AsyncClient, counter: QueryCounter, name: str,
+                 route: Route, path_kind: str, concurrency: int, loop) -> dict:
+    template = route.direct if path_kind == "direct" else route.obfuscated
+    count = ctx.args.requests
+    targets = route.prepare(ctx, count + ctx.args.warmup) if route.prepare else [None] * (count + ctx.args.warmup)
+    requests = [route.build(ctx, i, target) for i, target in enumerate(targets)]
+
+    if ctx.args.warmup:
+        loop.run_until_complete(drive(client, template, route, requests[:ctx.args.warmup], concurrency))
+    before = counter.count
+    latencies, statuses, elapsed = loop.run_until_complete(
+        drive(client, template, route, requests[ctx.args.warmup:], concurrency)
+    )
+    queries = counter.count - before
+
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if status != str(route.expect))
+    return {
+        "method": route.method,
+        "path": template,
+        "authenticated": route.auth,
+        "requests": count,
+        "throughput_rps": count / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        "queries_per_request": queries / count if count else 0.0,
+        "query_budget": route.max_queries,
+        "status_codes": statuses,
+        "error_rate": errors / count if count else 0.0,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> dict:
+    """Relative change per run; a regression is p95 or throughput beyond ``tolerance``"""
+    report, regressions = {}, []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        p95_ratio = current["latency_ms"]["p95"] / previous["latency_ms"]["p95"] if previous["latency_ms"]["p95"] else None
+        rps_ratio = current["throughput_rps"] / previous["throughput_rps"] if previous["throughput_rps"] else None
+        queries_delta = current["queries_per_request"] - previous["queries_per_request"]
+        regressed = (
+            (p95_ratio is not None and p95_ratio > 1 + tolerance)
+            or (rps_ratio is not None and rps_ratio < 1 - tolerance)
+            or queries_delta > 0.5
+        )
+        report[key] = {
+            "p95_ratio": p95_ratio,
+            "throughput_ratio": rps_ratio,
+            "queries_per_request_delta": queries_delta,
+            "regressed": regressed,
+        }
+        if regressed:
+            regressions.append(key)
+    return {"tolerance": tolerance, "runs": report, "regressions": regressions}
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'haivler-bench.db')}")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--reactions", type=int, default=50000)
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario, path and level")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--scenarios", default="", help="comma separated names or prefixes (default: all)")
+    parser.add_argument("--paths", default="direct,obfuscated")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", metavar="FILE", help="also write the report here")
+    args = parser.parse_args()
+
+    ctx = Context(args, random.Random(args.seed))
+    engine = bind(args.database_url)
+    seed(ctx)
+
+    # Image processing runs on its own thread pool and isn't what the
+    # create routes are measured for
+    from app.services.image_processing import image_processor
+    image_processor.submit = lambda *_: None
+
+    counter = QueryCounter(engine)
+    server = start_server(free_port())
+    base_url = f"http://127.0.0.1:{server.config.port}"
+
+    wanted = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    levels = [int(level) for level in args.concurrency.split(",")]
+    paths = [path.strip() for path in args.paths.split(",")]
+
+    loop = asyncio.new_event_loop()
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60)
+    results = {}
+    try:
+        for name, route in ROUTES.items():
+            if wanted and not any(name.startswith(w) for w in wanted):
+                continue
+            for path_kind in paths:
+                if path_kind == "obfuscated" and route.obfuscated is None:
+                    continue
+                for concurrency in levels:
+                    key = f"{name}|{path_kind}|c{concurrency}"
+                    results[key] = run_scenario(ctx, client, counter, name, route, path_kind, concurrency, loop)
+                    print(f"{key}: p95 {results[key]['latency_ms']['p95']:.1f} ms, "
+                          f"{results[key]['throughput_rps']:.0f} rps", file=sys.stderr)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.close()
+        server.should_exit = True
+
+    report = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dialect": engine.dialect.name,
+        "volumes": {"users": args.users, "posts": args.posts, "comments": args.comments, "reactions": args.reactions},
+        "seed": args.seed,
+        "requests": args.requests,
+        "concurrency": levels,
+        "results": results,
+        "skipped": {"events.stream": "server-sent event stream; latency is bounded by the heartbeat interval"},
+    }
+    report["over_query_budget"] = [
+        key for key, result in results.items()
+        if result["query_budget"] is not None and result["queries_per_request"] > result["query_budget"]
+    ]
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            f.write(output + "\n")
+
+    if report["over_query_budget"]:
+        print(f"over query budget: {', '.join(report['over_query_budget'])}", file=sys.stderr)
+        sys.exit(1)
+    if args.fail_on_regression and report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Search latency benchmark over a seeded corpus.
+
+Seeds the database with synthetic posts (Zipf-distributed vocabulary) up to
+``--posts`` rows, then times /posts/search queries for common, medium and
+rare terms, for the first page and for deep pages reached by following
+cursors. ``--compare-like`` also times the unindexed LIKE '%term%' scan.
+
+Point it at a disposable MySQL database (the default connection settings, or
+``--database-url``). The FULLTEXT index must exist (``alembic upgrade head``).
+
+    python benchmarks/search.py --posts 1000000 --iterations 50
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+from sqlalchemy import create_engine, func, insert, or_  # noqa: E402
+from app.db import database, models  # noqa: E402
+from app.services.search import search_posts  # noqa: E402
+
+SEED_CHUNK = 5000
+
+def vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+def seed(db, target, words, weights, rng):
+    existing = db.query(func.count(models.Post.id)).scalar()
+    if existing >= target:
+        return existing, 0
+    user = db.query(models.User).filter(models.User.username == "search-bench").first()
+    if user is None:
+        user = models.User(username="search-bench", email="search-bench@example.com", password_hash="!")
+        db.add(user)
+        db.commit()
+
+    started = time.perf_counter()
+    remaining = target - existing
+    while remaining > 0:
+        count = min(SEED_CHUNK, remaining)
+        rows = [
+            {
+                "title": " ".join(rng.choices(words, weights, k=rng.randint(3, 8))),
+                "description": " ".join(rng.choices(words, weights, k=rng.randint(10, 30))),
+                "image_key": "bench",
+                "image_status": "ready",
+                "user_id": user.id,
+            }
+            for _ in range(count)
+        ]
+        db.execute(insert(models.Post), rows)
+        db.commit()
+        remaining -= count
+    return target, time.perf_counter() - started
+
+def percentiles(samples):
+    samples = sorted(samples)
+    def at(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+    return {"p50": statistics.median(samples) * 1000, "p95": at(0.95), "p99": at(0.99)}
+
+def time_search(db, term, iterations, limit, depth):
+    first, deep, hits = [], [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        posts, cursor = search_posts(db, term, limit)
+        first.append(time.perf_counter() - started)
+        hits = len(posts)
+        for _ in range(depth):
+            if cursor is None:
+                break
+            started = time.perf_counter()
+            posts, cursor = search_posts(db, term, limit, cursor)
+            deep.append(time.perf_counter() - started)
+        db.rollback()
+    result = {"first_page_ms": percentiles(first), "first_page_hits": hits}
+    if deep:
+        result["next_pages_ms"] = percentiles(deep)
+    return result
+
+def time_like(db, term, iterations, limit):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        db.query(models.Post.id).filter(or_(
+            models.Post.title.like(f"%{term}%"),
+            models.Post.description.like(f"%{term}%")
+        )).order_by(models.Post.id.desc()).limit(limit).all()
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1_000_000, help="corpus size to seed up to")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=5, help="cursor pages to follow per query")
+    parser.add_argument("--compare-like", action="store_true")
+    parser.add_argument("--database-url", help="override the configured MySQL connection")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.database_url:
+        database.engine = create_engine(args.database_url)
+        database.SessionLocal.configure(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    db = database.SessionLocal()
+    try:
+        corpus, seed_seconds = seed(db, args.posts, words, weights, rng)
+        ranks = {"common": 10, "medium": len(words) // 20, "rare": len(words) - 10}
+        queries = {name: words[rank] for name, rank in ranks.items()}
+        queries["two_terms"] = f"{words[10]} {words[len(words) // 20]}"
+
+        results = {}
+        for name, term in queries.items():
+            results[name] = {"query": term, **time_search(db, term, args.iterations, args.limit, args.depth)}
+            if args.compare_like:
+                results[name]["like_scan_ms"] = time_like(db, term.split()[0], max(1, args.iterations // 10), args.limit)
+    finally:
+        db.close()
+
+    print(json.dumps({
+        "dialect": database.engine.dialect.name,
+        "corpus_posts": corpus,
+        "seed_seconds": seed_seconds,
+        "iterations": args.iterations,
+        "limit": args.limit,
+        "queries": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
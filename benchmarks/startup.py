@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark: import time of app.main and first-request latency.
+
+Each run uses a fresh interpreter so nothing is cached between runs. The
+database and MinIO don't need to be reachable; that is the point: startup
+must not wait for them.
+
+    python benchmarks/startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child interpreter; prints one JSON line
+CHILD = r"""
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    lifespan_done = time.perf_counter()
+    response = client.get("/health")
+    first_response = time.perf_counter()
+    ready = client.get("/ready").status_code
+
+print(json.dumps({
+    "import_seconds": imported - started,
+    "lifespan_startup_seconds": lifespan_done - imported,
+    "first_request_seconds": first_response - lifespan_done,
+    "time_to_first_response_seconds": first_response - started,
+    "health_status": response.status_code,
+    "ready_status": ready,
+}))
+"""
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(samples, key):
+    values = sorted(sample[key] for sample in samples)
+    return {
+        "min": values[0],
+        "p50": statistics.median(values),
+        "max": values[-1],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--storage-backend", default="minio", choices=["minio", "memory"])
+    args = parser.parse_args()
+
+    env = dict(os.environ, STORAGE_BACKEND=args.storage_backend)
+    samples = [run_once(env) for _ in range(args.runs)]
+
+    print(json.dumps({
+        "runs": args.runs,
+        "storage_backend": args.storage_backend,
+        "import_seconds": summarize(samples, "import_seconds"),
+        "lifespan_startup_seconds": summarize(samples, "lifespan_startup_seconds"),
+        "first_request_seconds": summarize(samples, "first_request_seconds"),
+        "time_to_first_response_seconds": summarize(samples, "time_to_first_response_seconds"),
+        "health_status": samples[-1]["health_status"],
+        "ready_status": samples[-1]["ready_status"],
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
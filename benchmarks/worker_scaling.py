@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Throughput vs. worker count for the production server (gunicorn.conf.py).
+
+For each worker count a fresh gunicorn is started with in-memory object
+storage, load is generated from several client processes for a fixed
+duration, and requests/second and latency percentiles are reported.
+Paths that need the database only succeed if it is reachable; non-2xx
+responses are counted separately.
+
+    python benchmarks/worker_scaling.py --workers 1,2,4 --path /api/v1/posts/
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def _drive(base_url, paths, concurrency, deadline):
+    latencies, errors = [], 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        async def loop(offset):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                i += 1
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+        await asyncio.gather(*(loop(n) for n in range(concurrency)))
+    return latencies, errors
+
+def _client_process(base_url, paths, concurrency, deadline, results):
+    results.put(asyncio.run(_drive(base_url, paths, concurrency, deadline)))
+
+def wait_until_up(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+def run(workers, args):
+    port = args.port
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        STORAGE_BACKEND="memory",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_ACCESS_LOG="/dev/null",
+        GUNICORN_LOG_LEVEL="warning",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py"],
+        cwd=ROOT, env=env
+    )
+    try:
+        wait_until_up(base_url)
+        # Warm every worker's imports and caches before measuring
+        httpx.get(base_url + args.paths[0], timeout=30)
+
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + args.duration
+        clients = [
+            multiprocessing.Process(
+                target=_client_process,
+                args=(base_url, args.paths, args.concurrency, deadline, results)
+            )
+            for _ in range(args.clients)
+        ]
+        started = time.monotonic()
+        for client in clients:
+            client.start()
+        latencies, errors = [], 0
+        for _ in clients:
+            client_latencies, client_errors = results.get()
+            latencies.extend(client_latencies)
+            errors += client_errors
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=120)
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else None
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "latency_ms": {
+            "p50": statistics.median(latencies) * 1000 if latencies else None,
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--path", dest="paths", action="append", help="path to request (repeatable, default /health)")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="in-flight requests per client process")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    args.paths = args.paths or ["/health"]
+
+    runs = [run(int(workers), args) for workers in args.workers.split(",")]
+    baseline = runs[0]["requests_per_second"] or 1
+    for result in runs:
+        result["speedup"] = result["requests_per_second"] / baseline
+
+    print(json.dumps({
+        "cpu_count": os.cpu_count(),
+        "paths": args.paths,
+        "duration_seconds": args.duration,
+        "clients": args.clients,
+        "concurrency_per_client": args.concurrency,
+        "runs": runs,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Production server settings: gunicorn managing uvicorn workers.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Every value can be overridden from the environment (see CONFIGURATION.md).
+"""
+
+import os
+
+def _cpu_count() -> int:
+    # Respect CPU affinity (e.g. docker --cpuset-cpus) when available
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", str(_cpu_count())))
+
+# Import the app once in the master so workers fork with it already loaded.
+# Importing has no side effects: connections, buckets and background threads
+# are set up per worker in the lifespan hook.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Recycle workers to bound slow leaks; jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# On SIGTERM (or a recycle) workers stop accepting connections and get this
+# long to finish in-flight requests such as uploads before being killed
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "60"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Proxies whose X-Forwarded-For/-Proto are trusted, comma-separated exact
+# addresses or "*". The per-IP rate limits key on the address this yields,
+# so behind nginx it must name nginx or every client shares one bucket.
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+backlog = int(os.getenv("GUNICORN_BACKLOG", "2048"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+def when_ready(server):
+    # Process-local state that is wrong, not just slower, with several workers
+    if workers > 1 and os.getenv("EVENTS_BACKEND", "memory") != "redis":
+        server.log.warning(
+            "EVENTS_BACKEND=memory with %d workers: /events streams only see "
+            "writes handled by their own worker; set EVENTS_BACKEND=redis", workers
+        )
+
+def post_fork(server, worker):
+    # Connections are never shared across processes; drop any pooled in the
+    # master without closing them out from under it
+    from app.db.database import engine
+    engine.dispose(close=False)
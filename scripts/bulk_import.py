@@ -0,0 +1,598 @@
+"""Bulk import of users, posts, comments and reactions from NDJSON or CSV.
+
+Each file is streamed and written in batches: multi-row INSERTs, one user
+stats upsert per batch, and image files hashed and uploaded to object
+storage by a thread pool. Files are imported in dependency order (users,
+posts, comments, reactions). Rows reference each other by id, so source ids
+are kept when given; users may also be referenced by ``username``.
+
+    python scripts/bulk_import.py --users users.ndjson --posts posts.csv \\
+        --comments comments.ndjson --reactions reactions.csv \\
+        --media-dir ./export/images --checkpoint import-checkpoint.json
+
+Fields (CSV header or JSON keys, optional ones in brackets):
+
+    users      [id], username, email, password_hash | password, [avatar_url], [created_at]
+    posts      [id], user_id | username, title, [description], image | image_key, [created_at]
+    comments   [id], post_id, user_id | username, content, [created_at]
+    reactions  post_id, user_id | username, reaction_type (like|dislike), [created_at]
+
+``password_hash`` must be a bcrypt hash and is stored as is; plain
+``password`` values are hashed on the thread pool, which costs about as much
+as a registration each. ``image`` is a path relative to ``--media-dir``;
+``image_key`` names an object already in the bucket. Rows whose id (or
+username/email) already exists are skipped and invalid rows are reported,
+so neither stops the import.
+
+After every committed batch the number of rows consumed from each file is
+written to ``--checkpoint``; running again with the same checkpoint resumes
+after them. Rows without ids that were committed just before a crash but
+not yet checkpointed are imported twice, so give ids when that matters.
+At the end, image variants are generated for every post still pending,
+unless ``--skip-variants``.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert, tuple_  # noqa: E402
+from app.api.posts import VARIANT_COLUMNS  # noqa: E402
+from app.core.security import get_password_hash, pwd_context  # noqa: E402
+from app.db import database, models  # noqa: E402
+from app.services import post_comments, stored_objects, user_stats  # noqa: E402
+from app.services.archival import promote_reactions  # noqa: E402
+from app.services.image_processing import (  # noqa: E402
+    IMAGE_STATUS_FAILED, IMAGE_STATUS_PENDING, IMAGE_STATUS_READY, image_processor
+)
+from app.services.reaction_buffer import UPSERT_CHUNK_SIZE, upsert_reactions  # noqa: E402
+from app.utils.minio_client import minio_client  # noqa: E402
+
+logger = logging.getLogger("bulk_import")
+
+KINDS = ("users", "posts", "comments", "reactions")
+# Known usernames/ids are cached between batches up to this many entries
+USER_CACHE_SIZE = 1_000_000
+
+class RowError(ValueError):
+    """A row that can't be imported; it is reported and skipped"""
+
+Batch = List[Tuple[int, dict]]
+
+def read_records(path: str, fmt: Optional[str]) -> Iterator[object]:
+    """Records of an NDJSON or CSV file (``-`` is stdin); unparsable lines yield a RowError"""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    with stream:
+        if fmt == "csv":
+            for record in csv.DictReader(stream):
+                # Empty cells are missing values
+                yield {key: value for key, value in record.items() if value != ""}
+            return
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield RowError(f"invalid JSON: {e}")
+                continue
+            yield record if isinstance(record, dict) else RowError("expected a JSON object")
+
+def _int(record: dict, name: str, required: bool = True) -> Optional[int]:
+    value = record.get(name)
+    if value is None:
+        if required:
+            raise RowError(f"{name} is required")
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be an integer")
+
+def _text(record: dict, name: str, max_length: Optional[int] = None, required: bool = True) -> Optional[str]:
+    value = record.get(name)
+    if value is None or value == "":
+        if required:
+            raise RowError(f"{name} is required")
+        return None
+    value = str(value)
+    if max_length is not None and len(value) > max_length:
+        raise RowError(f"{name} is longer than {max_length} characters")
+    return value
+
+def _timestamp(record: dict) -> datetime:
+    """``created_at`` as naive UTC, like the rest of the schema; now when missing"""
+    value = record.get("created_at")
+    if value is None:
+        return datetime.utcnow()
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        raise RowError("created_at must be an ISO 8601 timestamp")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _existing(db, column, values: Iterable) -> set:
+    values = {value for value in values if value is not None}
+    if not values:
+        return set()
+    return {value for (value,) in db.query(column).filter(column.in_(values))}
+
+class Checkpoint:
+    """Rows consumed per input file, rewritten atomically after every batch"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def position(self, kind: str, source: str) -> Tuple[int, bool]:
+        entry = self.state.get(kind)
+        if entry is None or entry["source"] != source:
+            return 0, False
+        return entry["rows"], entry.get("done", False)
+
+    def save(self, kind: str, source: str, rows: int, done: bool = False):
+        if not self.path:
+            return
+        self.state[kind] = {"source": source, "rows": rows, "done": done}
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temporary, self.path)
+
+class Importer:
+    def __init__(self, args):
+        self.args = args
+        self.checkpoint = Checkpoint(args.checkpoint)
+        self.pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="bulk-import")
+        self.rejects = open(args.rejects, "a", encoding="utf-8") if args.rejects else None
+        self.report: Dict[str, dict] = {}
+        self._usernames: Dict[str, int] = {}
+        self._user_ids: set = set()
+        # Handed from a batch's prepare step to its write step
+        self._objects: Dict[str, list] = {}
+        self._posts: Dict[int, tuple] = {}
+
+    def run(self) -> Dict[str, dict]:
+        try:
+            if self.args.posts:
+                minio_client.ensure_bucket()
+            for kind in KINDS:
+                path = getattr(self.args, kind)
+                if path:
+                    self.import_file(kind, path)
+            if self.args.posts and not self.args.skip_variants:
+                self.generate_variants()
+        finally:
+            self.pool.shutdown()
+            if self.rejects:
+                self.rejects.close()
+        return self.report
+
+    def import_file(self, kind: str, path: str):
+        source = path if path == "-" else os.path.abspath(path)
+        consumed, done = self.checkpoint.position(kind, source)
+        stats = self.report[kind] = {"rows": 0, "imported": 0, "skipped": 0, "rejected": 0}
+        if done:
+            logger.info(f"{kind}: {source} was already imported according to the checkpoint")
+            return
+        if consumed:
+            logger.info(f"{kind}: resuming after row {consumed}")
+
+        prepare = getattr(self, f"_prepare_{kind}")
+        write = getattr(self, f"_write_{kind}")
+        records = islice(enumerate(read_records(path, self.args.format), start=1), consumed, None)
+        started = time.perf_counter()
+        while True:
+            chunk = list(islice(records, self.args.batch_size))
+            if not chunk:
+                break
+            batch = []
+            for line, record in chunk:
+                if isinstance(record, RowError):
+                    self._reject(kind, line, record, None)
+                else:
+                    batch.append((line, record))
+            consumed = chunk[-1][0]
+            stats["rows"] += len(chunk)
+
+            db = database.SessionLocal()
+            try:
+                rows = prepare(db, batch)
+                if rows:
+                    stats["imported"] += write(db, rows)
+                db.commit()
+            finally:
+                db.close()
+            self.checkpoint.save(kind, source, consumed)
+
+            elapsed = time.perf_counter() - started
+            stats["seconds"] = round(elapsed, 2)
+            stats["rows_per_second"] = round(stats["rows"] / elapsed) if elapsed else None
+            logger.info(
+                f"{kind}: {stats['rows']} rows, {stats['imported']} imported, {stats['skipped']} skipped, "
+                f"{stats['rejected']} rejected ({stats['rows_per_second']} rows/s)"
+            )
+        self.checkpoint.save(kind, source, consumed, done=True)
+
+    def _reject(self, kind: str, line: int, error: Exception, record: Optional[dict]):
+        self.report[kind]["rejected"] += 1
+        if self.rejects:
+            self.rejects.write(json.dumps({"kind": kind, "row": line, "error": str(error), "record": record}) + "\n")
+        else:
+            logger.warning(f"{kind} row {line}: {error}")
+
+    def _skip(self, kind: str, count: int = 1):
+        self.report[kind]["skipped"] += count
+
+    def _validated(self, kind: str, batch: Batch, build) -> List[Tuple[int, dict, dict]]:
+        """``(line, record, build(record))`` for the rows ``build`` accepts"""
+        valid = []
+        for line, record in batch:
+            try:
+                valid.append((line, record, build(record)))
+            except RowError as e:
+                self._reject(kind, line, e, record)
+        return valid
+
+    # Users
+
+    def _prepare_users(self, db, batch: Batch) -> List[dict]:
+        def build(record):
+            row = {
+                "id": _int(record, "id", required=False),
+                "username": _text(record, "username", 50),
+                "email": _text(record, "email", 100),
+                "password_hash": record.get("password_hash"),
+                "avatar_url": _text(record, "avatar_url", 500, required=False),
+                "created_at": _timestamp(record),
+            }
+            if row["password_hash"]:
+                if pwd_context.identify(row["password_hash"]) is None:
+                    raise RowError("password_hash is not a bcrypt hash")
+            elif not record.get("password"):
+                raise RowError("password_hash or password is required")
+            return row
+
+        valid = self._validated("users", batch, build)
+        taken_ids = _existing(db, models.User.id, (row["id"] for _, _, row in valid))
+        taken_names = _existing(db, models.User.username, (row["username"] for _, _, row in valid))
+        taken_emails = _existing(db, models.User.email, (row["email"] for _, _, row in valid))
+        rows, plain = [], []
+        for _, record, row in valid:
+            if row["id"] in taken_ids or row["username"] in taken_names or row["email"] in taken_emails:
+                self._skip("users")
+                continue
+            taken_ids.add(row["id"])
+            taken_names.add(row["username"])
+            taken_emails.add(row["email"])
+            rows.append(row)
+            if not row["password_hash"]:
+                plain.append((row, str(record["password"])))
+        # bcrypt releases the GIL, so hashing scales with the pool
+        for (row, _), password_hash in zip(plain, self.pool.map(get_password_hash, [p for _, p in plain])):
+            row["password_hash"] = password_hash
+        return rows
+
+    def _write_users(self, db, rows: List[dict]) -> int:
+        db.execute(insert(models.User), rows)
+        return len(rows)
+
+    def _load_users(self, db, batch: Batch):
+        """Cache the ids of the users referenced by ``batch``"""
+        if len(self._usernames) + len(self._user_ids) > USER_CACHE_SIZE:
+            self._usernames.clear()
+            self._user_ids.clear()
+        names = {str(record["username"]) for _, record in batch
+                 if record.get("user_id") is None and record.get("username") is not None}
+        names -= self._usernames.keys()
+        if names:
+            for user_id, username in db.query(models.User.id, models.User.username).filter(
+                models.User.username.in_(names)
+            ):
+                self._usernames[username] = user_id
+        ids = set()
+        for _, record in batch:
+            try:
+                ids.add(int(record["user_id"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        self._user_ids |= _existing(db, models.User.id, ids - self._user_ids)
+
+    def _user_id(self, record: dict) -> int:
+        user_id = _int(record, "user_id", required=False)
+        if user_id is not None:
+            if user_id not in self._user_ids:
+                raise RowError(f"user {user_id} does not exist")
+            return user_id
+        username = _text(record, "username", required=False)
+        if username is None:
+            raise RowError("user_id or username is required")
+        if username not in self._usernames:
+            raise RowError(f"user {username!r} does not exist")
+        return self._usernames[username]
+
+    def _live_posts(self, db, batch: Batch) -> Dict[int, tuple]:
+        """Posts referenced by ``batch``, share-locked like the comment and reaction writers"""
+        ids = set()
+        for _, record in batch:
+            try:
+                ids.add(int(record["post_id"]))
+            except (KeyError, TypeError, ValueError):
+                pass
+        if not ids:
+            return {}
+        return {
+            post.id: post for post in db.query(models.Post.id, models.Post.user_id, models.Post.archived_at).filter(
+                models.Post.id.in_(ids),
+                models.Post.deleted_at.is_(None)
+            ).with_for_update(read=True)
+        }
+
+    # Posts
+
+    def _store_image(self, record: dict) -> Tuple[str, int, str]:
+        """Object key, size and content type of a post's image, uploading it when needed"""
+        image_key = record.get("image_key")
+        if image_key:
+            stat = minio_client.stat_file(str(image_key))
+            if stat is None:
+                raise RowError(f"image_key {image_key} is not in the bucket")
+            return str(image_key), stat.size, stat.content_type
+
+        image = _text(record, "image", required=False)
+        if image is None:
+            raise RowError("image or image_key is required")
+        content_type = mimetypes.guess_type(image)[0]
+        if not content_type or not content_type.startswith("image/"):
+            raise RowError(f"{image} is not an image file")
+        try:
+            with open(os.path.join(self.args.media_dir, image), "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise RowError(f"can't read {image}: {e.strerror}")
+        # Same content-hash keys as API uploads, so identical images are stored once
+        object_name = hashlib.sha256(data).hexdigest()
+        if minio_client.stat_file(object_name) is None:
+            minio_client.put_bytes(object_name, data, content_type)
+        return object_name, len(data), content_type
+
+    def _prepare_posts(self, db, batch: Batch) -> List[dict]:
+        self._load_users(db, batch)
+        valid = self._validated("posts", batch, lambda record: {
+            "id": _int(record, "id", required=False),
+            "user_id": self._user_id(record),
+            "title": _text(record, "title", 200),
+            "description": _text(record, "description", required=False),
+            "created_at": _timestamp(record),
+        })
+        taken = _existing(db, models.Post.id, (row["id"] for _, _, row in valid))
+        pending = []
+        for line, record, row in valid:
+            if row["id"] in taken:
+                self._skip("posts")
+                continue
+            taken.add(row["id"])
+            pending.append((line, record, row, self.pool.submit(self._store_image, record)))
+
+        rows, self._objects = [], {}
+        for line, record, row, upload in pending:
+            try:
+                object_name, size, content_type = upload.result()
+            except RowError as e:
+                self._reject("posts", line, e, record)
+                continue
+            row["image_key"] = object_name
+            references = self._objects.setdefault(object_name, [size, content_type, 0])
+            references[2] += 1
+            rows.append(row)
+
+        # Re-use the variants of posts that already share an image
+        processed = {
+            post.image_key: post for post in db.query(models.Post.image_key, *(
+                getattr(models.Post, column) for column in VARIANT_COLUMNS
+            )).filter(
+                models.Post.image_key.in_(list(self._objects)),
+                models.Post.image_status == IMAGE_STATUS_READY
+            )
+        } if self._objects else {}
+        for row in rows:
+            source = processed.get(row["image_key"])
+            for column in VARIANT_COLUMNS:
+                row[column] = getattr(source, column) if source is not None else None
+            if source is None:
+                row["image_status"] = IMAGE_STATUS_PENDING
+        return rows
+
+    def _write_posts(self, db, rows: List[dict]) -> int:
+        db.execute(insert(models.Post), rows)
+        for object_name, (size, content_type, count) in self._objects.items():
+            stored_objects.acquire(db, object_name, size, content_type, count=count)
+        deltas: Dict[int, Dict[str, int]] = {}
+        for row in rows:
+            counters = deltas.setdefault(row["user_id"], {"post_count": 0})
+            counters["post_count"] += 1
+        user_stats.adjust_many(db, deltas)
+        return len(rows)
+
+    # Comments
+
+    def _prepare_comments(self, db, batch: Batch) -> List[dict]:
+        self._load_users(db, batch)
+        posts = self._live_posts(db, batch)
+
+        def build(record):
+            post_id = _int(record, "post_id")
+            if post_id not in posts:
+                raise RowError(f"post {post_id} does not exist")
+            return {
+                "id": _int(record, "id", required=False),
+                "content": _text(record, "content"),
+                "user_id": self._user_id(record),
+                "post_id": post_id,
+                "created_at": _timestamp(record),
+            }
+
+        valid = self._validated("comments", batch, build)
+        ids = [row["id"] for _, _, row in valid]
+        taken = _existing(db, models.Comment.id, ids) | _existing(db, models.ArchivedComment.id, ids)
+        rows = []
+        for _, _, row in valid:
+            if row["id"] in taken:
+                self._skip("comments")
+                continue
+            taken.add(row["id"])
+            rows.append(row)
+        return rows
+
+    def _write_comments(self, db, rows: List[dict]) -> int:
+        db.execute(insert(models.Comment), rows)
+        post_comments.adjust_counts(db, Counter(row["post_id"] for row in rows))
+        deltas: Dict[int, Dict[str, int]] = {}
+        for row in rows:
+            counters = deltas.setdefault(row["user_id"], {"comment_count": 0})
+            counters["comment_count"] += 1
+        user_stats.adjust_many(db, deltas)
+        return len(rows)
+
+    # Reactions
+
+    def _prepare_reactions(self, db, batch: Batch) -> List[dict]:
+        self._load_users(db, batch)
+        self._posts = posts = self._live_posts(db, batch)
+
+        def build(record):
+            post_id = _int(record, "post_id")
+            if post_id not in posts:
+                raise RowError(f"post {post_id} does not exist")
+            try:
+                reaction_type = models.ReactionType(_text(record, "reaction_type"))
+            except ValueError:
+                raise RowError("reaction_type must be like or dislike")
+            return {
+                "user_id": self._user_id(record),
+                "post_id": post_id,
+                "reaction_type": reaction_type,
+                "created_at": _timestamp(record),
+            }
+
+        # One reaction per user and post; the last row wins
+        valid = self._validated("reactions", batch, build)
+        latest = {(row["user_id"], row["post_id"]): row for _, _, row in valid}
+        self._skip("reactions", len(valid) - len(latest))
+        return list(latest.values())
+
+    def _write_reactions(self, db, rows: List[dict]) -> int:
+        archived = {}
+        for row in rows:
+            if self._posts[row["post_id"]].archived_at is not None:
+                archived.setdefault(row["post_id"], []).append(row["user_id"])
+        for post_id, user_ids in archived.items():
+            promote_reactions(db, post_id, user_ids)
+
+        previous = {
+            (user_id, post_id): reaction_type.value
+            for user_id, post_id, reaction_type in db.query(
+                models.Reaction.user_id, models.Reaction.post_id, models.Reaction.reaction_type
+            ).filter(tuple_(models.Reaction.user_id, models.Reaction.post_id).in_(
+                [(row["user_id"], row["post_id"]) for row in rows]
+            ))
+        }
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            upsert_reactions(db, rows[start:start + UPSERT_CHUNK_SIZE])
+
+        deltas: Dict[int, Dict[str, int]] = {}
+        for row in rows:
+            owner = self._posts[row["post_id"]].user_id
+            counters = deltas.setdefault(owner, {"likes_received": 0})
+            counters["likes_received"] += user_stats.like_delta(
+                previous.get((row["user_id"], row["post_id"])), row["reaction_type"].value
+            )
+        user_stats.adjust_many(db, deltas)
+        return len(rows)
+
+    # Image variants
+
+    def generate_variants(self):
+        """Variants for every image of a post still pending, one job per distinct image"""
+        db = database.SessionLocal()
+        try:
+            object_names = [object_name for (object_name,) in db.query(models.Post.image_key).filter(
+                models.Post.image_status == IMAGE_STATUS_PENDING,
+                models.Post.deleted_at.is_(None)
+            ).distinct()]
+        finally:
+            db.close()
+
+        stats = self.report["variants"] = {"images": len(object_names), "ready": 0, "failed": 0}
+        started = time.perf_counter()
+        for start in range(0, len(object_names), self.args.batch_size):
+            chunk = object_names[start:start + self.args.batch_size]
+            jobs = {self.pool.submit(image_processor.process, object_name): object_name for object_name in chunk}
+            db = database.SessionLocal()
+            try:
+                for job in as_completed(jobs):
+                    object_name = jobs[job]
+                    try:
+                        values = job.result()
+                        values["image_status"] = IMAGE_STATUS_READY
+                        stats["ready"] += 1
+                    except Exception as e:
+                        logger.warning(f"Variants for {object_name} failed: {e}")
+                        values = {"image_status": IMAGE_STATUS_FAILED}
+                        stats["failed"] += 1
+                    db.query(models.Post).filter(
+                        models.Post.image_key == object_name,
+                        models.Post.image_status == IMAGE_STATUS_PENDING
+                    ).update(values, synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+            logger.info(f"variants: {stats['ready'] + stats['failed']}/{len(object_names)} images")
+        stats["seconds"] = round(time.perf_counter() - started, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for kind in KINDS:
+        parser.add_argument(f"--{kind}", metavar="FILE", help=f"{kind} as NDJSON or CSV (- for stdin)")
+    parser.add_argument("--format", choices=("ndjson", "csv"), help="input format (default: from the file extension)")
+    parser.add_argument("--media-dir", default=".", help="directory the posts' image paths are relative to")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--workers", type=int, default=8, help="threads for image uploads, variants and password hashing")
+    parser.add_argument("--checkpoint", metavar="FILE", help="resume from and record progress in this file")
+    parser.add_argument("--rejects", metavar="FILE", help="write rejected rows here as NDJSON instead of logging them")
+    parser.add_argument("--skip-variants", action="store_true", help="leave image variants to be generated later")
+    parser.add_argument("--database-url", help="database to import into (default: the app's database settings)")
+    args = parser.parse_args()
+    if not any(getattr(args, kind) for kind in KINDS):
+        parser.error("nothing to import; pass at least one of --users, --posts, --comments, --reactions")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.database_url:
+        database.engine = create_engine(args.database_url, pool_pre_ping=True)
+        database.SessionLocal.configure(bind=database.engine)
+
+    report = Importer(args).run()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
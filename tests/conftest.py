@@ -0,0 +1,87 @@
+"""
+Shared fixtures: the app on in-memory SQLite with the in-memory object
+storage fake, the rate limiter off and background image processing stubbed.
+"""
+
+import io
+import os
+import tempfile
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("IMAGE_CACHE_DIR", tempfile.mkdtemp(prefix="test-image-cache-"))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from PIL import Image  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from app.db import database, models  # noqa: E402
+
+PASSWORD = "test-password"
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "connect")
+    def _foreign_keys(connection, _record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    database.engine = engine
+    database.SessionLocal.configure(bind=engine)
+    models.Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    from app.main import app
+    from app.services import image_processing
+
+    # Thumbnails are generated off the request; the tests only count its SQL
+    monkeypatch.setattr(image_processing.image_processor, "submit", lambda *args: None)
+    # No lifespan: periodic workers would issue statements of their own
+    return TestClient(app)
+
+class QueryCounter:
+    """Counts statements sent to the database between ``reset`` and ``count``"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, _conn, _cursor, statement, *_args):
+        self.statements.append(statement)
+
+    def reset(self):
+        self.statements.clear()
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@pytest.fixture
+def queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+
+@pytest.fixture
+def register(client):
+    def register(username):
+        response = client.post(
+            "/api/v1/auth/register",
+            json={"username": username, "email": f"{username}@example.com", "password": PASSWORD},
+        )
+        assert response.status_code == 200, response.text
+        token = client.post(
+            "/api/v1/auth/login", data={"username": username, "password": PASSWORD}
+        ).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return register
+
+def png(color=(200, 30, 40), size=(64, 48)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
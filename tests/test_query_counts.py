@@ -0,0 +1,73 @@
+"""
+Statements per write request, counted on SQLite. The counts include the
+token's user lookup; they match the ``max_queries`` budgets in
+benchmarks/harness.py.
+"""
+
+from .conftest import png
+
+def create_post(client, headers, color):
+    return client.post(
+        "/api/v1/posts/",
+        data={"title": "post"},
+        files={"image": ("image.png", png(color), "image/png")},
+        headers=headers,
+    )
+
+def test_register(client, queries):
+    queries.reset()
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"username": "alice", "email": "alice@example.com", "password": "pw"},
+    )
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+    assert queries.count == 1
+
+def test_register_duplicate_username(client, queries):
+    client.post("/api/v1/auth/register", json={"username": "alice", "email": "alice@example.com", "password": "pw"})
+    queries.reset()
+    response = client.post(
+        "/api/v1/auth/register",
+        json={"username": "alice", "email": "other@example.com", "password": "pw"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+    assert queries.count == 1
+
+def test_update_user_me(client, register, queries):
+    headers = register("alice")
+    queries.reset()
+    response = client.put("/api/v1/users/me", json={"avatar_url": "http://example.com/a.png"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["avatar_url"] == "http://example.com/a.png"
+    assert queries.count == 2
+
+def test_create_post(client, register, queries):
+    headers = register("alice")
+    # The first post also creates the author's stats row
+    assert create_post(client, headers, (1, 2, 3)).status_code == 200
+    queries.reset()
+    response = create_post(client, headers, (4, 5, 6))
+    assert response.status_code == 200
+    assert response.json()["user"]["username"] == "alice"
+    assert queries.count == 7
+
+def test_create_comment(client, register, queries):
+    author = register("alice")
+    commenter = register("bob")
+    post_id = create_post(client, author, (1, 2, 3)).json()["id"]
+    # The first comment also creates the commenter's stats row
+    client.post(f"/api/v1/posts/{post_id}/comments", json={"content": "first"}, headers=commenter)
+    queries.reset()
+    response = client.post(f"/api/v1/posts/{post_id}/comments", json={"content": "hi"}, headers=commenter)
+    assert response.status_code == 200
+    assert response.json()["content"] == "hi"
+    assert queries.count == 4
+
+def test_create_comment_missing_post(client, register, queries):
+    headers = register("bob")
+    queries.reset()
+    response = client.post("/api/v1/posts/999/comments", json={"content": "hi"}, headers=headers)
+    assert response.status_code == 404
+    assert queries.count == 2